@@ -0,0 +1,122 @@
+# api_client.py
+"""
+HTTP-клієнт записів main_api для сторінок Streamlit (і скриптів); читають сторінки через apppp.
+
+Один requests.Session на процес: пул keep-alive з'єднань (HTTPAdapter), тайм-аути на кожен запит,
+повтори з експоненційною затримкою (urllib3 Retry) при збоях з'єднання та відповідях 502/503/504.
+Неідемпотентні запити (POST - додавання товарів і продажів) після відправлення не повторюються,
+щоб збій мережі не створив дубль; помилка з'єднання до відправлення повторюється для всіх методів.
+
+Адреса API: змінна середовища API_URL (наприклад, http://127.0.0.1:8000); сторінки беруть клієнт
+через app_ui.get_api_client() (секрети Streamlit [api] url або API_URL).
+"""
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from log_config import get_logger
+from records import Item, Sale
+
+log = get_logger("api_client")
+
+CONNECT_TIMEOUT = 3.05 # секунд на встановлення з'єднання
+READ_TIMEOUT = 30.0    # секунд на відповідь
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.3    # затримки між повторами: 0.3, 0.6, 1.2 с
+RETRY_STATUSES = (502, 503, 504)
+POOL_SIZE = 16         # з'єднань на хост (одночасні сесії Streamlit)
+BULK_CHUNK_ROWS = 5000 # рядків на один POST /items/bulk: не більше main_api.BULK_MAX_ROWS, а прогрес
+                       # імпорту видно після кожного запиту; INSERT-пакети всередині - apppp.BULK_INSERT_CHUNK_SIZE
+
+
+class ApiError(Exception):
+    """Помилка звернення до API: status_code - HTTP-статус (None, якщо відповіді немає), detail - опис."""
+
+    def __init__(self, detail, status_code=None):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class ApiClient:
+    def __init__(self, base_url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=RETRY_TOTAL,
+                 backoff=RETRY_BACKOFF, pool_size=POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS, # ідемпотентні: GET, PUT, DELETE, ...
+            respect_retry_after_header=True,
+            raise_on_status=False, # після останнього повтору - звичайна відповідь з помилкою
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+
+    def close(self):
+        self.session.close()
+
+    # --- Транспорт ---
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            log.warning("API %s %s недоступне: %s", method, path, e)
+            raise ApiError(f"API недоступне: {e}") from e
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", response.text)
+            except ValueError:
+                detail = response.text
+            raise ApiError(str(detail), response.status_code)
+        return response
+
+    # --- Запис ---
+    def create_items(self, rows):
+        """
+        Додає товари (словники полів ItemCreate) порціями по BULK_CHUNK_ROWS. Повертає кількість доданих.
+        Якщо порція не пройшла, ApiError; попередні порції залишаються збереженими.
+        """
+        inserted = 0
+        for start in range(0, len(rows), BULK_CHUNK_ROWS):
+            inserted += self.create_items_chunk(rows[start:start + BULK_CHUNK_ROWS])
+        return inserted
+
+    def create_items_chunk(self, rows):
+        """Один POST /items/bulk (не більше BULK_CHUNK_ROWS рядків). Повертає кількість доданих."""
+        return self._request("POST", "/items/bulk", json=rows).json()["inserted"]
+
+    def create_item(self, row):
+        return self.create_items([row])
+
+    def update_item(self, item_id, row):
+        """Оновлює товар (поля ItemCreate). Повертає оновлений Item (без історії продажів)."""
+        return Item.from_row(self._request("PUT", f"/items/{item_id}", json=row).json())
+
+    def delete_item(self, item_id):
+        """Видаляє товар разом з історією продажів."""
+        self._request("DELETE", f"/items/{item_id}")
+
+    def sell_item(self, item_id, quantity_sold, price_per_unit_uah):
+        """Реєструє продаж. Повертає Sale; ApiError 409, якщо кількість більша за залишок."""
+        return Sale.from_row(self._request("POST", f"/items/{item_id}/sales", json={
+            "quantity_sold": quantity_sold, "price_per_unit_uah": price_per_unit_uah}).json())
+
+    def update_sale(self, sale_id, quantity_sold, price_per_unit_uah):
+        return Sale.from_row(self._request("PUT", f"/sales/{sale_id}", json={
+            "quantity_sold": quantity_sold, "price_per_unit_uah": price_per_unit_uah}).json())
+
+    def delete_sale(self, sale_id):
+        self._request("DELETE", f"/sales/{sale_id}")
+
+
+def client_from_env():
+    """ApiClient для API_URL або None, якщо змінну не задано."""
+    base_url = os.environ.get("API_URL")
+    return ApiClient(base_url) if base_url else None
@@ -0,0 +1,92 @@
+# app_ui.py
+"""
+Спільні елементи інтерфейсу Streamlit: налаштування сторінки, стан сесії, панель діагностики.
+Кожна сторінка викликає setup_page() одразу після імпорту і render_debug_panel() в кінці.
+"""
+import os
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+import api_client
+import metrics
+
+PAGE_TITLE = "AUDIT Облік"
+
+# Значення стану сесії за замовчуванням (ключ -> початкове значення)
+SESSION_DEFAULTS = {
+    'selected_item_id': None,
+    'editing_item_id': None,
+    'selling_item_id': None,
+    'viewing_history_item_id': None,
+    'editing_sale_id': None,
+    'editing_sale_item_id': None,
+    'confirm_delete_id': None,
+    'confirm_delete_sale_id': None,
+    'confirm_delete_sale_item_id': None,
+    'current_page_view_items': 1,
+    'view_items_cursors': [0], # after_id для кожної відкритої сторінки (0 - перша сторінка)
+    'view_items_cursor_search': None,
+    'selected_item_id_for_stats': None,
+}
+
+
+def setup_page():
+    """Налаштування сторінки (має бути першою командою Streamlit), заголовок бічної панелі і стан сесії."""
+    st.set_page_config(layout="wide", page_title=PAGE_TITLE)
+    st.sidebar.title("AUDIT")
+    init_session_state()
+
+
+def init_session_state():
+    for key, value in SESSION_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = list(value) if isinstance(value, list) else value # список - окремий для кожної сесії
+
+
+def get_api_client():
+    """Спільний для всіх сесій клієнт main_api (пул з'єднань) або None, якщо адресу API не задано."""
+    try:
+        base_url = st.secrets["api"]["url"]
+    except (KeyError, FileNotFoundError):
+        base_url = os.environ.get("API_URL")
+    return _api_client_for(base_url) if base_url else None
+
+
+@st.cache_resource
+def _api_client_for(base_url):
+    return api_client.ApiClient(base_url)
+
+
+# --- Панель діагностики ---
+# DEBUG_PANEL=1 показує на бічній панелі тривалість запитів до БД і влучання в кеш (метрики процесу, metrics.py)
+DEBUG_PANEL = os.environ.get('DEBUG_PANEL', '').lower() in ('1', 'true', 'yes')
+DEBUG_PANEL_SLOWEST = 10
+
+
+def render_debug_panel():
+    """Малює панель діагностики на бічній панелі; викликається в кінці кожної сторінки."""
+    if not DEBUG_PANEL:
+        return
+    with st.sidebar.expander("Діагностика", expanded=False):
+        db_calls = metrics.db_call_summary()
+        st.caption("Запити до БД з моменту запуску процесу")
+        if db_calls:
+            st.dataframe(pd.DataFrame(db_calls), hide_index=True)
+        else:
+            st.write("Запитів ще не було.")
+        caches = metrics.cache_summary()
+        if caches:
+            st.caption("Кеш даних")
+            st.dataframe(pd.DataFrame(caches), hide_index=True)
+        slowest = sorted(metrics.recent_db_calls, key=lambda call: call[3], reverse=True)[:DEBUG_PANEL_SLOWEST]
+        if slowest:
+            st.caption(f"Найповільніші з останніх {metrics.RECENT_DB_CALLS} запитів")
+            st.dataframe(pd.DataFrame([{
+                "time": datetime.fromtimestamp(finished).strftime('%H:%M:%S'),
+                "table": table,
+                "operation": operation,
+                "ms": round(seconds * 1000, 1),
+                "ok": ok,
+            } for finished, table, operation, seconds, ok in slowest]), hide_index=True)
@@ -1,93 +1,513 @@
-import streamlit as st
-from supabase import create_client, Client
+# apppp.py
+"""
+Спільна бібліотека застосунку: доступ до даних (Supabase, локальна копія, кеш), розрахунки
+статистики, форматування, масовий імпорт.
+
+Імпорт модуля не має побічних ефектів: клієнт Supabase, локальна копія, пул потоків і
+формат валюти створюються під час першого використання. Streamlit модулю не потрібен -
+його імпортують main_api і бенчмарки; інтерфейс (налаштування сторінки, бічна панель,
+стан сесії) - у app_ui.py, головна сторінка - streamlit_app.py.
+"""
+import pandas as pd
 from datetime import datetime
 import locale
 import os
+import sys
 import math # Додано, оскільки використовується в pages
+import time
+import threading
+import functools
+import inspect
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from local_mirror import mirror_from_env
+from records import Item, Sale
+from metrics import timed_execute, record_cache
+from log_config import get_logger
+
+log = get_logger('apppp')
+
+def _streamlit():
+    """Модуль streamlit, якщо код виконується в запущеному застосунку Streamlit, інакше None."""
+    st = sys.modules.get('streamlit')
+    return st if st is not None and st.runtime.exists() else None
 
-# --- Налаштування сторінки (має бути першою командою Streamlit) ---
-st.set_page_config(layout="wide", page_title="AUDIT Облік")
+def show_error(message):
+    """Помилка в журнал і, в застосунку Streamlit, на сторінку."""
+    log.error("%s", message)
+    st = _streamlit()
+    if st is not None:
+        st.error(message)
 
-# --- Додаємо заголовок до бічної панелі ---
-st.sidebar.title("AUDIT")
+def show_warning(message):
+    log.warning("%s", message)
+    st = _streamlit()
+    if st is not None:
+        st.warning(message)
 
-# --- Налаштування локалі ---
-try:
-    locale.setlocale(locale.LC_ALL, 'uk_UA.UTF-8')
-except locale.Error:
-    print("Українська локаль 'uk_UA.UTF-8' не доступна, спроба 'uk_UA'.")
+# --- Формат валюти ---
+# Локаль визначається під час першого форматування, а не під час імпорту
+_locale_lock = threading.Lock()
+_currency_formatter = None
+
+def _detect_currency_formatter():
     try:
-        locale.setlocale(locale.LC_ALL, 'uk_UA')
+        locale.setlocale(locale.LC_ALL, 'uk_UA.UTF-8')
     except locale.Error:
-        print("Локаль 'uk_UA' також недоступна, використовується стандартне форматування.")
-        def format_currency(value):
-            if value is None: return "---"
-            try: return f"{value:,.2f} ₴"
-            except (ValueError, TypeError): return "Помилка"
-else:
-    def format_currency(value):
-        if value is None: return "---"
-        try: return locale.currency(value, symbol='₴', grouping=True)
-        except (ValueError, TypeError): return "Помилка"
+        log.info("Українська локаль 'uk_UA.UTF-8' не доступна, спроба 'uk_UA'.")
+        try:
+            locale.setlocale(locale.LC_ALL, 'uk_UA')
+        except locale.Error:
+            log.warning("Локаль 'uk_UA' також недоступна, використовується стандартне форматування.")
+            return lambda value: f"{value:,.2f} ₴"
+    return lambda value: locale.currency(value, symbol='₴', grouping=True)
+
+def format_currency(value):
+    global _currency_formatter
+    if value is None: return "---"
+    if _currency_formatter is None:
+        with _locale_lock:
+            if _currency_formatter is None:
+                _currency_formatter = _detect_currency_formatter()
+    try: return _currency_formatter(value)
+    except (ValueError, TypeError): return "Помилка"
 
 # --- Підключення до Supabase ---
-@st.cache_resource
-def init_supabase_client():
-    """Ініціалізує та повертає клієнт Supabase."""
+# Клієнт створюється один раз на процес під час першого звернення (get_supabase()).
+# Дані підключення: секрети Streamlit ([supabase] url/key), якщо модуль працює в Streamlit,
+# інакше змінні середовища SUPABASE_URL / SUPABASE_KEY (main_api, бенчмарки).
+_resource_lock = threading.RLock()
+_NOT_CREATED = object()
+_supabase_client = _NOT_CREATED
+_local_mirror = _NOT_CREATED
+_sales_fetch_executor = None
+
+def _supabase_credentials():
+    st = _streamlit()
+    if st is not None:
+        try:
+            return st.secrets["supabase"]["url"], st.secrets["supabase"]["key"]
+        except Exception as e:
+            log.info("Секрети Streamlit [supabase] недоступні, використовуються змінні середовища: %s", e)
+    return os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+
+def get_supabase():
+    """Клієнт Supabase (спільний для процесу) або None, якщо підключитися не вдалося."""
+    global _supabase_client
+    if _supabase_client is _NOT_CREATED:
+        with _resource_lock:
+            if _supabase_client is _NOT_CREATED:
+                _supabase_client = _create_supabase_client()
+    return _supabase_client
+
+def _create_supabase_client():
+    url, key = _supabase_credentials()
+    if not url or not key:
+        show_error("**Не вдалося підключитися до бази даних Supabase.** Не задано url/key: "
+                   "секрети Streamlit [supabase] або змінні середовища SUPABASE_URL / SUPABASE_KEY.")
+        return None
     try:
-        SUPABASE_URL = st.secrets["supabase"]["url"]
-        SUPABASE_KEY = st.secrets["supabase"]["key"]
-        print("Спроба підключення до Supabase...")
-        client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("Підключення до Supabase успішне.")
+        from supabase import create_client
+        log.info("Спроба підключення до Supabase...")
+        client = create_client(url, key)
+        log.info("Підключення до Supabase успішне.")
         return client
     except Exception as e:
-        print(f"Помилка підключення до Supabase: {e}")
-        st.error(f"""
+        show_error(f"""
             **Не вдалося підключитися до бази даних Supabase.**
             Перевірте налаштування секретів Streamlit та дані проекту Supabase.
             Помилка: {e}
         """)
         return None
 
-supabase = init_supabase_client() # Створюємо клієнт
+# --- Локальна копія БД (необов'язкова) ---
+# Якщо задано LOCAL_MIRROR_PATH, товари та продажі читаються з локального SQLite-файлу,
+# який дельтами синхронізується з Supabase (див. local_mirror.py).
+def get_local_mirror():
+    global _local_mirror
+    if _local_mirror is _NOT_CREATED:
+        with _resource_lock:
+            if _local_mirror is _NOT_CREATED:
+                _local_mirror = mirror_from_env(get_supabase())
+    return _local_mirror
+
+def __getattr__(name):
+    # apppp.supabase / apppp.local_mirror - як до лінивого створення (сторінки, сторонній код)
+    if name == 'supabase':
+        return get_supabase()
+    if name == 'local_mirror':
+        return get_local_mirror()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# --- Кеш даних з тегами ---
+# Замість st.cache_data.clear(), що скидає весь кеш усіх сесій, кожен запис кешу має теги,
+# і запис у БД скидає лише записи з тегами, яких він стосується.
+TAG_ITEM_LISTS = 'items:list'          # сторінки списку товарів та повні завантаження
+TAG_FILTERED_LISTS = 'items:filtered'  # сторінки з пошуком/фільтром (склад може змінитись від зміни товару)
+TAG_ITEM_COUNT = 'items:count'         # кешована кількість товарів
+TAG_AGGREGATES = 'aggregates'          # агрегована статистика
+
+def item_tag(item_id):
+    """Тег записів кешу, що містять товар item_id."""
+    return f'item:{item_id}'
+
+class TaggedCache:
+    """
+    Потокобезпечний кеш процесу (спільний для всіх сесій, як st.cache_data) з TTL та тегами.
+    max_entries обмежує кількість записів: при переповненні видаляється найдавніше використаний (LRU).
+    Значення повертаються без копіювання - їх не слід змінювати на місці.
+    """
+    PURGE_EVERY = 128 # кожні N записів видаляються прострочені елементи
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # ключ -> (час закінчення, значення, теги), від найдавніше використаного
+        self._keys_by_tag = {}  # тег -> множина ключів
+        self._lock = threading.RLock()
+        self._sets_since_purge = 0
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0 # зростає з кожним скиданням; див. set(generation=...)
+
+    def get(self, key):
+        """Повертає (True, значення) для живого запису або (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, ttl, tags=(), generation=None):
+        """
+        Записує значення. generation - значення self.generation до початку обчислення: якщо відтоді кеш
+        скидали, значення могло бути прочитане до запису в БД і не зберігається.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            tags = frozenset(tags)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            self._sets_since_purge += 1
+            if self._sets_since_purge >= self.PURGE_EVERY:
+                self._purge_expired()
+            while self.max_entries is not None and len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self, *tags):
+        """Видаляє всі записи, що мають хоча б один із тегів."""
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def _purge_expired(self):
+        self._sets_since_purge = 0
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry[0] <= now]:
+            self._remove(key)
+
+# Верхня межа записів кешу даних (сторінки, окремі товари, кількість, статистика) - LRU понад неї
+DATA_CACHE_MAX_ENTRIES = int(os.environ.get('DATA_CACHE_MAX_ENTRIES', '4096'))
+data_cache = TaggedCache(max_entries=DATA_CACHE_MAX_ENTRIES)
+
+class _Flight:
+    __slots__ = ('owner', 'done', 'value', 'error')
+
+    def __init__(self):
+        self.owner = threading.get_ident()
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Об'єднання одночасних однакових викликів (single-flight): поки для ключа виконується виклик,
+    інші потоки з тим самим ключем чекають на його результат (або виняток), а не роблять власний запит.
+    Результат не кешується - наступний виклик після завершення виконується заново.
+    """
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Повертає (результат func(), shared): shared=True - результат отримано з виклику іншого потоку."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if flight.owner == threading.get_ident(): # рекурсивний виклик з тим самим ключем
+                return func(), False
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+        try:
+            flight.value = func()
+            return flight.value, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+_loader_flights = SingleFlight()
+
+def cached(ttl, tags=None):
+    """
+    Декоратор кешування результату функції в data_cache за її аргументами.
+    tags(result, *args, **kwargs) повертає теги запису; тег 'fn:<ім'я функції>' додається завжди,
+    тож <функція>.clear() скидає лише її записи, а <функція>.prime(значення, *аргументи, generation=...)
+    заповнює кеш (generation - data_cache.generation до читання значення, як у set).
+    Одночасні промахи з однаковими аргументами (кілька сесій відкривають ту саму сторінку) виконують
+    функцію один раз - решта чекає на її результат.
+    """
+    def decorator(func):
+        function_tag = f'fn:{func.__qualname__}'
+
+        def store(value, args, kwargs, generation=None):
+            entry_tags = {function_tag}
+            if tags is not None:
+                entry_tags.update(tags(value, *args, **kwargs))
+            data_cache.set((func.__qualname__, args, tuple(sorted(kwargs.items()))), value, ttl, entry_tags, generation)
+
+        def load(args, kwargs):
+            generation = data_cache.generation
+            value = func(*args, **kwargs)
+            store(value, args, kwargs, generation)
+            return value
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+            found, value = data_cache.get(key)
+            record_cache(func.__qualname__, found)
+            if found:
+                return value
+            # Покоління в ключі: після скидання кешу (запис у БД) нові виклики не чекають на старіше читання
+            value, shared = _loader_flights.do((data_cache.generation, key), lambda: load(args, kwargs))
+            record_cache('single_flight', shared)
+            return value
+
+        wrapper.clear = lambda: data_cache.invalidate(function_tag)
+        # <функція>.prime(значення, *аргументи) - покласти вже відоме значення, не викликаючи функцію;
+        # значення, прочитане до скидання кешу (generation застаріло), не зберігається
+        wrapper.prime = lambda value, *args, generation=None, **kwargs: store(value, args, kwargs, generation)
+        return wrapper
+    return decorator
+
+def _item_list_tags(result, *args, **kwargs):
+    """
+    Теги сторінки товарів: список, кожен товар на сторінці, і 'відфільтровані' для пошуку та фільтра наявності.
+    Аргументи зв'язуються із сигнатурою load_items_from_db, тож теги не залежать від того, як їх передано.
+    """
+    call = inspect.signature(load_items_from_db).bind(*args, **kwargs)
+    call.apply_defaults()
+    items_data, _ = result
+    tags = {TAG_ITEM_LISTS}
+    tags.update(item_tag(item.id) for item in items_data)
+    if call.arguments['search_term'] or call.arguments['stock_filter'] != STOCK_ALL:
+        tags.add(TAG_FILTERED_LISTS)
+    return tags
 
 # --- Спільні функції для роботи з даними ---
 
-@st.cache_data(ttl=60)
-def load_items_from_db(limit=None, offset=None, search_term=None):
+ITEM_COLUMNS = "id, name, initial_quantity, cost_uah, customs_uah, description, origin_country, original_currency, cost_original, shipping_original, rate, created_at, cost_usd, shipping_usd"
+SALES_COLUMNS = "id, item_id, quantity_sold, price_per_unit_uah, sale_timestamp"
+
+# Режими продажів у load_items_from_db
+SALES_FULL = 'full'       # кожен Item має sales_history - усі продажі
+SALES_SUMMARY = 'summary' # лише sold_qty і sales_value з колонок items (sql/005_items_sales_summary.sql), sales_history = None
+ITEM_SUMMARY_COLUMNS = ITEM_COLUMNS + ", sold_qty, sales_value"
+ITEM_WITH_SALES_COLUMNS = f"{ITEM_COLUMNS}, sales({SALES_COLUMNS})" # вкладений ресурс PostgREST
+
+# Стратегії підрахунку загальної кількості товарів для пагінації
+COUNT_EXACT = 'exact'      # точний count(*), повертається разом зі сторінкою
+COUNT_PLANNED = 'planned'  # оцінка планувальника Postgres, без сканування таблиці
+COUNT_CACHED = 'cached'    # точний підрахунок з окремим кешем (скидається при записі)
+ITEMS_COUNT_CACHE_TTL = 600 # секунд
+
+# Фільтр наявності: колонки sold_qty / remaining_qty підтримуються тригерами (sql/004_items_stock_columns.sql)
+STOCK_ALL = 'all'
+STOCK_IN_STOCK = 'in_stock' # remaining_qty > 0
+STOCK_SOLD = 'sold'         # sold_qty > 0
+
+def _apply_stock_filter(query, stock_filter):
+    if stock_filter == STOCK_IN_STOCK:
+        return query.gt('remaining_qty', 0)
+    if stock_filter == STOCK_SOLD:
+        return query.gt('sold_qty', 0)
+    return query
+
+def _count_items(search_term=None, count_method=COUNT_EXACT, stock_filter=STOCK_ALL):
+    """Окремий запит кількості товарів (HEAD, без передачі рядків)."""
+    count_query = get_supabase().table('items').select('id', count=count_method, head=True)
+    if search_term:
+        count_query = count_query.ilike('name', f'%{search_term}%')
+    count_query = _apply_stock_filter(count_query, stock_filter)
+    count_response = timed_execute(count_query, 'items', 'count')
+    return count_response.count if hasattr(count_response, 'count') and count_response.count is not None else 0
+
+def _count_tags(result, search_term=None, stock_filter=STOCK_ALL):
+    # Кількість з фільтром наявності змінюється від продажів, тож скидається разом із відфільтрованими сторінками
+    return {TAG_ITEM_COUNT, TAG_FILTERED_LISTS} if stock_filter != STOCK_ALL else {TAG_ITEM_COUNT}
+
+@cached(ttl=ITEMS_COUNT_CACHE_TTL, tags=_count_tags)
+def count_items_cached(search_term=None, stock_filter=STOCK_ALL):
+    """Точна кількість товарів за пошуком; кеш живе довше за кеш сторінок і скидається при записі."""
+    client = get_supabase()
+    if not client:
+        return 0
+    try:
+        return _count_items(search_term, COUNT_EXACT, stock_filter)
+    except Exception as e:
+        log.error("Помилка підрахунку товарів: %s", e)
+        return 0
+
+# Режими пошуку за назвою
+SEARCH_RANKED = 'ranked' # RPC search_items: триграмний індекс, сортування за релевантністю (sql/002_items_name_search.sql)
+SEARCH_ILIKE = 'ilike'   # простий ilike '%...%' з сортуванням за id
+SEARCH_MODE = SEARCH_RANKED
+
+def _search_items_ranked(search_term, limit=None, offset=None, stock_filter=STOCK_ALL):
+    """
+    Ранжований пошук через RPC search_items: сторінка товарів і загальна кількість за один запит.
+    Повертає (товари, кількість) або None, якщо функція в БД недоступна.
+    """
+    params = {
+        'search_term': search_term,
+        'result_limit': limit,
+        'result_offset': offset or 0,
+    }
+    if stock_filter != STOCK_ALL:
+        params['stock_filter'] = stock_filter
+    try:
+        response = timed_execute(get_supabase().rpc('search_items', params), 'search_items', 'rpc')
+        payload = response.data[0] if isinstance(response.data, list) and response.data else response.data
+        return payload.get('items') or [], int(payload.get('total_count') or 0)
+    except Exception as e:
+        log.warning("Ранжований пошук недоступний, використовується ilike: %s", e)
+        return None
+
+# Списки товарів і окремі товари живуть однаково довго: товари сторінки (limit) кладуться в кеш
+# get_item_summary, а завантажені з історією продажів - і в get_item_by_db_id (remember_items), тож
+# форми та історія показують ті самі записи, що й список, без окремих запитів. Повні завантаження (статистика,
+# експорт) кеш товарів не заповнюють - інакше кожен товар каталогу став би окремим записом.
+ITEMS_CACHE_TTL = 60 # секунд
+
+@cached(ttl=ITEMS_CACHE_TTL, tags=_item_list_tags)
+def load_items_from_db(limit=None, offset=None, search_term=None, after_id=None, count_strategy=COUNT_EXACT, stock_filter=STOCK_ALL,
+                       sales_mode=SALES_FULL):
     """
     Завантажує товари з Supabase з можливістю пагінації та пошуку,
     оптимізовано для уникнення N+1 запитів для історії продажів.
+    Якщо передано after_id, використовується keyset-пагінація (id > after_id)
+    замість offset: швидкість не залежить від глибини сторінки, а нові записи
+    не зсувають рядки між сторінками. Курсор наступної сторінки - id останнього товару.
+    count_strategy: COUNT_EXACT / COUNT_PLANNED - кількість приходить у тому ж запиті,
+    що й сторінка (окремий запит лише для keyset-сторінок після першої, бо фільтр id > after_id
+    змінює кількість); COUNT_CACHED - кількість береться з count_items_cached.
+    Пошук у режимі SEARCH_RANKED сортує за релевантністю і пагінується лише через limit/offset:
+    search_term разом з after_id (крім 0 - першої сторінки) -> ValueError; кількість приходить разом зі сторінкою.
+    У режимі SEARCH_ILIKE результати пошуку впорядковані за id, тож keyset-пагінація працює і з пошуком.
+    stock_filter (STOCK_IN_STOCK / STOCK_SOLD) фільтрує в БД, тож сторінки повні, а кількість
+    і пагінація враховують фільтр.
+    sales_mode=SALES_SUMMARY: замість історії продажів кожен товар має sold_qty і sales_value
+    (підсумки з колонок items) - для списків; повну історію дає get_item_by_db_id.
+    З увімкненою локальною копією (LOCAL_MIRROR_PATH) дані читаються з неї; пошук там - підрядок
+    без урахування регістру, упорядкований за id.
     Повертає список товарів для поточної сторінки та загальну кількість товарів, що відповідають критеріям.
     """
-    if not supabase:
-        st.warning("Підключення до Supabase відсутнє. Неможливо завантажити дані.")
+    if search_term and after_id and SEARCH_MODE == SEARCH_RANKED:
+        # Порядок за релевантністю, а не за id: курсор id > after_id пропустив би або повторив рядки
+        raise ValueError("Ранжований пошук пагінується через offset; after_id з search_term не підтримується")
+    generation = data_cache.generation # товари, прочитані до запису в БД, не потраплять у кеш товарів
+    client = get_supabase()
+    if not client:
+        show_warning("Підключення до Supabase відсутнє. Неможливо завантажити дані.")
         return [], 0
 
+    mirror = get_local_mirror()
+    if mirror is not None and mirror.ensure_fresh():
+        try:
+            rows, total_count = mirror.load_items(limit, offset, search_term, after_id, stock_filter, summary=sales_mode == SALES_SUMMARY)
+            items = [Item.from_row(row, row.get('sales_history')) for row in rows]
+            return (remember_items(items, generation) if limit is not None else items), total_count
+        except Exception as e:
+            log.warning("Помилка читання локальної копії, запит до Supabase: %s", e)
+
     try:
-        item_columns_to_select = "id, name, initial_quantity, cost_uah, customs_uah, description, origin_country, original_currency, cost_original, shipping_original, rate, created_at, cost_usd, shipping_usd"
-        
-        count_query = supabase.table('items').select('id', count='exact')
-        if search_term:
-            count_query = count_query.ilike('name', f'%{search_term}%')
-        
-        count_response = count_query.execute()
-        total_count = count_response.count if hasattr(count_response, 'count') and count_response.count is not None else 0
+        sales_by_item_id = None
+        ranked = _search_items_ranked(search_term, limit, offset, stock_filter) if search_term and SEARCH_MODE == SEARCH_RANKED else None
+        if ranked is not None:
+            items_data_raw, total_count = ranked
+        else:
+            item_columns_to_select = ITEM_SUMMARY_COLUMNS if sales_mode == SALES_SUMMARY else ITEM_COLUMNS
 
-        items_query = supabase.table('items').select(item_columns_to_select)
-        if search_term:
-            items_query = items_query.ilike('name', f'%{search_term}%')
-        if limit is not None and offset is not None:
-            items_query = items_query.range(offset, offset + limit - 1)
-        
-        items_response = items_query.order('id').execute()
-        
-        if not hasattr(items_response, 'data'):
-            st.error("Відповідь від Supabase (items) не містить атрибуту 'data'.")
-            return [], 0
-            
-        items_data_raw = items_response.data if items_response.data else []
+            count_in_page_query = count_strategy in (COUNT_EXACT, COUNT_PLANNED) and not after_id
+            if limit is None and after_id is None:
+                # Повне завантаження (статистика, експорт): keyset-сторінками, бо одна відповідь обрізається max-rows
+                items_data_raw, sales_by_item_id = _load_all_items_with_sales(search_term, stock_filter, with_sales=sales_mode == SALES_FULL)
+                total_count = len(items_data_raw)
+            else:
+                items_query = client.table('items').select(item_columns_to_select, count=count_strategy if count_in_page_query else None)
+                if search_term:
+                    items_query = items_query.ilike('name', f'%{search_term}%')
+                items_query = _apply_stock_filter(items_query, stock_filter)
+                if after_id is not None:
+                    items_query = items_query.gt('id', after_id)
+                    if limit is not None:
+                        items_query = items_query.limit(limit)
+                elif limit is not None and offset is not None:
+                    items_query = items_query.range(offset, offset + limit - 1)
+
+                items_response = timed_execute(items_query.order('id'), 'items', 'select')
+
+                if not hasattr(items_response, 'data'):
+                    show_error("Відповідь від Supabase (items) не містить атрибуту 'data'.")
+                    return [], 0
+
+                if count_in_page_query:
+                    total_count = items_response.count if items_response.count is not None else 0
+                elif count_strategy == COUNT_CACHED:
+                    total_count = count_items_cached(search_term, stock_filter)
+                else:
+                    total_count = _count_items(search_term, count_strategy, stock_filter)
+
+                items_data_raw = items_response.data if items_response.data else []
         
         items_data = []
         item_ids = []
@@ -96,100 +516,369 @@ def load_items_from_db(limit=None, offset=None, search_term=None):
                 items_data.append(item_dict_raw)
                 item_ids.append(item_dict_raw['id'])
             else:
-                print(f"Попередження: пропущено некоректний запис товару: {item_dict_raw}")
+                log.warning("Пропущено некоректний запис товару: %r", item_dict_raw)
 
         if not items_data:
             return [], total_count
 
-        sales_data_for_items = []
-        if item_ids:
-            sales_columns_to_select = "id, item_id, quantity_sold, price_per_unit_uah, sale_timestamp"
-            sales_response = supabase.table('sales').select(sales_columns_to_select).in_('item_id', item_ids).order('sale_timestamp').execute()
-            if hasattr(sales_response, 'data') and sales_response.data:
-                sales_data_for_items = sales_response.data
-            elif hasattr(sales_response, 'error') and sales_response.error:
-                 st.warning(f"Помилка при завантаженні історії продажів: {sales_response.error}")
-
-        sales_by_item_id = {}
-        for sale_dict_raw in sales_data_for_items:
-            if not isinstance(sale_dict_raw, dict): continue
-            item_id_val = sale_dict_raw.get('item_id')
-            if item_id_val is not None:
-                try:
-                    item_id_int = int(item_id_val)
-                    if item_id_int not in sales_by_item_id:
-                        sales_by_item_id[item_id_int] = []
-                    sales_by_item_id[item_id_int].append(sale_dict_raw)
-                except (ValueError, TypeError):
-                    print(f"Попередження: некоректний item_id в продажу: {sale_dict_raw}")
+        if sales_mode == SALES_SUMMARY:
+            items = [Item.from_row(row) for row in items_data]
+            log.info("Завантажено %d товарів (ліміт: %s, зсув: %s, після ID: %s, пошук: '%s', наявність: %s). Загалом знайдено: %s. Підсумки продажів без історії.",
+                     len(items), limit, offset, after_id, search_term, stock_filter, total_count)
+            return (remember_items(items, generation) if limit is not None else items), total_count
 
+        if sales_by_item_id is None:
+            sales_by_item_id = fetch_sales_grouped_by_item(item_ids)
+
+        items = []
         for item_dict in items_data:
-            item_id_main = item_dict.get('id')
-            if item_id_main is not None:
-                try:
-                    item_id_main_int = int(item_id_main)
-                    item_dict['sales_history'] = sales_by_item_id.get(item_id_main_int, [])
-                except (ValueError, TypeError):
-                    item_dict['sales_history'] = []
-                    print(f"Попередження: неможливо обробити ID основного товару '{item_id_main}' для історії продажів.")
-            else:
-                 item_dict['sales_history'] = []
+            item = Item.from_row(item_dict, sales_by_item_id.get(item_dict['id'], ()))
+            if item is None:
+                log.warning("Неможливо обробити ID основного товару '%s'.", item_dict.get('id'))
+                continue
+            items.append(item)
 
-        print(f"Завантажено {len(items_data)} товарів (ліміт: {limit}, зсув: {offset}, пошук: '{search_term}'). Загалом знайдено: {total_count}. Завантажено історію продажів.")
-        return items_data, total_count
+        log.info("Завантажено %d товарів (ліміт: %s, зсув: %s, після ID: %s, пошук: '%s', наявність: %s). Загалом знайдено: %s. Завантажено історію продажів.",
+                 len(items), limit, offset, after_id, search_term, stock_filter, total_count)
+        return (remember_items(items, generation) if limit is not None else items), total_count
 
     except Exception as e:
-        st.error(f"Загальна помилка завантаження товарів з БД: {e}")
+        if sales_mode == SALES_SUMMARY:
+            log.warning("Підсумки продажів у БД недоступні (потрібен sql/005_items_sales_summary.sql), завантажується повна історія: %s", e)
+            return load_items_from_db(limit=limit, offset=offset, search_term=search_term, after_id=after_id,
+                                      count_strategy=count_strategy, stock_filter=stock_filter, sales_mode=SALES_FULL)
+        if stock_filter != STOCK_ALL:
+            # Колонок наявності ще немає в БД - сторінка без фільтра, сторінка перегляду відфільтрує рядки сама
+            log.warning("Фільтр наявності в БД недоступний (потрібен sql/004_items_stock_columns.sql): %s", e)
+            return load_items_from_db(limit=limit, offset=offset, search_term=search_term, after_id=after_id,
+                                      count_strategy=count_strategy, stock_filter=STOCK_ALL, sales_mode=sales_mode)
+        show_error(f"Загальна помилка завантаження товарів з БД: {e}")
         return [], 0
 
 def load_sales_history_for_item(item_id):
     """Завантажує історію продажів для конкретного товару."""
-    if not supabase:
+    client = get_supabase()
+    if not client:
         return []
     try:
-        sales_columns_to_select = "id, item_id, quantity_sold, price_per_unit_uah, sale_timestamp"
-        response = supabase.table('sales').select(sales_columns_to_select).eq('item_id', item_id).order('sale_timestamp').execute()
+        sales_columns_to_select = SALES_COLUMNS
+        response = timed_execute(client.table('sales').select(sales_columns_to_select).eq('item_id', item_id).order('sale_timestamp'), 'sales', 'select')
         return response.data if hasattr(response, 'data') and response.data else []
     except Exception as e:
-        print(f"Помилка завантаження історії продажів для товару {item_id}: {e}")
+        log.error("Помилка завантаження історії продажів для товару %s: %s", item_id, e)
         return []
 
-@st.cache_data(ttl=300)
+@cached(ttl=ITEMS_CACHE_TTL, tags=lambda result, db_id: {item_tag(db_id)})
 def get_item_by_db_id(db_id):
-    """Ефективно завантажує ОДИН товар за його ID з бази даних, включаючи історію продажів."""
-    if not supabase:
+    """
+    Ефективно завантажує ОДИН товар (Item) за його ID з бази даних, включаючи історію продажів,
+    за один запит (embedded select). Якщо вкладений ресурс недоступний - два запити, як раніше.
+    """
+    client = get_supabase()
+    if not client:
+        return None
+    mirror = get_local_mirror()
+    if mirror is not None and mirror.ensure_fresh():
+        try:
+            row = mirror.get_item(db_id)
+            return Item.from_row(row, row['sales_history']) if row else None
+        except Exception as e:
+            log.warning("Помилка читання товару ID %s з локальної копії, запит до Supabase: %s", db_id, e)
+    return load_item_from_supabase(db_id)
+
+def load_item_from_supabase(db_id):
+    """Товар з історією продажів прямо з Supabase, в обхід кешу й локальної копії (перевірки перед записом)."""
+    client = get_supabase()
+    if not client:
         return None
     try:
-        item_columns_to_select = "id, name, initial_quantity, cost_uah, customs_uah, description, origin_country, original_currency, cost_original, shipping_original, rate, created_at, cost_usd, shipping_usd"
-        response = supabase.table('items').select(item_columns_to_select).eq('id', db_id).maybe_single().execute()
-        if hasattr(response, 'data') and response.data:
-            item = dict(response.data)
-            item['sales_history'] = load_sales_history_for_item(item['id'])
-            return item
+        # Товар і його продажі одним запитом: вкладений ресурс sales (зв'язок sales.item_id -> items.id)
+        response = timed_execute(client.table('items').select(ITEM_WITH_SALES_COLUMNS).eq('id', db_id)
+                                 .order('sale_timestamp', foreign_table='sales').maybe_single(), 'items', 'select_with_sales')
+    except Exception as e:
+        log.warning("Вкладений запит товару з продажами недоступний, окремі запити: %s", e)
+        return _get_item_by_db_id_two_queries(db_id)
+    if response is not None and response.data:
+        return Item.from_row(response.data, response.data.get('sales') or [])
+    return None
+
+@cached(ttl=ITEMS_CACHE_TTL, tags=lambda result, db_id: {item_tag(db_id)})
+def get_item_summary(db_id):
+    """
+    Товар за ID з підсумками продажів (sold_qty, sales_value) без історії - для форм, яким історія
+    не потрібна (редагування, підтвердження видалення). Без колонок підсумків у БД - повний товар.
+    """
+    client = get_supabase()
+    if not client:
         return None
+    mirror = get_local_mirror()
+    if mirror is not None and mirror.ensure_fresh():
+        try:
+            row = mirror.get_item(db_id, with_sales=False)
+            return Item.from_row(row) if row else None
+        except Exception as e:
+            log.warning("Помилка читання товару ID %s з локальної копії, запит до Supabase: %s", db_id, e)
+    try:
+        response = timed_execute(client.table('items').select(ITEM_SUMMARY_COLUMNS).eq('id', db_id).maybe_single(), 'items', 'select')
     except Exception as e:
-        st.error(f"Помилка завантаження товару ID {db_id} з БД: {e}")
+        log.warning("Підсумки продажів у БД недоступні (потрібен sql/005_items_sales_summary.sql), завантажується повна історія: %s", e)
+        return get_item_by_db_id(db_id)
+    return Item.from_row(response.data) if response is not None and response.data else None
+
+def remember_items(items, generation=None):
+    """
+    Кладе товари сторінки в кеш get_item_summary, а товари з повною історією продажів - і в
+    get_item_by_db_id (сховища товарів за id). generation - data_cache.generation до читання
+    сторінки: якщо відтоді кеш скидали (запис у БД), товари не зберігаються. Повертає items.
+    """
+    for item in items:
+        get_item_summary.prime(item, item.id, generation=generation)
+        if item.sales_history is not None:
+            get_item_by_db_id.prime(item, item.id, generation=generation)
+    return items
+
+def _get_item_by_db_id_two_queries(db_id):
+    try:
+        response = timed_execute(get_supabase().table('items').select(ITEM_COLUMNS).eq('id', db_id).maybe_single(), 'items', 'select')
+        if response is not None and response.data:
+            return Item.from_row(response.data, load_sales_history_for_item(response.data['id']))
+        return None
+    except Exception as e:
+        show_error(f"Помилка завантаження товару ID {db_id} з БД: {e}")
         return None
 
-def get_item_sales_info_cached(item_data):
-    """Розраховує продану кількість та середню ціну, використовуючи кешовану історію."""
-    sales_history = item_data.get('sales_history', [])
-    total_sold_qty = 0
-    total_sales_value = 0.0
-    if not sales_history:
-        return 0, 0.0
-
-    for sale in sales_history:
-        qty = sale.get('quantity_sold', 0)
-        price = sale.get('price_per_unit_uah', 0.0)
-        if isinstance(qty, (int, float)) and isinstance(price, (int, float)):
-             total_sold_qty += qty
-             total_sales_value += qty * price
-        else:
-             print(f"Попередження: некоректні типи даних у записі продажу: qty={qty}, price={price}")
+# Ключі агрегованої статистики (відповідь RPC stats_summary, див. sql/001_stats_summary.sql)
+STATS_SUMMARY_KEYS = ("item_count", "items_with_sales", "items_without_sales", "total_units",
+                      "units_sold", "expenses", "income", "profit", "remaining_value")
 
-    average_sell_price = total_sales_value / total_sold_qty if total_sold_qty > 0 else 0.0
-    return total_sold_qty, average_sell_price
+@cached(ttl=60, tags=lambda result: {TAG_AGGREGATES})
+def load_stats_summary():
+    """
+    Завантажує агреговану статистику складу, розраховану в БД (RPC stats_summary).
+    Повертає словник з ключами STATS_SUMMARY_KEYS або None, якщо RPC недоступна.
+    """
+    client = get_supabase()
+    if not client:
+        return None
+    try:
+        response = timed_execute(client.rpc('stats_summary', {}), 'stats_summary', 'rpc')
+        summary = response.data if hasattr(response, 'data') else None
+        if isinstance(summary, list):
+            summary = summary[0] if summary else None
+        if not isinstance(summary, dict):
+            return None
+        return {key: summary.get(key) or 0 for key in STATS_SUMMARY_KEYS}
+    except Exception as e:
+        log.warning("Помилка завантаження агрегованої статистики (stats_summary): %s", e)
+        return None
+
+# --- Порційне (keyset) читання всієї таблиці для експорту ---
+EXPORT_CHUNK_SIZE = 500   # товарів на порцію
+SALES_PAGE_SIZE = 1000    # не більше за max-rows PostgREST
+
+def fetch_sales_for_items(item_ids, page_size=SALES_PAGE_SIZE):
+    """
+    Завантажує всі продажі для списку ID товарів, сторінками за id продажу,
+    щоб не впертися в ліміт рядків однієї відповіді PostgREST.
+    """
+    sales = []
+    last_sale_id = 0
+    while True:
+        response = timed_execute(get_supabase().table('sales').select(SALES_COLUMNS).in_('item_id', item_ids)
+                                 .gt('id', last_sale_id).order('id').limit(page_size), 'sales', 'select')
+        rows = response.data or []
+        sales.extend(rows)
+        if len(rows) < page_size:
+            return sales
+        last_sale_id = rows[-1]['id']
+
+# Продажі для великої кількості товарів: ID діляться на порції (короткий URL запиту),
+# порції завантажуються паралельно в невеликому пулі потоків.
+SALES_ID_CHUNK_SIZE = 500 # ~4 КБ URL навіть для шестизначних ID
+SALES_FETCH_WORKERS = 8
+ITEMS_PAGE_SIZE = 1000 # не більше за max-rows PostgREST
+
+def init_sales_fetch_executor():
+    """Пул потоків для паралельного завантаження продажів (один на процес, створюється під час першого використання)."""
+    global _sales_fetch_executor
+    if _sales_fetch_executor is None:
+        with _resource_lock:
+            if _sales_fetch_executor is None:
+                _sales_fetch_executor = ThreadPoolExecutor(max_workers=SALES_FETCH_WORKERS, thread_name_prefix="sales-fetch")
+    return _sales_fetch_executor
+
+def fetch_sales_grouped_by_item(item_ids, chunk_size=SALES_ID_CHUNK_SIZE):
+    """
+    Завантажує продажі для item_ids порціями по chunk_size ID (паралельно, якщо порцій кілька)
+    і групує їх за ID товару. Продажі кожного товару впорядковані за sale_timestamp.
+    """
+    chunks = [item_ids[start:start + chunk_size] for start in range(0, len(item_ids), chunk_size)]
+    if len(chunks) > 1:
+        results = init_sales_fetch_executor().map(fetch_sales_for_items, chunks)
+    else:
+        results = [fetch_sales_for_items(chunk) for chunk in chunks]
+    return _group_sales_by_item(results)
+
+def _group_sales_by_item(chunk_results):
+    """Перетворює рядки продажів на Sale і групує за ID товару."""
+    sales_by_item_id = {}
+    for chunk_sales in chunk_results:
+        for sale_dict_raw in chunk_sales:
+            sale = Sale.from_row(sale_dict_raw) if isinstance(sale_dict_raw, dict) else None
+            if sale is None:
+                log.warning("Некоректний запис продажу: %r", sale_dict_raw)
+                continue
+            sales_by_item_id.setdefault(sale.item_id, []).append(sale)
+    # Порції приходять упорядкованими за id продажу; порядок як у запиті order('sale_timestamp'), null - в кінці
+    for sales in sales_by_item_id.values():
+        sales.sort(key=lambda sale: (sale.sale_timestamp is None, sale.sale_timestamp or ''))
+    return sales_by_item_id
+
+def _load_all_items_with_sales(search_term=None, stock_filter=STOCK_ALL, page_size=ITEMS_PAGE_SIZE, with_sales=True):
+    """
+    Усі товари (з пошуком/фільтром) keyset-сторінками за id і їхні продажі.
+    Продажі для кожної отриманої сторінки запитуються в пулі одразу, поки читається наступна сторінка товарів.
+    Повертає (товари, продажі за ID товару); with_sales=False - товари з підсумковими колонками і None.
+    """
+    executor = init_sales_fetch_executor()
+    items = []
+    sales_futures = []
+    last_item_id = 0
+    while True:
+        query = get_supabase().table('items').select(ITEM_COLUMNS if with_sales else ITEM_SUMMARY_COLUMNS).gt('id', last_item_id)
+        if search_term:
+            query = query.ilike('name', f'%{search_term}%')
+        rows = timed_execute(_apply_stock_filter(query, stock_filter).order('id').limit(page_size), 'items', 'select').data or []
+        page_ids = [row['id'] for row in rows if isinstance(row, dict) and row.get('id') is not None]
+        for start in range(0, len(page_ids) if with_sales else 0, SALES_ID_CHUNK_SIZE):
+            sales_futures.append(executor.submit(fetch_sales_for_items, page_ids[start:start + SALES_ID_CHUNK_SIZE]))
+        items.extend(rows)
+        if len(rows) < page_size or not page_ids:
+            break
+        last_item_id = page_ids[-1]
+    if not with_sales:
+        return items, None
+    return items, _group_sales_by_item(future.result() for future in sales_futures)
+
+def iter_items_with_sales_chunks(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Генератор порцій (товари, продажі цих товарів) по всій таблиці items, keyset-пагінація за id.
+    У пам'яті одночасно тримається лише одна порція - для експорту великих каталогів.
+    """
+    client = get_supabase()
+    if not client:
+        return
+    last_item_id = 0
+    while True:
+        response = timed_execute(client.table('items').select(ITEM_COLUMNS).gt('id', last_item_id).order('id').limit(chunk_size), 'items', 'select')
+        rows = response.data or []
+        items_chunk = [row for row in rows if isinstance(row, dict) and row.get('id') is not None]
+        if items_chunk:
+            yield items_chunk, fetch_sales_for_items([item['id'] for item in items_chunk])
+        if len(rows) < chunk_size or not items_chunk:
+            return
+        last_item_id = items_chunk[-1]['id']
+
+def _mark_mirror_stale(removed_item_id=None, removed_sale_id=None):
+    # Після запису локальна копія має підтягнути дельту при наступному читанні; видалень дельта
+    # не бачить, тож видалені рядки прибираються з копії одразу
+    if _local_mirror is not _NOT_CREATED and _local_mirror is not None:
+        if removed_item_id is not None:
+            _local_mirror.remove_item(removed_item_id)
+        if removed_sale_id is not None:
+            _local_mirror.remove_sale(removed_sale_id)
+        _local_mirror.mark_stale()
+
+def invalidate_after_items_added():
+    """Після додавання товарів: сторінки списку, кількість і статистика. Окремі товари не зачіпаються."""
+    data_cache.invalidate(TAG_ITEM_LISTS, TAG_ITEM_COUNT, TAG_AGGREGATES)
+    _mark_mirror_stale()
+
+def invalidate_after_item_changed(item_id, removed=False, removed_sale_id=None):
+    """
+    Після зміни товару або його продажів: записи з цим товаром, сторінки з пошуком/фільтром
+    (товар міг у них з'явитись або зникнути) і статистика. Після видалення - усі сторінки списку
+    (наступні за видаленим товаром зсуваються) і кількість. removed / removed_sale_id - лише для
+    видалень, що відбулися: ці рядки прибираються й з локальної копії.
+    """
+    tags = [item_tag(item_id), TAG_FILTERED_LISTS, TAG_AGGREGATES]
+    if removed:
+        tags += [TAG_ITEM_LISTS, TAG_ITEM_COUNT]
+    data_cache.invalidate(*tags)
+    _mark_mirror_stale(item_id if removed else None, removed_sale_id)
+
+# --- Векторизований розрахунок статистики (pandas) ---
+
+def build_inventory_frames(items_data, sales_data=None):
+    """
+    Перетворює список товарів на два DataFrame: товари (без sales_history) та всі продажі.
+    items_data - записи Item (продажі з їхньої sales_history) або рядки items як словники
+    разом із sales_data - пласким списком продажів з полем item_id (як повертає fetch_sales_for_items).
+    """
+    if sales_data is None:
+        items_df = pd.DataFrame([item.to_row() for item in items_data])
+        sales_records = [(item.id, sale.quantity_sold, sale.price_per_unit_uah)
+                         for item in items_data for sale in (item.sales_history or ())]
+    else:
+        items_df = pd.DataFrame(items_data)
+        sales_records = [(sale.get('item_id'), sale.get('quantity_sold'), sale.get('price_per_unit_uah'))
+                         for sale in sales_data if isinstance(sale, dict)]
+    for column in ('id', 'initial_quantity', 'cost_uah', 'customs_uah'):
+        if column not in items_df.columns:
+            items_df[column] = None
+    sales_df = pd.DataFrame.from_records(sales_records, columns=['item_id', 'quantity_sold', 'price_per_unit_uah'])
+    return items_df, sales_df
+
+def calculate_item_stats(items_df, sales_df):
+    """
+    Розраховує показники для кожного товару групуванням продажів, без циклів по записах.
+    Правила ті самі, що в records.Item та на сторінці статистики:
+    продана кількість і середня ціна - лише продажі з числовими кількістю й ціною;
+    дохід - продажі з кількістю > 0 і ціною >= 0.
+    Повертає DataFrame з індексом items_df і колонками: initial_qty, expenses, unit_cost,
+    sales_count, sold_qty, sales_value, avg_sell_price, income, remaining_qty, remaining_value.
+    """
+    qty = pd.to_numeric(sales_df['quantity_sold'], errors='coerce')
+    price = pd.to_numeric(sales_df['price_per_unit_uah'], errors='coerce')
+    valid = qty.notna() & price.notna()
+    value = qty * price
+    per_item = pd.DataFrame({
+        'item_id': sales_df['item_id'],
+        'sales_count': 1,
+        'sold_qty': qty.where(valid, 0),
+        'sales_value': value.where(valid, 0.0),
+        'income': value.where((qty > 0) & (price >= 0), 0.0),
+    }).groupby('item_id').sum().reindex(items_df['id'].to_numpy(), fill_value=0)
+
+    stats = pd.DataFrame(index=items_df.index)
+    stats['initial_qty'] = pd.to_numeric(items_df['initial_quantity'], errors='coerce').fillna(0).astype('int64')
+    stats['expenses'] = (pd.to_numeric(items_df['cost_uah'], errors='coerce').fillna(0.0)
+                         + pd.to_numeric(items_df['customs_uah'], errors='coerce').fillna(0.0))
+    stats['unit_cost'] = stats['expenses'].div(stats['initial_qty'].where(stats['initial_qty'] > 0)).fillna(0.0)
+    stats['sales_count'] = per_item['sales_count'].to_numpy().astype('int64')
+    stats['sold_qty'] = per_item['sold_qty'].to_numpy().astype('int64')
+    stats['sales_value'] = per_item['sales_value'].to_numpy().astype('float64')
+    stats['avg_sell_price'] = stats['sales_value'].div(stats['sold_qty'].where(stats['sold_qty'] > 0)).fillna(0.0)
+    stats['income'] = per_item['income'].to_numpy().astype('float64')
+    stats['remaining_qty'] = stats['initial_qty'] - stats['sold_qty']
+    stats['remaining_value'] = (stats['remaining_qty'] * stats['unit_cost']).where(stats['remaining_qty'] > 0, 0.0)
+    return stats
+
+def summarize_item_stats(item_stats):
+    """Згортає результат calculate_item_stats у словник з ключами STATS_SUMMARY_KEYS."""
+    expenses = float(item_stats['expenses'].sum())
+    income = float(item_stats['income'].sum())
+    return {
+        "item_count": int(len(item_stats)),
+        "items_with_sales": int(((item_stats['sales_count'] > 0) & (item_stats['sold_qty'] > 0)).sum()),
+        "items_without_sales": int((item_stats['sales_count'] == 0).sum()),
+        "total_units": int(item_stats['initial_qty'].sum()),
+        "units_sold": int(item_stats['sold_qty'].sum()),
+        "expenses": expenses,
+        "income": income,
+        "profit": income - expenses,
+        "remaining_value": float(item_stats['remaining_value'].sum()),
+    }
 
 def calculate_uah_cost(cost_original, shipping_original, rate):
     """Розраховує вартість в UAH на основі оригінальної вартості та курсу."""
@@ -204,40 +893,194 @@ def calculate_uah_cost(cost_original, shipping_original, rate):
     except (ValueError, TypeError):
         return 0.0
 
+def calculate_uah_cost_vectorized(cost_original, shipping_original, rate):
+    """Векторний аналог calculate_uah_cost для колонок pandas: (вартість + доставка) * курс, 0 при курсі <= 0."""
+    cost = pd.to_numeric(cost_original, errors='coerce').fillna(0.0)
+    shipping = pd.to_numeric(shipping_original, errors='coerce').fillna(0.0)
+    rate_val = pd.to_numeric(rate, errors='coerce').fillna(0.0)
+    return ((cost + shipping) * rate_val).where(rate_val > 0, 0.0)
+
 CURRENCY_SETTINGS = {
     "USA": {"symbol": "$", "code": "USD", "default_rate": 42.0, "rate_label": "Курс $/грн*"},
     "Poland": {"symbol": "zł", "code": "PLN", "default_rate": 11.11, "rate_label": "Курс zł/грн*"},
     "England": {"symbol": "£", "code": "GBP", "default_rate": 55.0, "rate_label": "Курс £/грн*"}
 }
 
-# --- Ініціалізація стану додатку ---
-if 'selected_item_id' not in st.session_state:
-    st.session_state.selected_item_id = None
-if 'editing_item_id' not in st.session_state:
-    st.session_state.editing_item_id = None
-if 'selling_item_id' not in st.session_state:
-    st.session_state.selling_item_id = None
-if 'viewing_history_item_id' not in st.session_state:
-    st.session_state.viewing_history_item_id = None
-if 'editing_sale_id' not in st.session_state:
-    st.session_state.editing_sale_id = None
-    st.session_state.editing_sale_item_id = None
-if 'confirm_delete_id' not in st.session_state:
-     st.session_state.confirm_delete_id = None
-if 'confirm_delete_sale_id' not in st.session_state:
-     st.session_state.confirm_delete_sale_id = None
-     st.session_state.confirm_delete_sale_item_id = None
-if 'current_page_view_items' not in st.session_state:
-    st.session_state.current_page_view_items = 1
-if 'selected_item_id_for_stats' not in st.session_state:
-    st.session_state.selected_item_id_for_stats = None
-
-
-# --- Головна сторінка ---
-st.title("📊 Програма обліку товарів")
-st.write("Оберіть потрібний розділ на бічній панелі зліва.")
-if not supabase:
-    st.warning("Увага: Не вдалося підключитися до бази даних. Функціонал може бути обмежено.")
-else:
-    st.info("Це головна сторінка. Основний функціонал знаходиться в розділах бічного меню.")
+# --- Масовий імпорт товарів ---
+BULK_IMPORT_COLUMNS = ["name", "initial_quantity", "origin_country", "cost_original", "shipping_original",
+                       "rate", "customs_uah", "description"]
+BULK_INSERT_CHUNK_SIZE = 500 # рядків на один INSERT
+
+def prepare_bulk_items(df):
+    """
+    Перевіряє та готує рядки таблиці імпорту (колонки BULK_IMPORT_COLUMNS) до вставки в items.
+    Усі перевірки та розрахунок cost_uah виконуються векторно по колонках.
+    Повертає (записи для вставки, DataFrame помилок з колонками "Рядок" та "Помилка").
+    Рядок файлу = індекс + 2 (перший рядок - заголовки).
+    """
+    df = df.reindex(columns=BULK_IMPORT_COLUMNS).reset_index(drop=True)
+    name = df['name'].astype('string').str.strip()
+    country = df['origin_country'].astype('string').str.strip().fillna('USA')
+    quantity = pd.to_numeric(df['initial_quantity'], errors='coerce')
+    cost = pd.to_numeric(df['cost_original'], errors='coerce')
+    shipping = pd.to_numeric(df['shipping_original'], errors='coerce').fillna(0.0)
+    customs = pd.to_numeric(df['customs_uah'], errors='coerce')
+    default_rates = country.map({key: value['default_rate'] for key, value in CURRENCY_SETTINGS.items()})
+    rate = pd.to_numeric(df['rate'], errors='coerce').fillna(default_rates)
+
+    checks = [
+        (name.isna() | (name == ''), "Назва товару"),
+        (quantity.isna() | (quantity <= 0) | (quantity != quantity.round()), "Початкова кількість (ціле число > 0)"),
+        (~country.isin(list(CURRENCY_SETTINGS.keys())), f"Країна ({', '.join(CURRENCY_SETTINGS.keys())})"),
+        (cost.isna() | (cost < 0), "Вартість (число >= 0)"),
+        (shipping.isna() | (shipping < 0), "Доставка (число >= 0)"),
+        (rate.isna() | (rate <= 0), "Курс (число > 0)"),
+        (customs.notna() & (customs < 0), "Митний платіж (число >= 0)"),
+    ]
+    errors = pd.concat([pd.DataFrame({"Рядок": df.index[mask] + 2, "Помилка": message}) for mask, message in checks],
+                       ignore_index=True).sort_values("Рядок", kind="stable")
+    valid = ~df.index.isin(errors["Рядок"] - 2)
+
+    prepared = pd.DataFrame({
+        "name": name,
+        "initial_quantity": quantity,
+        "origin_country": country,
+        "original_currency": country.map({key: value['code'] for key, value in CURRENCY_SETTINGS.items()}),
+        "cost_original": cost,
+        "shipping_original": shipping,
+        "rate": rate,
+        "cost_uah": calculate_uah_cost_vectorized(cost, shipping, rate),
+        "customs_uah": customs.fillna(0.0),
+        "description": df['description'].astype('string').fillna(''),
+    })[valid]
+    prepared['initial_quantity'] = prepared['initial_quantity'].astype('int64')
+    records = prepared.astype(object).where(prepared.notna(), None).to_dict('records')
+    return records, errors.reset_index(drop=True)
+
+def insert_items_in_batches(records, chunk_size=BULK_INSERT_CHUNK_SIZE):
+    """
+    Вставляє товари пакетами по chunk_size рядків (один INSERT на пакет) і скидає кеш один раз у кінці.
+    Повертає (кількість вставлених, текст помилки або None). Пакети до помилки залишаються збереженими.
+    """
+    client = get_supabase()
+    if not client:
+        return 0, "Немає підключення до бази даних."
+    inserted = 0
+    error = None
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        try:
+            timed_execute(client.table('items').insert(chunk, returning='minimal'), 'items', 'insert')
+        except Exception as e:
+            error = f"Пакет рядків {start + 1}-{start + len(chunk)}: {e}"
+            break
+        inserted += len(chunk)
+    if inserted:
+        invalidate_after_items_added()
+    return inserted, error
+
+# --- Зміна товарів і продажів ---
+# Прямі записи в Supabase для сторінок без main_api (API_URL не задано). Перевірки ті самі, що в
+# main_api: залишок рахується за records.Item (лише повні продажі), прочитаним з БД в обхід кешу.
+# Одночасні записи з інших процесів зупиняє обмеження remaining_qty >= 0 (sql/006_items_remaining_qty_check.sql).
+# Кожна функція повертає текст помилки або None і після запису скидає кеш товару.
+NO_DB_CONNECTION = "Немає підключення до бази даних."
+STOCK_CHECK_VIOLATION = '23514' # check_violation: обмеження items_remaining_qty_nonnegative
+STOCK_CHECK_MESSAGE = "Недостатньо товару: залишок змінився, оновіть дані."
+
+def item_row(fields):
+    """Рядок items з полів форми товару (як ItemCreate у main_api): валюта і cost_uah за країною, курс за замовчуванням."""
+    currency = CURRENCY_SETTINGS[fields['origin_country']]
+    rate = fields.get('rate') or currency['default_rate']
+    shipping_original = fields.get('shipping_original') or 0.0
+    return {
+        'name': fields['name'].strip(),
+        'initial_quantity': fields['initial_quantity'],
+        'origin_country': fields['origin_country'],
+        'original_currency': currency['code'],
+        'cost_original': fields['cost_original'],
+        'shipping_original': shipping_original,
+        'rate': rate,
+        'cost_uah': calculate_uah_cost(fields['cost_original'], shipping_original, rate),
+        'customs_uah': fields.get('customs_uah') or 0.0,
+        'description': fields.get('description') or '',
+    }
+
+def _write(query, table, operation):
+    """Виконує запит запису; повертає (відповідь, None) або (None, текст помилки)."""
+    try:
+        return timed_execute(query, table, operation), None
+    except Exception as e:
+        log.error("Помилка запису в %s (%s): %s", table, operation, e)
+        return None, STOCK_CHECK_MESSAGE if getattr(e, 'code', None) == STOCK_CHECK_VIOLATION else str(e)
+
+def update_item(item_id, fields):
+    """Оновлює товар полями форми; початкова кількість не може бути меншою за продану."""
+    client = get_supabase()
+    if not client:
+        return NO_DB_CONNECTION
+    item = load_item_from_supabase(item_id)
+    if item is None:
+        return "Товар не знайдено."
+    if fields['initial_quantity'] < item.sold_qty:
+        return f"Початкова кількість менша за продану ({item.sold_qty})."
+    _, error = _write(client.table('items').update(item_row(fields)).eq('id', item_id), 'items', 'update')
+    invalidate_after_item_changed(item_id)
+    return error
+
+def delete_item(item_id):
+    """Видаляє товар разом з історією продажів."""
+    client = get_supabase()
+    if not client:
+        return NO_DB_CONNECTION
+    _, error = _write(client.table('sales').delete(returning='minimal').eq('item_id', item_id), 'sales', 'delete')
+    if error is None:
+        _, error = _write(client.table('items').delete(returning='minimal').eq('id', item_id), 'items', 'delete')
+    invalidate_after_item_changed(item_id, removed=error is None)
+    return error
+
+def sell_item(item_id, quantity_sold, price_per_unit_uah):
+    """Реєструє продаж; кількість не може перевищувати залишок."""
+    client = get_supabase()
+    if not client:
+        return NO_DB_CONNECTION
+    item = load_item_from_supabase(item_id)
+    if item is None:
+        return "Товар не знайдено."
+    if quantity_sold > item.remaining_qty:
+        return f"Недостатньо товару: доступно {item.remaining_qty} од."
+    row = {'item_id': item_id, 'quantity_sold': quantity_sold, 'price_per_unit_uah': price_per_unit_uah,
+           'sale_timestamp': datetime.now().isoformat()}
+    _, error = _write(client.table('sales').insert(row, returning='minimal'), 'sales', 'insert')
+    invalidate_after_item_changed(item_id)
+    return error
+
+def update_sale(item_id, sale_id, quantity_sold, price_per_unit_uah):
+    """Змінює кількість і ціну продажу; разом з іншими продажами - не більше за початкову кількість."""
+    client = get_supabase()
+    if not client:
+        return NO_DB_CONNECTION
+    item = load_item_from_supabase(item_id)
+    if item is None or item.find_sale(sale_id) is None:
+        return "Продаж не знайдено."
+    allowed = (item.initial_quantity or 0) - item.sold_qty_excluding(sale_id)
+    if quantity_sold > allowed:
+        return f"Максимально допустима кількість для цього продажу: {allowed}"
+    _, error = _write(client.table('sales').update({'quantity_sold': quantity_sold, 'price_per_unit_uah': price_per_unit_uah})
+                      .eq('id', sale_id).eq('item_id', item_id), 'sales', 'update')
+    invalidate_after_item_changed(item_id)
+    return error
+
+def delete_sale(item_id, sale_id):
+    """Видаляє запис про продаж."""
+    client = get_supabase()
+    if not client:
+        return NO_DB_CONNECTION
+    _, error = _write(client.table('sales').delete(returning='minimal').eq('id', sale_id).eq('item_id', item_id), 'sales', 'delete')
+    invalidate_after_item_changed(item_id, removed_sale_id=sale_id if error is None else None)
+    return error
 
+if __name__ == '__main__':
+    # Сумісність із "streamlit run apppp.py": головна сторінка тепер у streamlit_app.py
+    import runpy
+    runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_app.py'), run_name='__main__')
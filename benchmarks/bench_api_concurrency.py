@@ -0,0 +1,78 @@
+"""
+Бенчмарк пропускної здатності main_api при паралельних клієнтах.
+
+Запускає по --requests запитів на кожен рівень паралельності (--concurrency) і виводить
+кількість запитів за секунду та затримки p50/p95. Якщо обробники не блокують event loop,
+RPS росте разом із кількістю клієнтів (до розміру пулу DB_POOL_SIZE); якщо блокують -
+залишається на рівні одного клієнта.
+
+Приклад:
+    uvicorn main_api:app --workers 1
+    python benchmarks/bench_api_concurrency.py --url http://127.0.0.1:8000 --path "/products/?limit=20"
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def run_level(url, concurrency, total_requests, timeout):
+    """Виконує total_requests GET-запитів у concurrency потоках. Повертає (rps, затримки в мс, помилки)."""
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def one_request(_):
+        started = time.perf_counter()
+        try:
+            ok = session().get(url, timeout=timeout).status_code < 500
+        except requests.RequestException:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, ok in results if not ok)
+    return total_requests / elapsed, latencies, errors
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="адреса запущеного main_api")
+    parser.add_argument("--path", default="/products/?limit=20", help="шлях ендпоінта")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="рівні паралельності через кому")
+    parser.add_argument("--requests", type=int, default=200, help="запитів на кожен рівень")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/") + args.path
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    # Прогрів: з'єднання до БД, кеші імпорту тощо
+    run_level(url, 1, 5, args.timeout)
+
+    print(f"GET {url}")
+    print(f"{'клієнтів':>9} {'RPS':>9} {'p50, мс':>9} {'p95, мс':>9} {'помилок':>8}")
+    for concurrency in levels:
+        rps, latencies, errors = run_level(url, concurrency, args.requests, args.timeout)
+        print(f"{concurrency:>9} {rps:>9.1f} {statistics.median(latencies):>9.1f} "
+              f"{percentile(latencies, 0.95):>9.1f} {errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Бенчмарк шляхів читання даних на синтетичних каталогах різного розміру.
+
+Для кожного розміру каталогу (--sizes) запускається локальна заміна Supabase REST
+(fake_postgrest.py з каталогом synthetic_catalog.py) в окремому процесі, і вимірюються:
+  * час виконання шляху (медіана та мінімум з --repeat холодних запусків, кеші apppp і main_api скидаються);
+  * кількість запитів до "БД" і обсяг їхніх відповідей;
+  * розмір результату (відповідь API, файл експорту);
+  * пік пам'яті Python (tracemalloc) з --memory - окремим запуском, бо tracemalloc сповільнює код.
+
+Шляхи (--paths):
+  view_page, view_page_deep, search, item, load_all, stats_local, stats_summary, export_xlsx -
+      функції apppp і сторінки експорту, як їх викликають сторінки Streamlit;
+  api_products, api_search, api_item, api_batch, api_export_csv - ендпоінти main_api (TestClient).
+
+Приклади:
+    python benchmarks/bench_data_paths.py
+    python benchmarks/bench_data_paths.py --sizes 1000,100000,1000000 --paths view_page,item,api_products --memory
+    python benchmarks/bench_data_paths.py --delay-ms 20   # з мережевою затримкою, як до хмарного Supabase
+Каталог на 1 000 000 товарів потребує кількох ГБ пам'яті для процесу fake_postgrest.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import runpy
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_postgrest import FAKE_KEY
+
+EXPORT_PAGE = os.path.join(REPO_DIR, "pages", "4_💾_Експорт_в_Excel.py")
+SEARCH_TERM = "Nike"
+BATCH_SIZE = 50
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_server(item_count, port, args):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_postgrest.py"), "--items", str(item_count), "--seed", str(args.seed),
+         "--port", str(port), "--max-rows", str(args.max_rows), "--delay-ms", str(args.delay_ms)],
+        stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("READY"):
+        process.kill()
+        raise RuntimeError(f"fake_postgrest не запустився: {line!r}")
+    return process, line.split(" ", 2)[2].strip()
+
+
+def db_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/__bench/stats") as response:
+        return json.load(response)
+
+
+def prepare_environment(base_url):
+    """Змінні середовища, з яких apppp і main_api створюють клієнт Supabase."""
+    os.environ["SUPABASE_URL"] = base_url
+    os.environ["SUPABASE_KEY"] = FAKE_KEY
+    os.environ.pop("LOCAL_MIRROR_PATH", None)
+
+
+def build_paths(apppp, client, export_page, item_count):
+    """Шлях -> (підготовка або None, виклик(підготовлене) -> розмір результату в байтах або None)."""
+    middle_id = max(1, item_count // 2)
+    batch_ids = ",".join(str(item_id) for item_id in range(middle_id, min(item_count, middle_id + BATCH_SIZE - 1) + 1))
+    all_export_keys = list(export_page["all_export_columns"])
+
+    def api(path):
+        def call(_):
+            response = client.get(path)
+            response.raise_for_status()
+            return len(response.content)
+        return None, call
+
+    def export_xlsx(_):
+        path, _rows = export_page["export_inventory_to_excel_file"](all_export_keys)
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+
+    def stats_local(items):
+        items_df, sales_df = apppp.build_inventory_frames(items)
+        apppp.summarize_item_stats(apppp.calculate_item_stats(items_df, sales_df))
+
+    return {
+        "view_page": (None, lambda _: apppp.load_items_from_db(
+            limit=20, after_id=0, count_strategy=apppp.COUNT_CACHED, sales_mode=apppp.SALES_SUMMARY)),
+        "view_page_deep": (None, lambda _: apppp.load_items_from_db(
+            limit=20, after_id=max(0, item_count - 100), count_strategy=apppp.COUNT_CACHED, sales_mode=apppp.SALES_SUMMARY)),
+        "search": (None, lambda _: apppp.load_items_from_db(
+            limit=20, offset=0, search_term=SEARCH_TERM, count_strategy=apppp.COUNT_CACHED, sales_mode=apppp.SALES_SUMMARY)),
+        "item": (None, lambda _: apppp.get_item_by_db_id(middle_id)),
+        "load_all": (None, lambda _: apppp.load_items_from_db()),
+        "stats_local": (lambda: apppp.load_items_from_db()[0], stats_local),
+        "stats_summary": (None, lambda _: apppp.load_stats_summary()),
+        "export_xlsx": (None, export_xlsx),
+        "api_products": api("/products/?limit=20"),
+        "api_search": api(f"/products/?search={SEARCH_TERM}&limit=20"),
+        "api_item": api(f"/items/{middle_id}?include_sales=true"),
+        "api_batch": api(f"/items?ids={batch_ids}&include_sales=true"),
+        "api_export_csv": api("/export/items?format=csv"),
+    }
+
+
+def measure(caches, base_url, setup, call, repeat, with_memory):
+    prepared = setup() if setup else None
+    timings, db, result_size, peak = [], None, None, None
+    for attempt in range(repeat):
+        for cache in caches:
+            cache.clear()
+        db_stats(base_url)
+        started = time.perf_counter()
+        size = call(prepared)
+        timings.append(time.perf_counter() - started)
+        if attempt == 0:
+            db, result_size = db_stats(base_url), size if isinstance(size, int) else None
+    if with_memory:
+        for cache in caches:
+            cache.clear()
+        tracemalloc.start()
+        call(prepared)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return timings, db, result_size, peak
+
+
+def format_size(size):
+    if size is None:
+        return "-"
+    return f"{size / 1024:.1f}" if size < 10 * 1024 * 1024 else f"{size / 1024 / 1024:.1f}М"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000", help="розміри каталогу через кому (наприклад 1000,100000,1000000)")
+    parser.add_argument("--paths", default="all", help="шляхи через кому або all")
+    parser.add_argument("--repeat", type=int, default=3, help="холодних запусків кожного шляху")
+    parser.add_argument("--memory", action="store_true", help="виміряти пік пам'яті (tracemalloc)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-rows", type=int, default=1000, help="max-rows заміни PostgREST")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="штучна мережева затримка на запит до БД")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    prepare_environment(base_url)
+
+    process, catalog = start_fake_server(sizes[0], port, args)
+    try:
+        # main_api створює клієнт Supabase під час імпорту - сервер уже має слухати порт
+        import streamlit.logger
+        streamlit.logger.set_log_level("error") # попередження bare mode про відсутній ScriptRunContext
+        with contextlib.redirect_stdout(io.StringIO()):
+            import apppp
+            import main_api
+            export_page = runpy.run_path(EXPORT_PAGE, run_name="bench_export_page")
+        from fastapi.testclient import TestClient
+
+        with TestClient(main_api.app) as client:
+            for index, item_count in enumerate(sizes):
+                if index:
+                    process.terminate()
+                    process.wait()
+                    process, catalog = start_fake_server(item_count, port, args)
+                paths = build_paths(apppp, client, export_page, item_count)
+                selected = list(paths) if args.paths == "all" else [path.strip() for path in args.paths.split(",")]
+                unknown = [path for path in selected if path not in paths]
+                if unknown:
+                    parser.error(f"невідомі шляхи: {', '.join(unknown)}; доступні: {', '.join(paths)}")
+
+                print(f"\nКаталог: {catalog}, затримка БД {args.delay_ms} мс, max-rows {args.max_rows}")
+                print(f"{'шлях':<16} {'медіана, мс':>12} {'мін, мс':>10} {'запитів':>8} {'БД, КБ':>10} "
+                      f"{'результат, КБ':>14} {'пік пам., МБ':>13}")
+                for name in selected:
+                    setup, call = paths[name]
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        timings, db, result_size, peak = measure((apppp.data_cache, main_api.response_cache), base_url, setup, call,
+                                                               args.repeat, args.memory)
+                    print(f"{name:<16} {statistics.median(timings) * 1000:>12.1f} {min(timings) * 1000:>10.1f} "
+                          f"{db['requests']:>8} {format_size(db['bytes']):>10} {format_size(result_size):>14} "
+                          f"{'-' if peak is None else f'{peak / 1024 / 1024:.1f}':>13}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
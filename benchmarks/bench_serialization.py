@@ -0,0 +1,114 @@
+"""
+Бенчмарк серіалізації відповідей main_api: процесорний час на одну відповідь зі списком товарів.
+
+Порівнюються шляхи:
+  * pydantic+json - як FastAPI з response_model до зміни: валідація записів моделлю
+    (from_attributes), перетворення в JSON-сумісні дані, json.dumps (JSONResponse);
+  * payload+json - item_payload без валідації, стандартний json (якщо orjson не встановлено);
+  * payload+orjson - item_payload без валідації, orjson (поточний шлях main_api);
+  * gzip-6 / gzip-9 - стиснення готового тіла (рівень main_api і рівень GZipMiddleware за замовчуванням);
+    br-5 - якщо встановлено brotli.
+Записи будуються з синтетичного каталогу (synthetic_catalog.py) так само, як їх будує main_api
+(records.Item.from_row), без БД і мережі.
+
+Приклади:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --items 1000,10000 --repeat 50
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from typing import List, Union
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_postgrest import FAKE_KEY
+from synthetic_catalog import generate_catalog
+
+# Клієнт Supabase створюється під час імпорту main_api, але запитів бенчмарк не робить
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", FAKE_KEY)
+os.environ.pop("LOCAL_MIRROR_PATH", None)
+
+import main_api
+from pydantic import TypeAdapter
+from records import Item as ItemRecord
+
+
+def build_records(item_count, with_sales, seed):
+    items, sales = generate_catalog(item_count, seed)
+    sales_by_item = {}
+    for sale in sales:
+        sales_by_item.setdefault(sale["item_id"], []).append(sale)
+    return [ItemRecord.from_row(row, sales_by_item.get(row["id"], []) if with_sales else None) for row in items]
+
+
+def serializers(with_sales):
+    model = List[Union[main_api.ItemWithSales, main_api.Item]] if with_sales else List[main_api.Item]
+    adapter = TypeAdapter(model)
+
+    def pydantic_json(records):
+        content = adapter.dump_python(adapter.validate_python(records, from_attributes=True), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    def payload_json(records):
+        return json.dumps(main_api.items_payload(records), ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
+
+    paths = {"pydantic+json": pydantic_json, "payload+json": payload_json}
+    if main_api.orjson is not None:
+        paths["payload+orjson"] = lambda records: main_api.orjson.dumps(main_api.items_payload(records))
+    return paths
+
+
+def cpu_per_call(func, argument, repeat):
+    """Процесорний час одного виклику в мс (мінімум із repeat вимірювань) і результат."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.process_time()
+        result = func(argument)
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", default="1000", help="кількість товарів у відповіді, через кому")
+    parser.add_argument("--repeat", type=int, default=20, help="вимірювань кожного шляху (береться мінімум)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"orjson: {'так' if main_api.orjson is not None else 'ні'}, brotli: {'так' if main_api.brotli is not None else 'ні'}")
+    for item_count in [int(count) for count in args.items.split(",") if count.strip()]:
+        for with_sales in (False, True):
+            records = build_records(item_count, with_sales, args.seed)
+            print(f"\n{item_count} товарів{' з історією продажів' if with_sales else ''}")
+            print(f"{'шлях':<16} {'CPU, мс':>9} {'розмір, КБ':>11} {'x до pydantic+json':>19}")
+            baseline = None
+            body = None
+            for name, serialize in serializers(with_sales).items():
+                cpu_ms, result = cpu_per_call(serialize, records, args.repeat)
+                baseline = baseline or cpu_ms
+                body = body or result
+                if result != body:
+                    print(f"  увага: {name} дає інше тіло, ніж pydantic+json")
+                print(f"{name:<16} {cpu_ms:>9.2f} {len(result) / 1024:>11.1f} {baseline / cpu_ms:>19.1f}")
+            compressors = {"gzip-6": lambda data: gzip.compress(data, 6, mtime=0),
+                           "gzip-9": lambda data: gzip.compress(data, 9, mtime=0)}
+            if main_api.brotli is not None:
+                compressors["br-5"] = lambda data: main_api.brotli.compress(data, quality=5)
+            for name, compress in compressors.items():
+                cpu_ms, result = cpu_per_call(compress, body, args.repeat)
+                print(f"{name:<16} {cpu_ms:>9.2f} {len(result) / 1024:>11.1f} {'':>19}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Синтетичний каталог товарів і продажів для бенчмарків.
+
+Розподіли наближені до реального складу:
+  * початкова кількість - здебільшого 1-5 одиниць, зрідка десятки;
+  * близько 40% товарів без продажів, решта - кілька продажів (зрідка десятки), проданих
+    одиниць не більше за початкову кількість;
+  * ціна продажу - собівартість одиниці з націнкою 10-100%;
+  * ~2% продажів неповні (без ціни або кількості), як старі записи в БД;
+  * країни USA / Poland / England у пропорції 6:3:1, курси як у CURRENCY_SETTINGS.
+Назви складаються зі словника, тож пошук за словом повертає реалістичну частку каталогу.
+Колонки sold_qty / remaining_qty / sales_value заповнюються так, як їх ведуть тригери
+sql/004_items_stock_columns.sql і sql/005_items_sales_summary.sql.
+Генерація детермінована для однакових (кількість, seed).
+"""
+import random
+from datetime import datetime, timedelta
+
+COUNTRIES = (("USA", "USD", 42.0), ("Poland", "PLN", 11.11), ("England", "GBP", 55.0))
+COUNTRY_WEIGHTS = (6, 3, 1)
+KINDS = ("Куртка", "Кросівки", "Сумка", "Годинник", "Навушники", "Футболка", "Рюкзак", "Окуляри",
+         "Гаманець", "Парфуми", "Кепка", "Джинси", "Светр", "Ремінь", "Чохол")
+BRANDS = ("Nike", "Adidas", "Apple", "Samsung", "Levi's", "Zara", "Puma", "Casio", "Sony", "H&M",
+          "Gucci", "Reebok", "Xiaomi", "Tommy", "Calvin")
+SHARE_WITHOUT_SALES = 0.4
+SHARE_INCOMPLETE_SALES = 0.02
+START = datetime(2023, 1, 1)
+
+
+def _geometric(rnd, mean):
+    """Ціле >= 1 з геометричного розподілу із середнім mean."""
+    count = 1
+    while rnd.random() > 1.0 / mean:
+        count += 1
+    return count
+
+
+def generate_catalog(item_count, seed=1):
+    """Повертає (items, sales): списки рядків-словників з id від 1, упорядковані за id."""
+    rnd = random.Random(seed)
+    items, sales = [], []
+    sale_id = 1
+    for item_id in range(1, item_count + 1):
+        country, currency, rate = rnd.choices(COUNTRIES, COUNTRY_WEIGHTS)[0]
+        initial_qty = min(_geometric(rnd, 2.5), 60)
+        cost_original = round(rnd.lognormvariate(3.5, 0.8), 2)
+        shipping_original = round(rnd.uniform(0, cost_original * 0.2), 2)
+        cost_uah = round((cost_original + shipping_original) * rate, 2)
+        customs_uah = round(cost_uah * rnd.choice((0.0, 0.0, 0.1, 0.2)), 2)
+        created_at = START + timedelta(minutes=item_id * 7 + rnd.randint(0, 6))
+
+        sold_qty, sales_value = 0, 0.0
+        if rnd.random() >= SHARE_WITHOUT_SALES:
+            unit_cost = (cost_uah + customs_uah) / initial_qty
+            remaining = initial_qty
+            for _ in range(min(_geometric(rnd, 1.8), initial_qty)):
+                if remaining <= 0:
+                    break
+                quantity = rnd.randint(1, min(3, remaining))
+                price = round(unit_cost * rnd.uniform(1.1, 2.0), 2)
+                if rnd.random() < SHARE_INCOMPLETE_SALES:
+                    if rnd.random() < 0.5:
+                        price = None
+                    else:
+                        quantity = None
+                sold_at = created_at + timedelta(days=rnd.randint(1, 300), minutes=rnd.randint(0, 1439))
+                sales.append({
+                    "id": sale_id,
+                    "item_id": item_id,
+                    "quantity_sold": quantity,
+                    "price_per_unit_uah": price,
+                    "sale_timestamp": sold_at.isoformat(),
+                })
+                sale_id += 1
+                if quantity is not None and price is not None:
+                    remaining -= quantity
+                    sold_qty += quantity
+                    sales_value += quantity * price
+
+        items.append({
+            "id": item_id,
+            "name": f"{rnd.choice(KINDS)} {rnd.choice(BRANDS)} {item_id}",
+            "initial_quantity": initial_qty,
+            "cost_uah": cost_uah,
+            "customs_uah": customs_uah,
+            "description": rnd.choice(("", "Новий", "Б/в, гарний стан", "Подарункова упаковка")),
+            "origin_country": country,
+            "original_currency": currency,
+            "cost_original": cost_original,
+            "shipping_original": shipping_original,
+            "rate": rate,
+            "created_at": created_at.isoformat(),
+            "updated_at": created_at.isoformat(),
+            "cost_usd": None,
+            "shipping_usd": None,
+            "sold_qty": sold_qty,
+            "remaining_qty": initial_qty - sold_qty,
+            "sales_value": round(sales_value, 2),
+        })
+    return items, sales
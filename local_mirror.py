@@ -0,0 +1,366 @@
+# local_mirror.py
+"""
+Локальна копія (read replica) таблиць items та sales у файлі SQLite.
+
+Вмикається змінною середовища LOCAL_MIRROR_PATH (шлях до файлу .sqlite3). Читання
+(apppp.load_items_from_db, apppp.get_item_by_db_id, GET /items/{id}, GET /products/) ідуть
+у локальний файл, а дані підтягуються з Supabase дельтами:
+- перша синхронізація - повне завантаження keyset-сторінками за id;
+- далі - лише рядки з updated_at (або created_at / id, якщо updated_at у таблиці немає) не старшими
+  за останній побачений, з невеликим перекриттям MIRROR_SYNC_OVERLAP на транзакції, що
+  закомітились пізніше за свій час;
+- видалені в Supabase рядки прибираються звіркою id раз на MIRROR_RECONCILE_INTERVAL секунд;
+  власні видалення процесу прибираються одразу (remove_item / remove_sale).
+Колонку updated_at з тригером додає sql/003_updated_at.sql.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from metrics import timed_execute
+from log_config import get_logger
+
+log = get_logger("local_mirror")
+
+MIRROR_PATH_ENV = "LOCAL_MIRROR_PATH"
+MIRROR_MAX_STALENESS = float(os.environ.get("LOCAL_MIRROR_MAX_STALENESS", "30"))        # секунд між дельта-синхронізаціями
+MIRROR_RECONCILE_INTERVAL = float(os.environ.get("LOCAL_MIRROR_RECONCILE_INTERVAL", "600")) # секунд між звірками id
+MIRROR_SYNC_OVERLAP = timedelta(seconds=5)
+MIRROR_PAGE_SIZE = 1000 # не більше за max-rows PostgREST
+
+MIRROR_TABLES = {
+    "items": {
+        "id": "integer primary key",
+        "name": "text",
+        "initial_quantity": "integer",
+        "cost_uah": "real",
+        "customs_uah": "real",
+        "description": "text",
+        "origin_country": "text",
+        "original_currency": "text",
+        "cost_original": "real",
+        "shipping_original": "real",
+        "rate": "real",
+        "created_at": "text",
+        "cost_usd": "real",
+        "shipping_usd": "real",
+    },
+    "sales": {
+        "id": "integer primary key",
+        "item_id": "integer",
+        "quantity_sold": "integer",
+        "price_per_unit_uah": "real",
+        "sale_timestamp": "text",
+    },
+}
+# Як sold_qty / sales_value у sql/005_items_sales_summary.sql, але з локальної таблиці sales (лише повні продажі)
+SALES_SUMMARY_COLUMNS = ", coalesce(sold.sold_qty, 0) as sold_qty, coalesce(sold.sales_value, 0.0) as sales_value"
+SALES_SUMMARY_JOIN = (" left join (select item_id, sum(quantity_sold) as sold_qty, sum(quantity_sold * price_per_unit_uah) as sales_value"
+                      " from sales where quantity_sold is not null and price_per_unit_uah is not null group by item_id) sold"
+                      " on sold.item_id = items.id")
+SYNC_COLUMNS = ("updated_at", "created_at", "id") # у порядку переваги; за id видно лише нові рядки
+EMPTY_TABLE_CURSOR = "1970-01-01T00:00:00+00:00"
+
+
+def _parse_stamp(value):
+    stamp = datetime.fromisoformat(value)
+    return stamp if stamp.tzinfo else stamp.replace(tzinfo=timezone.utc)
+
+
+def _casefold(value):
+    # Вбудована lower() SQLite змінює лише ASCII; для пошуку кирилицею потрібна Python-версія
+    return value.casefold() if isinstance(value, str) else value
+
+
+class LocalMirror:
+    """Локальна SQLite-копія items/sales з дельта-синхронізацією з Supabase. Безпечна для потоків."""
+
+    def __init__(self, path, client, max_staleness=MIRROR_MAX_STALENESS, reconcile_interval=MIRROR_RECONCILE_INTERVAL):
+        self.path = path
+        self.client = client
+        self.max_staleness = max_staleness
+        self.reconcile_interval = reconcile_interval
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0.0
+        self._last_reconcile = 0.0
+        self._sync_columns = {}
+        self._create_schema()
+
+    # --- З'єднання та схема ---
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            conn.create_function("casefold", 1, _casefold, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._conn()
+        with conn:
+            for table, columns in MIRROR_TABLES.items():
+                column_defs = ", ".join(f"{name} {kind}" for name, kind in columns.items())
+                conn.execute(f"create table if not exists {table} ({column_defs}, sync_value text)")
+            conn.execute("create index if not exists sales_item_id_idx on sales (item_id, sale_timestamp)")
+            conn.execute("create table if not exists sync_state (table_name text primary key, sync_column text, cursor text)")
+
+    # --- Синхронізація ---
+    def mark_stale(self):
+        """Позначає копію застарілою: наступне читання спершу підтягне дельту (викликати після записів)."""
+        self._last_sync = 0.0
+
+    def remove_item(self, item_id):
+        """Прибирає з копії видалений товар і його продажі (дельти видалень не бачать, а звірка рідка)."""
+        conn = self._conn()
+        with conn:
+            conn.execute("delete from sales where item_id = ?", (item_id,))
+            conn.execute("delete from items where id = ?", (item_id,))
+
+    def remove_sale(self, sale_id):
+        """Прибирає з копії видалений продаж."""
+        conn = self._conn()
+        with conn:
+            conn.execute("delete from sales where id = ?", (sale_id,))
+
+    def ensure_fresh(self):
+        """
+        Синхронізує копію, якщо з останньої синхронізації минуло більше max_staleness секунд.
+        Поки один потік синхронізує, інші читають наявні дані, якщо вони вже є.
+        Повертає True, якщо копію можна читати.
+        """
+        if time.monotonic() - self._last_sync < self.max_staleness:
+            return True
+        has_data = self._cursor("items") is not None
+        if not self._sync_lock.acquire(blocking=not has_data):
+            return True
+        try:
+            if time.monotonic() - self._last_sync >= self.max_staleness:
+                self.sync()
+            return True
+        except Exception as e:
+            log.error("Помилка синхронізації локальної копії: %s", e)
+            return has_data
+        finally:
+            self._sync_lock.release()
+
+    def sync(self):
+        """Підтягує зміни з Supabase (повне завантаження при першому запуску) і за розкладом звіряє видалення."""
+        started = time.monotonic()
+        pulled = {table: self._pull_table(table) for table in MIRROR_TABLES}
+        if started - self._last_reconcile >= self.reconcile_interval:
+            removed = {table: self._reconcile_deleted(table) for table in MIRROR_TABLES}
+            self._last_reconcile = started
+            log.info("Локальна копія: звірку id завершено, видалено рядків: %d (%s).", sum(removed.values()), removed)
+        self._last_sync = started
+        log.info("Локальна копія синхронізована за %.2f с, отримано рядків: %d (%s).", time.monotonic() - started, sum(pulled.values()), pulled)
+
+    def _cursor(self, table, sync_column=None):
+        """Курсор останньої синхронізації таблиці; None - якщо її ще не було або змінилась колонка дельт."""
+        row = self._conn().execute("select sync_column, cursor from sync_state where table_name = ?", (table,)).fetchone()
+        if row is None or (sync_column is not None and row["sync_column"] != sync_column):
+            return None
+        return row["cursor"]
+
+    def _sync_column(self, table):
+        """Перша з SYNC_COLUMNS, що є в таблиці Supabase (перевіряється одним запитом)."""
+        if table not in self._sync_columns:
+            for column in SYNC_COLUMNS:
+                try:
+                    timed_execute(self.client.table(table).select(column).limit(1), table, "mirror_probe")
+                except Exception:
+                    continue
+                self._sync_columns[table] = column
+                if column != SYNC_COLUMNS[0]:
+                    log.warning("У таблиці %s немає %s, дельти за %s не бачать змін існуючих рядків.", table, SYNC_COLUMNS[0], column)
+                break
+            else:
+                raise RuntimeError(f"У таблиці {table} немає жодної з колонок {SYNC_COLUMNS}")
+        return self._sync_columns[table]
+
+    def _pull_table(self, table):
+        sync_column = self._sync_column(table)
+        select_columns = ", ".join(list(MIRROR_TABLES[table]) + ([sync_column] if sync_column not in MIRROR_TABLES[table] else []))
+        cursor = self._cursor(table, sync_column)
+        pulled = 0
+        newest = cursor
+        if cursor is None or sync_column == "id":
+            # Повне завантаження (або дельта лише нових рядків, якщо часових колонок немає): keyset за id
+            last_id = int(cursor or 0)
+            while True:
+                rows = timed_execute(self.client.table(table).select(select_columns).gt("id", last_id).order("id").limit(MIRROR_PAGE_SIZE),
+                                     table, "mirror_full").data or []
+                newest = self._store_rows(table, rows, sync_column, newest)
+                pulled += len(rows)
+                if len(rows) < MIRROR_PAGE_SIZE:
+                    break
+                last_id = rows[-1]["id"]
+        else:
+            # Дельта: рядки зі зміною не раніше за курсор мінус перекриття; upsert ідемпотентний
+            since = (_parse_stamp(cursor) - MIRROR_SYNC_OVERLAP).isoformat()
+            offset = 0
+            while True:
+                rows = timed_execute(self.client.table(table).select(select_columns).gte(sync_column, since)
+                                     .order(sync_column).order("id").range(offset, offset + MIRROR_PAGE_SIZE - 1),
+                                     table, "mirror_delta").data or []
+                newest = self._store_rows(table, rows, sync_column, newest)
+                pulled += len(rows)
+                if len(rows) < MIRROR_PAGE_SIZE:
+                    break
+                offset += MIRROR_PAGE_SIZE
+        if newest is None:
+            newest = "0" if sync_column == "id" else EMPTY_TABLE_CURSOR
+        conn = self._conn()
+        with conn:
+            conn.execute("insert or replace into sync_state (table_name, sync_column, cursor) values (?, ?, ?)",
+                         (table, sync_column, str(newest)))
+        return pulled
+
+    def _store_rows(self, table, rows, sync_column, newest):
+        if not rows:
+            return newest
+        columns = list(MIRROR_TABLES[table])
+        placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+        values = [tuple(row.get(column) for column in columns) + (str(row.get(sync_column)),) for row in rows]
+        conn = self._conn()
+        with conn:
+            conn.executemany(f"insert or replace into {table} ({', '.join(columns)}, sync_value) values ({placeholders})", values)
+        if sync_column == "id":
+            return str(max(int(newest or 0), max(row["id"] for row in rows)))
+        for row in rows:
+            stamp = row.get(sync_column)
+            if stamp and (newest is None or _parse_stamp(stamp) > _parse_stamp(newest)):
+                newest = stamp
+        return newest
+
+    def _reconcile_deleted(self, table):
+        """Видаляє з копії рядки, яких уже немає в Supabase (запит лише колонки id, keyset-сторінками)."""
+        remote_ids = set()
+        last_id = 0
+        while True:
+            rows = timed_execute(self.client.table(table).select("id").gt("id", last_id).order("id").limit(MIRROR_PAGE_SIZE),
+                                 table, "mirror_ids").data or []
+            remote_ids.update(row["id"] for row in rows)
+            if len(rows) < MIRROR_PAGE_SIZE:
+                break
+            last_id = rows[-1]["id"]
+        conn = self._conn()
+        local_ids = {row[0] for row in conn.execute(f"select id from {table}")}
+        stale_ids = [(item_id,) for item_id in local_ids - remote_ids]
+        if stale_ids:
+            with conn:
+                conn.executemany(f"delete from {table} where id = ?", stale_ids)
+        return len(stale_ids)
+
+    # --- Читання ---
+    def _item_filter(self, search_term, after_id, stock_filter="all"):
+        conditions, params = [], []
+        if search_term:
+            conditions.append("instr(casefold(name), ?) > 0")
+            params.append(search_term.casefold())
+        if stock_filter in ("in_stock", "sold"):
+            # Як sold_qty / remaining_qty у sql/004_items_stock_columns.sql, але з локальної таблиці sales
+            sold_qty = ("coalesce((select sum(quantity_sold) from sales s where s.item_id = items.id"
+                        " and s.quantity_sold is not null and s.price_per_unit_uah is not null), 0)")
+            if stock_filter == "in_stock":
+                conditions.append(f"coalesce(initial_quantity, 0) - {sold_qty} > 0")
+            else:
+                conditions.append(f"{sold_qty} > 0")
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        return (" where " + " and ".join(conditions)) if conditions else "", params
+
+    def _attach_sales(self, items):
+        if not items:
+            return items
+        sales_by_item_id = {item["id"]: [] for item in items}
+        columns = ", ".join(MIRROR_TABLES["sales"])
+        item_ids = list(sales_by_item_id)
+        conn = self._conn()
+        for start in range(0, len(item_ids), 500): # ліміт параметрів SQLite
+            chunk = item_ids[start:start + 500]
+            query = f"select {columns} from sales where item_id in ({', '.join('?' for _ in chunk)}) order by sale_timestamp, id"
+            for row in conn.execute(query, chunk):
+                sales_by_item_id[row["item_id"]].append(dict(row))
+        for item in items:
+            item["sales_history"] = sales_by_item_id[item["id"]]
+        return items
+
+    def count_items(self, search_term=None, stock_filter="all"):
+        where, params = self._item_filter(search_term, None, stock_filter)
+        return self._conn().execute(f"select count(*) from items{where}", params).fetchone()[0]
+
+    def list_items(self, limit=None, offset=None, search_term=None, after_id=None, with_sales=False, stock_filter="all", summary=False):
+        """
+        Товари з фільтром за назвою (без урахування регістру) та наявністю ('all' / 'in_stock' / 'sold'),
+        упорядковані за id; keyset (after_id + limit) або limit/offset.
+        summary=True додає sold_qty і sales_value (як колонки з sql/005_items_sales_summary.sql).
+        """
+        where, params = self._item_filter(search_term, after_id, stock_filter)
+        columns = ", ".join(MIRROR_TABLES["items"])
+        if summary:
+            columns += SALES_SUMMARY_COLUMNS
+            where = SALES_SUMMARY_JOIN + where
+        query = f"select {columns} from items{where} order by id"
+        if limit is not None and (after_id is not None or offset is not None):
+            query += " limit ?"
+            params.append(limit)
+            if offset and after_id is None:
+                query += " offset ?"
+                params.append(offset)
+        items = [dict(row) for row in self._conn().execute(query, params)]
+        return self._attach_sales(items) if with_sales else items
+
+    def load_items(self, limit=None, offset=None, search_term=None, after_id=None, stock_filter="all", summary=False):
+        """
+        Аналог apppp.load_items_from_db: (товари з sales_history, кількість за пошуком і фільтром).
+        summary=True - замість sales_history підсумки sold_qty / sales_value.
+        """
+        items = self.list_items(limit, offset, search_term, after_id, with_sales=not summary, stock_filter=stock_filter, summary=summary)
+        return items, self.count_items(search_term, stock_filter)
+
+    def _item_columns(self, with_sales):
+        # Без історії продажів товар несе підсумки, інакше sold_qty / remaining_qty були б нульовими
+        columns = ", ".join(MIRROR_TABLES["items"])
+        return (columns, "") if with_sales else (columns + SALES_SUMMARY_COLUMNS, SALES_SUMMARY_JOIN)
+
+    def get_item(self, item_id, with_sales=True):
+        """Один товар за id (з історією продажів або, with_sales=False, з sold_qty / sales_value) або None."""
+        columns, join = self._item_columns(with_sales)
+        row = self._conn().execute(f"select {columns} from items{join} where id = ?", (item_id,)).fetchone()
+        if row is None:
+            return None
+        item = dict(row)
+        return self._attach_sales([item])[0] if with_sales else item
+
+    def get_items(self, item_ids, with_sales=True):
+        """Товари за списком id (порядок - за id), як get_item; відсутні id пропускаються."""
+        item_ids = list(dict.fromkeys(item_ids))
+        columns, join = self._item_columns(with_sales)
+        conn = self._conn()
+        items = []
+        for start in range(0, len(item_ids), 500): # ліміт параметрів SQLite
+            chunk = item_ids[start:start + 500]
+            query = f"select {columns} from items{join} where id in ({', '.join('?' for _ in chunk)}) order by id"
+            items.extend(dict(row) for row in conn.execute(query, chunk))
+        return self._attach_sales(items) if with_sales else items
+
+
+def mirror_from_env(client):
+    """Створює LocalMirror, якщо задано LOCAL_MIRROR_PATH і є клієнт Supabase; інакше None."""
+    path = os.environ.get(MIRROR_PATH_ENV)
+    if not path or client is None:
+        return None
+    try:
+        mirror = LocalMirror(path, client)
+        log.info("Локальна копія БД увімкнена: %s", path)
+        return mirror
+    except Exception as e:
+        log.error("Не вдалося відкрити локальну копію БД %s: %s", path, e)
+        return None
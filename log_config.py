@@ -0,0 +1,80 @@
+# log_config.py
+"""
+Спільне налаштування журналювання для apppp, сторінок, local_mirror і main_api.
+
+Рівень задається змінною середовища LOG_LEVEL (DEBUG / INFO / WARNING / ERROR), за замовчуванням
+WARNING: звіти про кожне завантаження (INFO) і подробиці (DEBUG) тоді не форматуються взагалі -
+повідомлення передаються з аргументами (log.info("... %s", x)), а рядок збирається лише для
+записів, що пройшли рівень.
+
+Попередження та помилки з однаковим шаблоном повідомлення (наприклад, некоректні рядки у великій
+вибірці) обмежуються: не більше LOG_RATE_LIMIT_BURST записів за LOG_RATE_LIMIT_INTERVAL секунд
+з кожного місця виклику; решта відкидається, а кількість відкинутих дописується до наступного
+пропущеного запису.
+"""
+import logging
+import os
+import threading
+import time
+
+ROOT_LOGGER = "audit"
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+LOG_RATE_LIMIT_BURST = int(os.environ.get("LOG_RATE_LIMIT_BURST", "5"))
+LOG_RATE_LIMIT_INTERVAL = float(os.environ.get("LOG_RATE_LIMIT_INTERVAL", "60"))
+
+_configure_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """Пропускає не більше burst записів рівня WARNING і вище на місце виклику за interval секунд."""
+
+    def __init__(self, burst=LOG_RATE_LIMIT_BURST, interval=LOG_RATE_LIMIT_INTERVAL):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {} # (logger, шаблон, рядок) -> [початок вікна, пропущено, відкинуто]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.name, record.msg, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                dropped = window[2] if window is not None else 0
+                window = self._windows[key] = [now, 0, 0]
+            else:
+                dropped = 0
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+            dropped += window[2]
+            window[2] = 0
+        if dropped:
+            record.msg = f"{record.msg} (пропущено ще {dropped} подібних)"
+        return True
+
+
+def configure_logging(level=None):
+    """Налаштовує логер 'audit' (один раз на процес): рівень з LOG_LEVEL, вивід у stderr, обмеження попереджень."""
+    logger = logging.getLogger(ROOT_LOGGER)
+    with _configure_lock:
+        if getattr(logger, "_audit_configured", False) and level is None:
+            return logger
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handler.addFilter(RateLimitFilter())
+        logger.handlers[:] = [handler]
+        logger.setLevel((level or os.environ.get("LOG_LEVEL") or "WARNING").upper())
+        logger.propagate = False # Streamlit і uvicorn мають власні обробники кореневого логера
+        logger._audit_configured = True
+    return logger
+
+
+def get_logger(name):
+    """Логер 'audit.<name>' зі спільним налаштуванням."""
+    configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
@@ -2,34 +2,94 @@
 from dotenv import load_dotenv # <--- ДОДАНО
 load_dotenv() # <--- ДОДАНО
 
-from fastapi import FastAPI, HTTPException
-from typing import Union, List, Optional
-from pydantic import BaseModel
-from supabase import create_client, Client
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+from typing import Union, List, Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field
 import os
+import io
+import csv
+import json
+import base64
+import gzip
+import hashlib
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import apppp
+from records import Item as ItemRecord
+from metrics import HTTP_REQUEST_SECONDS, record_cache, render_prometheus, timed_execute
+from log_config import get_logger
 
-# --- Налаштування підключення до Supabase ---
-# Тепер os.environ.get зможе прочитати значення з .env файлу
-SUPABASE_URL: str = os.environ.get("SUPABASE_URL", "YOUR_SUPABASE_URL_HERE")
-SUPABASE_KEY: str = os.environ.get("SUPABASE_KEY", "YOUR_SUPABASE_ANON_KEY_HERE")
+log = get_logger("main_api")
 
-if SUPABASE_URL == "YOUR_SUPABASE_URL_HERE" or SUPABASE_KEY == "YOUR_SUPABASE_ANON_KEY_HERE":
-    print("ПОПЕРЕДЖЕННЯ: Змінні середовища SUPABASE_URL та SUPABASE_KEY не встановлені або не завантажені з .env. Використовуються заглушки.")
-    # Для локального запуску це критично, тому можна навіть зупинити, якщо хочете
-    # raise ValueError("Необхідно встановити SUPABASE_URL та SUPABASE_KEY у файлі .env або як змінні середовища")
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Parquet-експорт необов'язковий
+    pa = None
+    pq = None
 
+try:
+    import orjson
+except ImportError: # без orjson - стандартний json (повільніше, результат той самий)
+    orjson = None
+
+try:
+    import brotli
+except ImportError: # без brotli відповіді стискаються лише gzip
+    brotli = None
+
+# --- Підключення до Supabase ---
+# Клієнт і локальна копія спільні з apppp: дані підключення - змінні середовища SUPABASE_URL / SUPABASE_KEY
+# (або файл .env, завантажений вище). Без них клієнт не створюється, і ендпоінти повертають 503.
+supabase = apppp.get_supabase()
+if supabase is not None:
+    log.info("Успішно підключено до Supabase.")
+
+
+# --- Виконання запитів до БД поза event loop ---
+# Клієнт supabase синхронний: .execute() блокує потік до відповіді. Запити виконуються в
+# обмеженому пулі потоків, а з'єднання беруться зі спільного пулу HTTP-клієнта supabase.
+DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", "16"))
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="supabase-db")
+
+async def run_db(query, table: str, operation: str):
+    """
+    Виконує запит supabase (будь-що з методом .execute()) у пулі db_executor і чекає результат асинхронно.
+    Тривалість записується в db_call_duration_seconds{table, operation} (див. GET /metrics).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, timed_execute, query, table, operation)
+
+# --- Локальна копія БД (необов'язкова, LOCAL_MIRROR_PATH) ---
+# Ендпоінти читання обслуговуються з локального SQLite-файлу, що дельтами синхронізується з Supabase.
+mirror = apppp.get_local_mirror()
+
+async def run_mirror(method, *args):
+    """
+    Виконує читання з локальної копії в пулі db_executor (синхронізація може йти в мережу).
+    Повертає (True, результат) або (False, None), якщо копія вимкнена чи недоступна - тоді читати з Supabase.
+    """
+    if mirror is None:
+        return False, None
+
+    def read():
+        if not mirror.ensure_fresh():
+            return False, None
+        return True, method(*args)
 
-supabase: Client | None = None
-# Перевіряємо, чи значення не є заглушками ПІСЛЯ спроби завантажити з .env
-if SUPABASE_URL != "YOUR_SUPABASE_URL_HERE" and SUPABASE_KEY != "YOUR_SUPABASE_ANON_KEY_HERE":
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("Успішно підключено до Supabase.")
+        result = await asyncio.get_running_loop().run_in_executor(db_executor, read)
     except Exception as e:
-        print(f"Помилка підключення до Supabase: {e}")
-else:
-    print("Не вдалося ініціалізувати клієнт Supabase через відсутність URL або ключа.")
+        log.warning("Помилка читання локальної копії, запит до Supabase: %s", e)
+        result = False, None
+    record_cache("local_mirror", result[0])
+    return result
 
 
 # --- Моделі Pydantic ---
@@ -48,13 +108,363 @@ class ItemBase(BaseModel):
 class Item(ItemBase):
     id: int
     created_at: Optional[datetime] = None
+    sold_qty: Optional[int] = None      # підтримуються тригерами, sql/004_items_stock_columns.sql
+    remaining_qty: Optional[int] = None
+    sales_value: Optional[float] = None # sql/005_items_sales_summary.sql
+
+    model_config = ConfigDict(from_attributes=True) # відповіді будуються з records.Item (атрибути, а не словники)
+
+class Sale(BaseModel):
+    id: int
+    item_id: int
+    quantity_sold: Optional[int] = None
+    price_per_unit_uah: Optional[float] = None
+    sale_timestamp: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ItemWithSales(Item):
+    sales_history: List[Sale] # лише якщо історію завантажено (include_sales=true)
+
+# Товар і його продажі одним запитом: вкладений ресурс sales (зв'язок sales.item_id -> items.id)
+ITEM_WITH_SALES_SELECT = "*, sales(id, item_id, quantity_sold, price_per_unit_uah, sale_timestamp)"
+
+class ItemCreate(BaseModel):
+    name: str = Field(min_length=1)
+    initial_quantity: int = Field(gt=0)
+    origin_country: Literal[tuple(apppp.CURRENCY_SETTINGS)] = "USA"
+    cost_original: float = Field(ge=0)
+    shipping_original: float = Field(0.0, ge=0)
+    rate: Optional[float] = Field(None, gt=0) # якщо не вказано - курс за замовчуванням для країни
+    customs_uah: float = Field(0.0, ge=0)
+    description: Optional[str] = ""
+
+class SaleCreate(BaseModel):
+    quantity_sold: int = Field(gt=0)
+    price_per_unit_uah: float = Field(ge=0)
+
+class BulkInsertResult(BaseModel):
+    inserted: int
+
+class StatsSummary(BaseModel):
+    item_count: int = 0
+    items_with_sales: int = 0
+    items_without_sales: int = 0
+    total_units: int = 0
+    units_sold: int = 0
+    expenses: float = 0.0
+    income: float = 0.0
+    profit: float = 0.0
+    remaining_value: float = 0.0
+
+
+# --- Серіалізація і стиснення відповідей ---
+# JSON серіалізує orjson (у кілька разів швидше за json), якщо його встановлено. Товари у відповідях
+# будуються з records.Item, типи якого вже приведені під час завантаження (records.Item.from_row),
+# тож повторна валідація pydantic-моделями для них пропускається (item_payload); моделі Item /
+# ItemWithSales описують формат відповіді в OpenAPI. Великі відповіді стискаються: br (якщо є
+# пакет brotli) або gzip - кешовані у cached_json_response, решта (експорт) - GZipMiddleware.
+GZIP_MIN_SIZE = 1024 # байтів; менші відповіді не стискаються
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def dumps_json(content) -> bytes:
+    """JSON у UTF-8 без пробілів між елементами - той самий формат, що й у JSONResponse."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """Клас відповіді за замовчуванням: серіалізація через dumps_json."""
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Кодування стиснення з Accept-Encoding: 'br', 'gzip' або None (q=0 означає відмову)."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        _, has_q, quality = params.replace(" ", "").partition("q=")
+        try:
+            if has_q and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+ITEM_RESPONSE_FIELDS = tuple(Item.model_fields)
+SALE_RESPONSE_FIELDS = tuple(Sale.model_fields)
+
+def item_payload(record: ItemRecord) -> dict:
+    """Товар у форматі Item (з історією продажів - ItemWithSales) без валідації pydantic."""
+    payload = {name: getattr(record, name) for name in ITEM_RESPONSE_FIELDS}
+    if record.sales_history is not None:
+        payload["sales_history"] = [{name: getattr(sale, name) for name in SALE_RESPONSE_FIELDS}
+                                    for sale in record.sales_history]
+    return payload
+
+def items_payload(records) -> list:
+    return [item_payload(record) for record in records]
+
+
+# --- Кеш відповідей ендпоінтів читання ---
+# Готові тіла відповідей (JSON) кешуються в процесі за шляхом і параметрами запиту: TTL і LRU-обмеження
+# кількості записів. Кожна відповідь має ETag; клієнт, що надсилає If-None-Match з тим самим ETag,
+# отримує 304 без тіла. Теги записів - як у кеші apppp: запис через API скидає відповіді, яких він
+# стосується; зміни, зроблені в обхід API (застосунок Streamlit), стають видимими після TTL.
+RESPONSE_CACHE_TTL: float = float(os.environ.get("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES: int = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+response_cache = apppp.TaggedCache(max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+
+def response_cache_key(request: Request):
+    return request.url.path, tuple(sorted(request.query_params.multi_items()))
 
-    class Config:
-        orm_mode = True
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """Сильний ETag стисненого представлення: інші байти - інший ETag (br / gzip / без стиснення)."""
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Чи є etag серед значень If-None-Match (порівняння без урахування W/, як для GET)."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+# Одночасні однакові запити (той самий ключ кешу) чекають на одне читання з БД, а не роблять кожен своє.
+# Читання виконується окремою задачею: якщо клієнт, що його почав, від'єднається, решта все одно отримає результат.
+_inflight_reads = {}
+
+def _forget_inflight(key, task):
+    if _inflight_reads.get(key) is task:
+        del _inflight_reads[key]
+    if not task.cancelled():
+        task.exception() # виняток уже отримали ті, хто чекав; інакше asyncio попереджає про "never retrieved"
+
+async def single_flight(key, compute):
+    """Результат await compute(), спільний для всіх одночасних викликів з однаковим key."""
+    task = _inflight_reads.get(key)
+    record_cache("api_single_flight", task is not None)
+    if task is None:
+        task = asyncio.ensure_future(compute())
+        _inflight_reads[key] = task
+        task.add_done_callback(lambda done: _forget_inflight(key, done))
+    return await asyncio.shield(task)
+
+async def cached_json_response(request: Request, load, serialize, tags) -> Response:
+    """
+    Відповідь із кешу відповідей або, при промаху, await load(headers) -> вміст, serialize(вміст) -> JSON-сумісні дані.
+    load може дописати заголовки відповіді в headers (X-Total-Count, X-Next-Cursor) - вони кешуються разом із тілом.
+    tags(вміст) - теги запису кешу. Винятки (HTTPException) не кешуються.
+    Стиснене тіло (br / gzip, за Accept-Encoding) теж кешується - стискання один раз на запис кешу.
+    """
+    key = response_cache_key(request)
+    found, entry = response_cache.get(key)
+    record_cache("api_response", found)
+    if not found:
+        async def build_entry():
+            generation = response_cache.generation
+            headers = {}
+            content = await load(headers)
+            body = dumps_json(serialize(content))
+            # Vary на кожній відповіді (і на 304): тіло буває стисненим і ні, ETag - свій для кожного кодування
+            entry = body, {**headers, "ETag": make_etag(body), "Vary": "Accept-Encoding"}, {}
+            response_cache.set(key, entry, RESPONSE_CACHE_TTL, tags(content), generation)
+            return entry
+        # Покоління в ключі: після запису через API нові запити не приєднуються до старішого читання
+        entry = await single_flight((response_cache.generation, key), build_entry)
+    body, headers, encoded_bodies = entry
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", "")) if len(body) >= GZIP_MIN_SIZE else None
+    headers = {**headers, "ETag": encoded_etag(headers["ETag"], encoding)}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(body, media_type="application/json", headers=headers)
+    if encoding not in encoded_bodies:
+        encoded_bodies[encoding] = compress_body(body, encoding)
+    return Response(encoded_bodies[encoding], media_type="application/json",
+                    headers={**headers, "Content-Encoding": encoding})
+
+def item_tags(records) -> set:
+    return {apppp.item_tag(record.id) for record in records}
+
+
+# --- Курсори keyset-пагінації ---
+def encode_cursor(after_id: int) -> str:
+    """Кодує ID останнього товару сторінки в непрозорий токен наступної сторінки."""
+    payload = json.dumps({"after_id": after_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """Розкодовує токен сторінки у after_id. Некоректний токен -> HTTP 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["after_id"]
+        return int(after_id)
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Некоректний курсор сторінки")
+
+
+# --- Масове додавання товарів ---
+BULK_MAX_ROWS = 20000 # рядків на один POST /items/bulk; вставка - пакетами по apppp.BULK_INSERT_CHUNK_SIZE
+
+def item_create_to_row(item: "ItemCreate") -> dict:
+    return apppp.item_row(item.model_dump())
+
+
+# --- Потоковий експорт таблиць ---
+EXPORT_PAGE_SIZE = 1000 # рядків на один запит до БД (не більше за max-rows PostgREST)
+
+EXPORT_TABLE_COLUMNS = {
+    "items": ["id", "name", "initial_quantity", "cost_uah", "customs_uah", "description", "origin_country",
+              "original_currency", "cost_original", "shipping_original", "rate", "created_at", "cost_usd", "shipping_usd"],
+    "sales": ["id", "item_id", "quantity_sold", "price_per_unit_uah", "sale_timestamp"],
+}
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def parquet_schema(table: str):
+    """Явна схема Parquet, щоб усі row group мали однакові типи незалежно від NULL у сторінці."""
+    if table == "items":
+        return pa.schema([
+            ("id", pa.int64()), ("name", pa.string()), ("initial_quantity", pa.int64()),
+            ("cost_uah", pa.float64()), ("customs_uah", pa.float64()), ("description", pa.string()),
+            ("origin_country", pa.string()), ("original_currency", pa.string()),
+            ("cost_original", pa.float64()), ("shipping_original", pa.float64()), ("rate", pa.float64()),
+            ("created_at", pa.string()), ("cost_usd", pa.float64()), ("shipping_usd", pa.float64()),
+        ])
+    return pa.schema([
+        ("id", pa.int64()), ("item_id", pa.int64()), ("quantity_sold", pa.int64()),
+        ("price_per_unit_uah", pa.float64()), ("sale_timestamp", pa.string()),
+    ])
+
+def iter_table_pages(table: str, columns: List[str], page_size: int = EXPORT_PAGE_SIZE):
+    """Читає всю таблицю сторінками за id (keyset); у пам'яті одночасно лише одна сторінка."""
+    last_id = 0
+    while True:
+        rows = timed_execute(supabase.table(table).select(", ".join(columns)).gt("id", last_id).order("id").limit(page_size),
+                             table, "export").data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+def stream_csv(pages, columns: List[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for rows in pages:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def stream_ndjson(pages, columns: List[str]):
+    for rows in pages:
+        yield "".join(json.dumps({column: row.get(column) for column in columns}, ensure_ascii=False, default=str) + "\n"
+                      for row in rows).encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Файлоподібний приймач для ParquetWriter: віддає записані байти порціями, але tell() рахує загальний зсув."""
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_parquet(pages, table: str):
+    schema = parquet_schema(table)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in pages:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema)) # одна сторінка = один row group
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def export_table_response(table: str, format: str) -> StreamingResponse:
+    if not supabase:
+        raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    if format == "parquet" and pq is None:
+        raise HTTPException(status_code=501, detail="Експорт у Parquet потребує пакета pyarrow")
+    columns = EXPORT_TABLE_COLUMNS[table]
+    pages = iter_table_pages(table, columns)
+    if format == "csv":
+        body = stream_csv(pages, columns)
+    elif format == "ndjson":
+        body = stream_ndjson(pages, columns)
+    else:
+        body = stream_parquet(pages, table)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    db_executor.shutdown(wait=False, cancel_futures=True)
 
 
 # Створюємо екземпляр FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Стиснення решти відповідей (експорт CSV / NDJSON - потоково, порціями); Parquet уже стиснений.
+# Додається до record_request_latency, тож працює всередині неї і бачить відповіді без її потокової обгортки.
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL,
+                   exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + (EXPORT_MEDIA_TYPES["parquet"],))
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Тривалість запиту в http_request_duration_seconds{method, route, status}; route - шаблон шляху, а не URL."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, request.method,
+                                     route.path if route is not None else "unmatched", str(status))
 
 # --- Ендпоінти API ---
 
@@ -62,50 +472,326 @@ app = FastAPI()
 async def read_root():
     return {"message": "Вітаю у вашому FastAPI додатку для обліку товарів!"}
 
-@app.get("/items/{item_id}", response_model=Optional[Item])
-async def read_item_from_db(item_id: int):
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """Метрики процесу у текстовому форматі Prometheus (metrics.py)."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/items/{item_id}", response_model=Union[ItemWithSales, Item])
+async def read_item_from_db(request: Request, item_id: int, include_sales: bool = False):
     """
     Отримує конкретний товар з бази даних Supabase за його ID.
+    include_sales=true - разом з історією продажів (sales_history), тим самим одним запитом.
+    Відповідь кешується (див. cached_json_response), підтримується If-None-Match.
     """
     if not supabase:
         raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
-    try:
-        response = supabase.table("items").select("*").eq("id", item_id).maybe_single().execute()
-        if response.data:
-            return response.data
-        else:
+    return await cached_json_response(request, lambda headers: load_item(item_id, include_sales), item_payload,
+                                      lambda record: {apppp.item_tag(item_id)})
+
+async def load_item(item_id: int, include_sales: bool, use_mirror: bool = True):
+    """Товар за id; use_mirror=False - прямо з Supabase (перевірки залишку перед записом)."""
+    from_mirror, item = await run_mirror(mirror.get_item, item_id, include_sales) if mirror and use_mirror else (False, None)
+    if from_mirror:
+        if item is None:
             raise HTTPException(status_code=404, detail="Товар не знайдено")
+        return ItemRecord.from_row(item, item['sales_history'] if include_sales else None)
+    query = supabase.table("items").select(ITEM_WITH_SALES_SELECT if include_sales else "*").eq("id", item_id)
+    if include_sales:
+        query = query.order("sale_timestamp", foreign_table="sales")
+    try:
+        response = await run_db(query.maybe_single(), "items", "select_with_sales" if include_sales else "select")
     except Exception as e:
-        print(f"Помилка отримання товару з БД: {e}")
+        log.error("Помилка отримання товару з БД: %s", e)
         raise HTTPException(status_code=500, detail=f"Помилка сервера при отриманні товару: {str(e)}")
+    # maybe_single() повертає None замість відповіді, якщо рядка немає
+    if response is not None and response.data:
+        return ItemRecord.from_row(response.data, (response.data.get("sales") or []) if include_sales else None)
+    raise HTTPException(status_code=404, detail="Товар не знайдено")
+
+
+BATCH_MAX_IDS = 200 # id на один запит GET /items (довжина URL до PostgREST)
+
+def parse_ids(ids: str) -> List[int]:
+    """'1,2,3' -> [1, 2, 3] без повторів, у порядку запиту."""
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids - список цілих чисел через кому")
+    parsed = list(dict.fromkeys(parsed))
+    if not parsed:
+        raise HTTPException(status_code=422, detail="Потрібен хоча б один id")
+    if len(parsed) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"Не більше {BATCH_MAX_IDS} id за запит")
+    return parsed
+
+@app.get("/items", response_model=List[Union[ItemWithSales, Item]])
+async def read_items_batch(request: Request, ids: str, include_sales: bool = False):
+    """
+    Кілька товарів за один запит: GET /items?ids=1,2,3 (з include_sales=true - з історією продажів).
+    Товари повертаються в порядку ids; неіснуючі id пропускаються.
+    """
+    if not supabase:
+        raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    item_ids = parse_ids(ids)
+
+    def tags(records):
+        # Відсутні id можуть з'явитися після додавання товарів - тоді відповідь скидається разом зі списками
+        found_all = len(records) == len(item_ids)
+        return {apppp.item_tag(item_id) for item_id in item_ids} | (set() if found_all else {apppp.TAG_ITEM_LISTS})
+
+    return await cached_json_response(request, lambda headers: load_items_batch(item_ids, include_sales), items_payload, tags)
+
+async def load_items_batch(item_ids: List[int], include_sales: bool):
+    from_mirror, rows = await run_mirror(mirror.get_items, item_ids, include_sales) if mirror else (False, None)
+    if from_mirror:
+        records = [ItemRecord.from_row(row, row["sales_history"] if include_sales else None) for row in rows]
+    else:
+        query = supabase.table("items").select(ITEM_WITH_SALES_SELECT if include_sales else "*").in_("id", item_ids)
+        if include_sales:
+            query = query.order("sale_timestamp", foreign_table="sales")
+        try:
+            response = await run_db(query, "items", "select_with_sales" if include_sales else "select")
+        except Exception as e:
+            log.error("Помилка отримання товарів з БД: %s", e)
+            raise HTTPException(status_code=500, detail=f"Помилка сервера при отриманні товарів: {str(e)}")
+        records = [ItemRecord.from_row(row, (row.get("sales") or []) if include_sales else None) for row in response.data or []]
+    records_by_id = {record.id: record for record in records if record is not None}
+    return [records_by_id[item_id] for item_id in item_ids if item_id in records_by_id]
 
 
 @app.get("/products/", response_model=List[Item])
-async def get_products_from_db(skip: int = 0, limit: int = 20, search: Optional[str] = None):
+async def get_products_from_db(request: Request, skip: int = 0, limit: int = 20, search: Optional[str] = None,
+                               after_id: Optional[int] = None, cursor: Optional[str] = None,
+                               stock: Literal["all", "in_stock", "sold"] = "all"):
     """
     Отримує список товарів з бази даних Supabase з пагінацією та пошуком.
+    Keyset-режим: передайте after_id або cursor (токен із заголовка X-Next-Cursor
+    попередньої відповіді) - тоді skip ігнорується, і глибокі сторінки не сповільнюються.
+    Пошук (search) виконується RPC search_items по триграмному індексу, результати впорядковані
+    за релевантністю, пагінація - лише через skip/limit (after_id/cursor з search -> 400,
+    X-Next-Cursor не повертається); загальна кількість - у заголовку X-Total-Count.
+    stock: in_stock - лише товари із залишком, sold - лише з продажами; фільтр виконує БД
+    (колонки remaining_qty / sold_qty), тож сторінки повні.
+    З увімкненою локальною копією (LOCAL_MIRROR_PATH) відповідь читається з неї, пошук - підрядок за id.
+    Відповідь кешується (див. cached_json_response), підтримується If-None-Match.
     """
     if not supabase:
         raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    if search and (after_id is not None or cursor is not None):
+        raise HTTPException(status_code=400, detail="Пошук пагінується через skip/limit; after_id і cursor з search не підтримуються")
+    if cursor is not None:
+        after_id = decode_cursor(cursor)
+    return await cached_json_response(
+        request, lambda headers: load_products(headers, skip, limit, search, after_id, stock), items_payload,
+        lambda records: item_tags(records) | {apppp.TAG_ITEM_LISTS})
+
+async def load_products(headers: dict, skip: int, limit: int, search: Optional[str], after_id: Optional[int], stock: str):
+    if mirror is not None:
+        from_mirror, items = await run_mirror(mirror.list_items, limit, skip, search, after_id, False, stock, True)
+        if from_mirror:
+            if search:
+                _, total_count = await run_mirror(mirror.count_items, search, stock)
+                headers["X-Total-Count"] = str(total_count)
+            elif len(items) >= limit:
+                headers["X-Next-Cursor"] = encode_cursor(items[-1]["id"])
+            return [ItemRecord.from_row(row) for row in items]
+    if search:
+        try:
+            rpc_params = {"search_term": search, "result_limit": limit, "result_offset": skip}
+            if stock != "all":
+                rpc_params["stock_filter"] = stock
+            rpc_response = await run_db(supabase.rpc("search_items", rpc_params), "search_items", "rpc")
+            payload = rpc_response.data[0] if isinstance(rpc_response.data, list) and rpc_response.data else rpc_response.data
+            headers["X-Total-Count"] = str(int(payload.get("total_count") or 0))
+            return [ItemRecord.from_row(row) for row in payload.get("items") or []]
+        except Exception as e:
+            log.warning("Ранжований пошук недоступний, використовується ilike: %s", e)
     try:
         query = supabase.table("items").select("*")
 
         if search:
             query = query.ilike('name', f'%{search}%')
+        if stock == "in_stock":
+            query = query.gt('remaining_qty', 0)
+        elif stock == "sold":
+            query = query.gt('sold_qty', 0)
 
-        query = query.range(skip, skip + limit - 1)
+        if after_id is not None:
+            query = query.gt('id', after_id).limit(limit)
+        else:
+            query = query.range(skip, skip + limit - 1)
         
-        response = query.order('id').execute()
+        db_response = await run_db(query.order('id'), "items", "select")
         
-        if response.data:
-            return response.data
+        if db_response.data:
+            if not search and len(db_response.data) >= limit:
+                headers["X-Next-Cursor"] = encode_cursor(db_response.data[-1]["id"])
+            return [ItemRecord.from_row(row) for row in db_response.data]
         else:
             return []
             
     except Exception as e:
-        print(f"Помилка отримання списку товарів з БД: {e}")
+        log.error("Помилка отримання списку товарів з БД: %s", e)
         raise HTTPException(status_code=500, detail=f"Помилка сервера при отриманні списку товарів: {str(e)}")
 
+@app.get("/stats/summary", response_model=StatsSummary)
+async def get_stats_summary():
+    """
+    Повертає агреговану статистику складу (одиниці, продажі, витрати, дохід, прибуток,
+    вартість залишку). Розрахунок виконує БД (функція stats_summary, sql/001_stats_summary.sql),
+    тож розмір відповіді та час не залежать від кількості товарів і продажів.
+    """
+    if not supabase:
+        raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    try:
+        response = await run_db(supabase.rpc("stats_summary", {}), "stats_summary", "rpc")
+    except Exception as e:
+        log.error("Помилка отримання статистики з БД: %s", e)
+        raise HTTPException(status_code=500, detail=f"Помилка сервера при отриманні статистики: {str(e)}")
+    summary = response.data[0] if isinstance(response.data, list) and response.data else response.data
+    if not isinstance(summary, dict):
+        raise HTTPException(status_code=500, detail="Некоректна відповідь stats_summary")
+    return {key: value for key, value in summary.items() if value is not None}
+
+@app.post("/items/bulk", response_model=BulkInsertResult, status_code=201)
+async def create_items_bulk(items: List[ItemCreate]):
+    """
+    Додає багато товарів одним запитом (наприклад, рядки накладної постачальника).
+    cost_uah рахується для кожного рядка; вставка - apppp.insert_items_in_batches (пакетами по
+    apppp.BULK_INSERT_CHUNK_SIZE рядків, як імпорт на сторінці без API).
+    Якщо пакет не вдалося вставити, попередні пакети залишаються збереженими (див. detail).
+    """
+    if not supabase:
+        raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    if len(items) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Забагато рядків в одному запиті (максимум {BULK_MAX_ROWS})")
+    if any(not item.name.strip() for item in items):
+        raise HTTPException(status_code=422, detail="Назва товару не може бути порожньою")
+
+    rows = [item_create_to_row(item) for item in items]
+    # insert_items_in_batches сама скидає кеш apppp і локальну копію після вставки
+    inserted, error = await asyncio.get_running_loop().run_in_executor(db_executor, apppp.insert_items_in_batches, rows)
+    if inserted:
+        response_cache.invalidate(apppp.TAG_ITEM_LISTS) # нові товари з'являються в списках і пошуку
+    if error is not None:
+        log.error("Помилка пакетного додавання товарів: %s", error)
+        raise HTTPException(status_code=500, detail=f"Помилка вставки: {error} (вже вставлено: {inserted})")
+    return {"inserted": inserted}
+
+
+# --- Зміна товарів і продажів ---
+# Після кожного запису скидаються відповіді з цим товаром і списки (товар міг з'явитися у фільтрі
+# наявності чи зникнути з нього), а також кеш apppp і локальна копія цього процесу.
+def invalidate_item_responses(item_id: int, removed: bool = False, removed_sale_id: Optional[int] = None):
+    response_cache.invalidate(apppp.item_tag(item_id), apppp.TAG_ITEM_LISTS)
+    apppp.invalidate_after_item_changed(item_id, removed, removed_sale_id)
+
+async def run_db_checked(query, table: str, operation: str, action: str):
+    """
+    run_db, де помилка БД перетворюється на HTTP 500 з описом дії; порушення обмеження залишку
+    (одночасний продаж з іншого процесу, sql/006_items_remaining_qty_check.sql) - на 409.
+    """
+    try:
+        return await run_db(query, table, operation)
+    except Exception as e:
+        if getattr(e, "code", None) == apppp.STOCK_CHECK_VIOLATION:
+            raise HTTPException(status_code=409, detail=apppp.STOCK_CHECK_MESSAGE)
+        log.error("Помилка %s: %s", action, e)
+        raise HTTPException(status_code=500, detail=f"Помилка сервера при {action}: {str(e)}")
+
+@app.put("/items/{item_id}", response_model=Item)
+async def update_item(item_id: int, item: ItemCreate):
+    """
+    Оновлює поля товару (як у формі редагування); cost_uah і валюта перераховуються.
+    Початкова кількість не може бути меншою за вже продану (409).
+    """
+    if not supabase:
+        raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    if not item.name.strip():
+        raise HTTPException(status_code=422, detail="Назва товару не може бути порожньою")
+    current = await load_item(item_id, True, use_mirror=False)
+    if item.initial_quantity < current.sold_qty:
+        raise HTTPException(status_code=409, detail=f"Початкова кількість менша за продану ({current.sold_qty})")
+    response = await run_db_checked(supabase.table("items").update(item_create_to_row(item)).eq("id", item_id),
+                              "items", "update", "оновленні товару")
+    invalidate_item_responses(item_id)
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Товар не знайдено")
+    return ItemRecord.from_row(response.data[0])
+
+@app.delete("/items/{item_id}", status_code=204)
+async def delete_item(item_id: int):
+    """Видаляє товар разом з усією історією його продажів."""
+    if not supabase:
+        raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    await run_db_checked(supabase.table("sales").delete(returning="minimal").eq("item_id", item_id), "sales", "delete", "видаленні продажів товару")
+    response = await run_db_checked(supabase.table("items").delete().eq("id", item_id), "items", "delete", "видаленні товару")
+    invalidate_item_responses(item_id, removed=True)
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Товар не знайдено")
+    return Response(status_code=204)
+
+@app.post("/items/{item_id}/sales", response_model=Sale, status_code=201)
+async def create_sale(item_id: int, sale: SaleCreate):
+    """Реєструє продаж товару. Кількість не може перевищувати залишок (409)."""
+    if not supabase:
+        raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    item = await load_item(item_id, True, use_mirror=False)
+    remaining = item.remaining_qty
+    if sale.quantity_sold > remaining:
+        raise HTTPException(status_code=409, detail=f"Недостатньо товару: доступно {remaining} од.")
+    row = {"item_id": item_id, "quantity_sold": sale.quantity_sold, "price_per_unit_uah": sale.price_per_unit_uah,
+           "sale_timestamp": datetime.now().isoformat()}
+    response = await run_db_checked(supabase.table("sales").insert(row), "sales", "insert", "реєстрації продажу")
+    invalidate_item_responses(item_id)
+    return response.data[0]
+
+@app.put("/sales/{sale_id}", response_model=Sale)
+async def update_sale(sale_id: int, sale: SaleCreate):
+    """Змінює кількість і ціну продажу. Разом з іншими продажами кількість не може перевищувати початкову (409)."""
+    if not supabase:
+        raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    found = await run_db_checked(supabase.table("sales").select("item_id").eq("id", sale_id).maybe_single(),
+                           "sales", "select", "отриманні продажу")
+    if found is None or not found.data:
+        raise HTTPException(status_code=404, detail="Продаж не знайдено")
+    item_id = found.data["item_id"]
+    item = await load_item(item_id, True, use_mirror=False)
+    allowed = (item.initial_quantity or 0) - item.sold_qty_excluding(sale_id)
+    if sale.quantity_sold > allowed:
+        raise HTTPException(status_code=409, detail=f"Максимально допустима кількість для цього продажу: {allowed}")
+    response = await run_db_checked(supabase.table("sales").update(sale.model_dump()).eq("id", sale_id),
+                              "sales", "update", "оновленні продажу")
+    invalidate_item_responses(item_id)
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Продаж не знайдено")
+    return response.data[0]
+
+@app.delete("/sales/{sale_id}", status_code=204)
+async def delete_sale(sale_id: int):
+    """Видаляє запис про продаж."""
+    if not supabase:
+        raise HTTPException(status_code=503, detail="Сервіс бази даних недоступний (клієнт не ініціалізовано)")
+    response = await run_db_checked(supabase.table("sales").delete().eq("id", sale_id), "sales", "delete", "видаленні продажу")
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Продаж не знайдено")
+    invalidate_item_responses(response.data[0]["item_id"], removed_sale_id=sale_id)
+    return Response(status_code=204)
+
+@app.get("/export/items")
+def export_items(format: Literal["csv", "parquet", "ndjson"] = "csv"):
+    """
+    Потоковий експорт усіх товарів (csv / parquet / ndjson). Дані читаються з БД сторінками
+    по EXPORT_PAGE_SIZE рядків і одразу віддаються клієнту, без буферизації всього набору.
+    """
+    return export_table_response("items", format)
+
+@app.get("/export/sales")
+def export_sales(format: Literal["csv", "parquet", "ndjson"] = "csv"):
+    """Потоковий експорт усіх продажів (csv / parquet / ndjson), сторінками за id."""
+    return export_table_response("sales", format)
+
 # Щоб запустити цей додаток:
 # 1. Створіть файл .env у корені проекту з вашими SUPABASE_URL та SUPABASE_KEY
 # 2. Виконайте в терміналі: uvicorn main_api:app --reload
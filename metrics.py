@@ -0,0 +1,157 @@
+# metrics.py
+"""
+Метрики процесу у форматі Prometheus (текстовий формат експозиції) без зовнішніх залежностей.
+
+  * db_call_duration_seconds{table, operation} - гістограма тривалості запитів до Supabase
+    (кількість викликів - її _count);
+  * db_call_errors_total{table, operation} - запити, що завершились винятком;
+  * http_request_duration_seconds{method, route, status} - гістограма тривалості запитів до main_api;
+  * cache_requests_total{cache, result} - звернення до кешів, result = hit / miss.
+
+timed_execute(query, table, operation) виконує запит supabase і записує його тривалість;
+recent_db_calls - останні запити (для панелі діагностики на бічній панелі Streamlit).
+render_prometheus() - текст для GET /metrics.
+"""
+import threading
+import time
+from collections import deque
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_DB_CALLS = 200
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_labels_text(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {} # значення міток -> [лічильники кошиків..., сума, кількість]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        """Значення міток -> (кумулятивні лічильники кошиків, сума, кількість)."""
+        with self._lock:
+            return {labels: (tuple(series[:-2]), series[-2], series[-1]) for labels, series in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (bucket_counts, total, count) in sorted(self.snapshot().items()):
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f"{self.name}_bucket{_labels_text(self.labels, label_values, [('le', bound)])} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_labels_text(self.labels, label_values, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{_labels_text(self.labels, label_values)} {count}")
+        return lines
+
+
+DB_CALL_SECONDS = Histogram("db_call_duration_seconds", "Тривалість запитів до Supabase.", ("table", "operation"))
+DB_CALL_ERRORS = Counter("db_call_errors_total", "Запити до Supabase, що завершились помилкою.", ("table", "operation"))
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Тривалість обробки запитів до API.", ("method", "route", "status"))
+CACHE_REQUESTS = Counter("cache_requests_total", "Звернення до кешів: hit - значення з кешу, miss - обчислено заново.", ("cache", "result"))
+REGISTRY = (DB_CALL_SECONDS, DB_CALL_ERRORS, HTTP_REQUEST_SECONDS, CACHE_REQUESTS)
+
+# Останні запити до БД: (час завершення, таблиця, операція, тривалість у секундах, успіх)
+recent_db_calls = deque(maxlen=RECENT_DB_CALLS)
+
+
+def observe_db_call(table, operation, seconds, ok=True):
+    DB_CALL_SECONDS.observe(seconds, table, operation)
+    if not ok:
+        DB_CALL_ERRORS.inc(table, operation)
+    recent_db_calls.append((time.time(), table, operation, seconds, ok))
+
+
+def timed_execute(query, table, operation):
+    """query.execute() із записом тривалості в db_call_duration_seconds{table, operation}."""
+    started = time.perf_counter()
+    ok = False
+    try:
+        response = query.execute()
+        ok = True
+        return response
+    finally:
+        observe_db_call(table, operation, time.perf_counter() - started, ok)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def db_call_summary():
+    """Рядки для таблиці діагностики: таблиця, операція, кількість, помилки, середня тривалість у мс."""
+    errors = DB_CALL_ERRORS.snapshot()
+    rows = []
+    for (table, operation), (_, total, count) in sorted(DB_CALL_SECONDS.snapshot().items()):
+        rows.append({
+            "table": table,
+            "operation": operation,
+            "calls": count,
+            "errors": errors.get((table, operation), 0),
+            "avg_ms": round(total / count * 1000, 1) if count else 0.0,
+        })
+    return rows
+
+
+def cache_summary():
+    """Рядки для таблиці діагностики: кеш, влучання, промахи, частка влучань."""
+    counts = {}
+    for (cache, result), value in CACHE_REQUESTS.snapshot().items():
+        counts.setdefault(cache, {"hit": 0, "miss": 0})[result] = value
+    return [{
+        "cache": cache,
+        "hits": values["hit"],
+        "misses": values["miss"],
+        "hit_ratio": round(values["hit"] / (values["hit"] + values["miss"]), 3) if values["hit"] + values["miss"] else 0.0,
+    } for cache, values in sorted(counts.items())]
+
+
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -3,15 +3,13 @@ from datetime import datetime
 # Імпортуємо весь модуль apppp
 try:
     import apppp
+    import app_ui
+    import api_client
 except ImportError:
     st.error("Помилка імпорту: Не вдалося знайти основний файл 'apppp.py'. Переконайтесь, що він існує в кореневій папці.")
     st.stop()
 
-# Словник для налаштувань валют (можна залишити тут або перенести в apppp.py)
-CURRENCY_SETTINGS = {
-    "USA": {"symbol": "$", "code": "USD", "default_rate": 42.0, "rate_label": "Курс $/грн*"},
-    "Poland": {"symbol": "zł", "code": "PLN", "default_rate": 11.11, "rate_label": "Курс zł/грн*"}
-}
+app_ui.setup_page()
 
 def display_add_item_form():
     """Відображає форму для додавання нового товару з вибором країни/валюти."""
@@ -45,7 +43,8 @@ def display_add_item_form():
 
         submitted = st.form_submit_button("Додати товар")
         if submitted:
-            if not apppp.supabase:
+            client = app_ui.get_api_client()
+            if client is None and not apppp.get_supabase():
                 st.error("Немає підключення до бази даних для додавання товару.")
                 return
 
@@ -78,6 +77,26 @@ def display_add_item_form():
             # --- Кінець оновленої валідації ---
 
 
+            if client is not None:
+                # Через main_api: валюта і вартість у гривнях обчислюються на сервері
+                try:
+                    client.create_item({
+                        "name": name,
+                        "initial_quantity": int(initial_quantity),
+                        "origin_country": selected_country,
+                        "cost_original": cost_original,
+                        "shipping_original": shipping_original,
+                        "rate": rate,
+                        "customs_uah": customs_uah if customs_uah is not None else 0.0,
+                        "description": description
+                    })
+                except api_client.ApiError as e:
+                    st.error(f"Помилка API при додаванні товару: {e.detail}")
+                    return
+                st.success(f"Товар '{name}' успішно додано!")
+                apppp.invalidate_after_items_added()
+                return
+
             cost_uah = apppp.calculate_uah_cost(cost_original, shipping_original, rate) # Використовуємо apppp.
 
             try:
@@ -93,11 +112,11 @@ def display_add_item_form():
                     "customs_uah": customs_uah if customs_uah is not None else 0.0, # Перевірка на None для мита
                     "description": description
                 }
-                response = apppp.supabase.table('items').insert(insert_data).execute() # Використовуємо apppp.
+                response = apppp.timed_execute(apppp.get_supabase().table('items').insert(insert_data), 'items', 'insert') # Використовуємо apppp.
 
                 if response.data:
                     st.success(f"Товар '{name}' успішно додано!")
-                    st.cache_data.clear()
+                    apppp.invalidate_after_items_added()
                 else:
                      st.error(f"Помилка при додаванні товару: {getattr(response, 'error', 'Невідома помилка')}")
 
@@ -106,3 +125,5 @@ def display_add_item_form():
 
 # --- Головна частина сторінки ---
 display_add_item_form()
+
+app_ui.render_debug_panel()
@@ -1,35 +1,53 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import io
 import math # Для math.ceil
 # Імпортуємо весь модуль apppp
 try:
     import apppp # Головний файл додатку, де знаходяться спільні функції та supabase клієнт
+    import app_ui
+    import api_client
 except ImportError:
     st.error("Помилка імпорту: Не вдалося знайти основний файл 'apppp.py'. Переконайтесь, що він існує в кореневій папці.")
     st.stop() # Зупиняємо виконання, якщо основний файл не знайдено
 
+app_ui.setup_page()
+
+
+# --- Збереження змін ---
+
+def save_change(item_id, api_action, direct_action, error_message, removed=False, removed_sale_id=None):
+    """
+    Зберігає зміну товару item_id через main_api (api_action(client)), якщо його налаштовано,
+    інакше напряму в Supabase (direct_action() -> текст помилки або None), як сторінки додавання
+    та імпорту. removed / removed_sale_id - зміна є видаленням товару чи продажу.
+    Повертає True, якщо зміну збережено; інакше показує помилку і повертає False.
+    """
+    client = app_ui.get_api_client()
+    if client is None:
+        error = direct_action() # функції запису apppp самі скидають кеш товару
+    else:
+        try:
+            api_action(client)
+            error = None
+        except api_client.ApiError as e:
+            error = e.detail
+        # API в іншому процесі - кеш цього процесу скидається тут (і після помилки: запис міг відбутися)
+        deleted = error is None
+        apppp.invalidate_after_item_changed(item_id, removed and deleted, removed_sale_id if deleted else None)
+    if error:
+        st.error(f"{error_message} {error}")
+        return False
+    return True
 
-# --- Функція для конвертації DataFrame в Excel ---
-# Ця функція може бути також винесена в apppp.py, якщо потрібна на інших сторінках
-def dataframe_to_excel(df):
-    """Конвертує Pandas DataFrame у байтовий потік Excel-файлу."""
-    output = io.BytesIO()
-    # Використовуємо context manager, щоб автоматично закрити writer
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Inventory')
-    # Отримуємо байтове представлення з буфера
-    processed_data = output.getvalue()
-    return processed_data
 
 # --- Функції для відображення форм (редагування товару, продажу, історії, редагування продажу) ---
 
 def display_edit_item_form(item_data):
     """Відображає форму для редагування товару, включаючи вибір країни."""
-    st.subheader(f"Редагувати товар: {item_data.get('name', 'Н/Д')}")
+    st.subheader(f"Редагувати товар: {(item_data.name or 'Н/Д')}")
 
-    current_country = item_data.get('origin_country')
+    current_country = item_data.origin_country
     if not current_country or current_country not in apppp.CURRENCY_SETTINGS: # Додано перевірку на валідність
         current_country = "USA" # Вважаємо, що старі записи або невідомі з США
 
@@ -44,40 +62,39 @@ def display_edit_item_form(item_data):
         "Країна походження*",
         options=country_options,
         index=current_country_index,
-        key=f"edit_country_select_{item_data['id']}"
+        key=f"edit_country_select_{item_data.id}"
     )
 
     settings = apppp.CURRENCY_SETTINGS[selected_country]
     currency_symbol = settings["symbol"]
     currency_code = settings["code"]
     rate_label = settings["rate_label"]
-    current_rate = item_data.get('rate')
+    current_rate = item_data.rate
     default_rate = current_rate if current_rate and float(current_rate) > 0 else settings["default_rate"]
 
 
     with st.form("edit_item_form"):
-        name = st.text_input("Назва товару*", value=item_data.get('name', ''), key=f"edit_name_{item_data['id']}")
-        initial_quantity = st.number_input("Початкова кількість*", min_value=1, step=1, value=item_data.get('initial_quantity', 1), key=f"edit_qty_{item_data['id']}")
+        name = st.text_input("Назва товару*", value=item_data.name or '', key=f"edit_name_{item_data.id}")
+        initial_quantity = st.number_input("Початкова кількість*", min_value=1, step=1, value=item_data.initial_quantity or 1, key=f"edit_qty_{item_data.id}")
 
-        cost_to_display = item_data.get('cost_original') if item_data.get('origin_country') else item_data.get('cost_usd', 0.0)
-        shipping_to_display = item_data.get('shipping_original') if item_data.get('origin_country') else item_data.get('shipping_usd', 0.0)
+        cost_to_display = item_data.cost_original if item_data.origin_country else item_data.cost_usd
+        shipping_to_display = item_data.shipping_original if item_data.origin_country else item_data.shipping_usd
 
-        cost_original = st.number_input(f"Вартість ({currency_symbol})*", min_value=0.0, step=0.01, format="%.2f", value=float(cost_to_display or 0.0), key=f"edit_cost_original_{item_data['id']}")
-        shipping_original = st.number_input(f"Доставка ({currency_symbol})*", min_value=0.0, step=0.01, format="%.2f", value=float(shipping_to_display or 0.0), key=f"edit_shipping_original_{item_data['id']}")
+        cost_original = st.number_input(f"Вартість ({currency_symbol})*", min_value=0.0, step=0.01, format="%.2f", value=float(cost_to_display or 0.0), key=f"edit_cost_original_{item_data.id}")
+        shipping_original = st.number_input(f"Доставка ({currency_symbol})*", min_value=0.0, step=0.01, format="%.2f", value=float(shipping_to_display or 0.0), key=f"edit_shipping_original_{item_data.id}")
         rate = st.number_input(
             rate_label,
             min_value=0.01,
             step=0.01,
             format="%.4f",
             value=float(default_rate),
-            key=f"edit_rate_dynamic_{item_data['id']}"
+            key=f"edit_rate_dynamic_{item_data.id}"
             )
-        customs_uah = st.number_input("Митний платіж (грн)", min_value=0.0, step=0.01, format="%.2f", value=float(item_data.get('customs_uah', 0.0)), key=f"edit_customs_{item_data['id']}")
-        description = st.text_area("Опис", value=item_data.get('description', ''), key=f"edit_desc_{item_data['id']}")
+        customs_uah = st.number_input("Митний платіж (грн)", min_value=0.0, step=0.01, format="%.2f", value=item_data.customs_uah or 0.0, key=f"edit_customs_{item_data.id}")
+        description = st.text_area("Опис", value=item_data.description or '', key=f"edit_desc_{item_data.id}")
 
-        sold_qty, _ = apppp.get_item_sales_info_cached(item_data)
-        if sold_qty > 0:
-            st.caption(f"(Вже продано: {sold_qty} од.)")
+        if item_data.has_sales:
+            st.caption(f"(Вже продано: {item_data.sold_qty} од.)")
 
         col1, col2 = st.columns(2)
         with col1:
@@ -86,30 +103,43 @@ def display_edit_item_form(item_data):
              cancelled = st.form_submit_button("Скасувати")
 
         if submitted:
-            # TODO: Оновити логіку збереження для роботи через FastAPI
-            st.warning("Функціонал збереження змін через API ще не реалізовано.")
-            # if not apppp.supabase:
-            #     st.error("Немає підключення до бази даних для збереження змін.")
-            #     return
-            # ... (стара логіка збереження) ...
+            if not name:
+                st.error("Назва товару є обов'язковою.")
+            elif initial_quantity < item_data.sold_qty:
+                st.error(f"Початкова кількість не може бути меншою за продану ({item_data.sold_qty} од.).")
+            else:
+                fields = {
+                    "name": name,
+                    "initial_quantity": int(initial_quantity),
+                    "origin_country": selected_country,
+                    "cost_original": cost_original,
+                    "shipping_original": shipping_original,
+                    "rate": rate,
+                    "customs_uah": customs_uah,
+                    "description": description,
+                }
+                if save_change(item_data.id, lambda client: client.update_item(item_data.id, fields),
+                               lambda: apppp.update_item(item_data.id, fields), "Не вдалося зберегти зміни."):
+                    st.session_state.editing_item_id = None
+                    st.success(f"Товар '{name}' оновлено.")
+                    st.rerun()
         if cancelled:
              st.session_state.editing_item_id = None
              st.rerun()
 
 def display_sell_item_form(item_data):
     """Відображає форму для продажу одиниць товару."""
-    st.subheader(f"Продаж товару: {item_data.get('name', 'Н/Д')}")
-    initial_qty = item_data.get('initial_quantity', 0)
-    sold_qty, avg_price = apppp.get_item_sales_info_cached(item_data)
-    available_qty = initial_qty - sold_qty
+    st.subheader(f"Продаж товару: {(item_data.name or 'Н/Д')}")
+    avg_price = item_data.avg_sell_price
+    available_qty = item_data.remaining_qty
 
     st.write(f"Доступно для продажу: **{available_qty}** од.")
 
     with st.form("sell_item_form"):
         quantity_to_sell = st.number_input("Кількість для продажу*", min_value=1, max_value=available_qty, step=1, value=1, key="sell_qty")
         last_sale_price = None
-        if item_data.get('sales_history'):
-            last_sale_price = item_data['sales_history'][-1].get('price_per_unit_uah')
+        if item_data.sales_history:
+            last_sale_price = item_data.sales_history[-1].price_per_unit_uah
         suggested_price = last_sale_price if last_sale_price is not None else avg_price
         unit_sell_price = st.number_input("Ціна за одиницю (грн)*", min_value=0.0, step=0.01, format="%.2f", value=float(suggested_price) if suggested_price > 0 else 0.01, key="sell_price")
 
@@ -120,19 +150,20 @@ def display_sell_item_form(item_data):
             cancelled = st.form_submit_button("Скасувати")
 
         if submitted:
-            # TODO: Оновити логіку реєстрації продажу для роботи через FastAPI
-            st.warning("Функціонал реєстрації продажу через API ще не реалізовано.")
-            # if not apppp.supabase:
-            # ... (стара логіка збереження) ...
+            if save_change(item_data.id, lambda client: client.sell_item(item_data.id, int(quantity_to_sell), unit_sell_price),
+                           lambda: apppp.sell_item(item_data.id, int(quantity_to_sell), unit_sell_price),
+                           "Не вдалося зареєструвати продаж."):
+                st.session_state.selling_item_id = None
+                st.rerun()
         if cancelled:
             st.session_state.selling_item_id = None
             st.rerun()
 
 def display_sales_history(item_data):
     """Відображає історію продажів для товару та кнопки управління."""
-    st.subheader(f"Історія продажів: {item_data.get('name', 'Н/Д')}")
-    # Історія продажів тепер має бути вже в item_data, завантажена load_items_from_api
-    sales_history = item_data.get('sales_history', [])
+    st.subheader(f"Історія продажів: {(item_data.name or 'Н/Д')}")
+    # Повна історія продажів - у item_data.sales_history (get_item_by_db_id), записи Sale
+    sales_history = item_data.sales_history or ()
 
 
     if not sales_history:
@@ -147,15 +178,15 @@ def display_sales_history(item_data):
          timestamp_display = "Н/Д"
          try:
              # Припускаємо, що FastAPI повертає sale_timestamp як рядок ISO
-             dt_object = datetime.fromisoformat(str(sale.get('sale_timestamp', '')))
+             dt_object = datetime.fromisoformat(sale.sale_timestamp or '')
              timestamp_display = dt_object.strftime('%Y-%m-%d %H:%M:%S')
          except (TypeError, ValueError):
-             timestamp_display = str(sale.get('sale_timestamp', 'Н/Д'))
+             timestamp_display = sale.sale_timestamp or 'Н/Д'
 
          history_display_data.append({
-             "ID Продажу": sale.get('id', 'Н/Д'), # ID продажу з таблиці sales
-             "Кількість": sale.get('quantity_sold', 0),
-             "Ціна за од. (₴)": apppp.format_currency(sale.get('price_per_unit_uah', 0.0)),
+             "ID Продажу": sale.id, # ID продажу з таблиці sales
+             "Кількість": sale.quantity_sold or 0,
+             "Ціна за од. (₴)": apppp.format_currency(sale.price_per_unit_uah),
              "Дата/Час": timestamp_display
          })
 
@@ -163,7 +194,7 @@ def display_sales_history(item_data):
     st.dataframe(df_history, hide_index=True, use_container_width=True)
 
     st.write("Дії з вибраним продажем:")
-    sale_options = {sale['id']: f"ID: {sale['id']} ({sale.get('quantity_sold', 0)} од. по {apppp.format_currency(sale.get('price_per_unit_uah', 0.0))})" for sale in sales_history}
+    sale_options = {sale.id: f"ID: {sale.id} ({sale.quantity_sold or 0} од. по {apppp.format_currency(sale.price_per_unit_uah)})" for sale in sales_history}
     selected_sale_id_str = st.selectbox(
          "Виберіть продаж",
          options=list(sale_options.keys()),
@@ -178,24 +209,27 @@ def display_sales_history(item_data):
     with col1:
          if st.button("Редагувати", key="edit_sale_btn_view", disabled=selected_sale_id is None):
              st.session_state.editing_sale_id = selected_sale_id
-             st.session_state.editing_sale_item_id = item_data['id']
+             st.session_state.editing_sale_item_id = item_data.id
              st.rerun()
     with col2:
         if st.button("Видалити", key="delete_sale_btn_view", disabled=selected_sale_id is None):
              st.session_state.confirm_delete_sale_id = selected_sale_id
-             st.session_state.confirm_delete_sale_item_id = item_data['id']
+             st.session_state.confirm_delete_sale_item_id = item_data.id
              st.rerun()
 
     # --- Підтвердження видалення продажу ---
     if 'confirm_delete_sale_id' in st.session_state and st.session_state.confirm_delete_sale_id is not None:
-        if st.session_state.confirm_delete_sale_item_id == item_data['id']:
+        if st.session_state.confirm_delete_sale_item_id == item_data.id:
             sale_id_to_delete = st.session_state.confirm_delete_sale_id
             st.warning(f"**Ви впевнені, що хочете видалити запис про продаж ID: {sale_id_to_delete}?**")
             c1, c2, _ = st.columns([1,1,5])
             if c1.button("Так, видалити продаж", key="confirm_delete_sale_yes_view"):
-                # TODO: Оновити логіку видалення продажу через FastAPI
-                st.warning("Функціонал видалення продажу через API ще не реалізовано.")
-                # ... (стара логіка) ...
+                if save_change(item_data.id, lambda client: client.delete_sale(sale_id_to_delete),
+                               lambda: apppp.delete_sale(item_data.id, sale_id_to_delete), "Не вдалося видалити продаж.",
+                               removed_sale_id=sale_id_to_delete):
+                    st.session_state.confirm_delete_sale_id = None
+                    st.session_state.confirm_delete_sale_item_id = None
+                    st.rerun()
             if c2.button("Ні, скасувати", key="confirm_delete_sale_no_view"):
                 st.session_state.confirm_delete_sale_id = None
                 st.session_state.confirm_delete_sale_item_id = None
@@ -210,31 +244,28 @@ def display_sales_history(item_data):
 
 def display_edit_sale_form(item_data, sale_data):
     """Відображає форму для редагування конкретного продажу."""
-    st.subheader(f"Редагувати продаж ID: {sale_data['id']} для товару: {item_data.get('name', 'Н/Д')}")
-    initial_item_qty = item_data.get('initial_quantity', 0)
+    st.subheader(f"Редагувати продаж ID: {sale_data.id} для товару: {(item_data.name or 'Н/Д')}")
+    initial_item_qty = item_data.initial_quantity or 0
 
     with st.form("edit_sale_form"):
         quantity_sold = st.number_input(
             "Продана кількість*",
             min_value=1,
             step=1,
-            value=sale_data.get('quantity_sold', 1),
-            key=f"edit_sale_qty_{sale_data['id']}"
+            value=sale_data.quantity_sold or 1,
+            key=f"edit_sale_qty_{sale_data.id}"
         )
         price_per_unit = st.number_input(
             "Ціна за одиницю (грн)*",
             min_value=0.0,
             step=0.01,
             format="%.2f",
-            value=float(sale_data.get('price_per_unit_uah', 0.0)),
-            key=f"edit_sale_price_{sale_data['id']}"
+            value=sale_data.price_per_unit_uah or 0.0,
+            key=f"edit_sale_price_{sale_data.id}"
         )
 
-        other_sales_qty = 0
-        for sale in item_data.get('sales_history', []):
-            if sale.get('id') != sale_data['id']:
-                other_sales_qty += sale.get('quantity_sold', 0)
-        max_allowed_here = initial_item_qty - other_sales_qty
+        # Як і main_api, враховуються лише повні продажі інших записів (records.Item.sold_qty_excluding)
+        max_allowed_here = initial_item_qty - item_data.sold_qty_excluding(sale_data.id)
         st.caption(f"Максимально допустима кількість для цього продажу: {max_allowed_here}")
 
         col1, col2 = st.columns(2)
@@ -244,13 +275,20 @@ def display_edit_sale_form(item_data, sale_data):
             cancelled = st.form_submit_button("Скасувати редагування")
 
         if submitted:
-            # TODO: Оновити логіку редагування продажу через FastAPI
-            st.warning("Функціонал редагування продажу через API ще не реалізовано.")
-            # ... (стара логіка) ...
+            if quantity_sold > max_allowed_here:
+                st.error(f"Кількість перевищує допустиму ({max_allowed_here} од.).")
+            else:
+                if save_change(item_data.id, lambda client: client.update_sale(sale_data.id, int(quantity_sold), price_per_unit),
+                               lambda: apppp.update_sale(item_data.id, sale_data.id, int(quantity_sold), price_per_unit),
+                               "Не вдалося зберегти зміни продажу."):
+                    st.session_state.editing_sale_id = None
+                    st.session_state.editing_sale_item_id = None
+                    st.session_state.viewing_history_item_id = item_data.id
+                    st.rerun()
         if cancelled:
             st.session_state.editing_sale_id = None
             st.session_state.editing_sale_item_id = None
-            st.session_state.viewing_history_item_id = item_data['id']
+            st.session_state.viewing_history_item_id = item_data.id
             st.rerun()
 
 # --- Основна функція для відображення списку товарів та кнопок ---
@@ -287,48 +325,54 @@ def display_items_view():
         key="column_selector_view_items"
     )
     
+    # Курсори keyset-пагінації: cursors[N-1] - after_id для сторінки N.
+    # При зміні пошуку або фільтра список курсорів починається спочатку.
+    if st.session_state.get('view_items_cursor_search') != (search_term, filter_status):
+        st.session_state.view_items_cursor_search = (search_term, filter_status)
+        st.session_state.view_items_cursors = [0]
+        st.session_state.current_page_view_items = 1
+    cursors = st.session_state.get('view_items_cursors') or [0]
+
     current_page = st.session_state.current_page_view_items
-    offset = (current_page - 1) * ITEMS_PER_PAGE
+    if current_page < 1 or current_page > len(cursors):
+        current_page = 1
+        st.session_state.current_page_view_items = 1
+    after_id = cursors[current_page - 1]
 
+    # Для списку достатньо підсумків продажів; повна історія завантажується лише для відкритого товару
     with st.spinner("Завантаження товарів..."):
-        # Змінюємо виклик на apppp.load_items_from_api
-        items_page_data, total_items_count = apppp.load_items_from_db(limit=ITEMS_PER_PAGE, offset=offset, search_term=search_term)
+        if search_term:
+            # Результати пошуку впорядковані за релевантністю, тому сторінки рахуються через offset
+            items_page_data, total_items_count = apppp.load_items_from_db(limit=ITEMS_PER_PAGE, offset=(current_page - 1) * ITEMS_PER_PAGE, search_term=search_term, count_strategy=apppp.COUNT_CACHED, stock_filter=filter_status, sales_mode=apppp.SALES_SUMMARY)
+        else:
+            items_page_data, total_items_count = apppp.load_items_from_db(limit=ITEMS_PER_PAGE, search_term=search_term, after_id=after_id, count_strategy=apppp.COUNT_CACHED, stock_filter=filter_status, sales_mode=apppp.SALES_SUMMARY)
     
     total_pages = math.ceil(total_items_count / ITEMS_PER_PAGE) if ITEMS_PER_PAGE > 0 and total_items_count > 0 else 1
     total_pages = max(1, total_pages) # Щоб уникнути 0 сторінок
+    # Курсор наступної сторінки - ID останнього завантаженого товару
+    next_after_id = items_page_data[-1].id if len(items_page_data) >= ITEMS_PER_PAGE else None
 
     filtered_items_on_page = []
     for item in items_page_data:
-        initial_qty = item.get('initial_quantity', 0)
-        sold_qty, avg_price = apppp.get_item_sales_info_cached(item)
-        remaining_qty = initial_qty - sold_qty
-        has_sales = sold_qty > 0
-
-        if filter_status == 'sold' and not has_sales:
+        # Фільтр наявності виконує БД; перевірка тут лишається на випадок БД без колонок наявності
+        if filter_status == 'sold' and not item.has_sales:
             continue
-        if filter_status == 'in_stock' and remaining_qty <= 0:
+        if filter_status == 'in_stock' and item.remaining_qty <= 0:
             continue
-
-        item['remaining_qty'] = remaining_qty
-        item['has_sales'] = has_sales
-        item['can_sell'] = remaining_qty > 0
-        item['avg_sell_price'] = avg_price
         filtered_items_on_page.append(item)
 
     if filtered_items_on_page:
         display_data = []
         for item in filtered_items_on_page:
-            item_name = item.get('name')
-            display_name = item_name if item_name else 'Без назви'
             row_data = {
-                "ID": item['id'],
-                "Назва": display_name,
-                "Залишок": item['remaining_qty'],
-                "Вартість (₴)": apppp.format_currency(item.get('cost_uah', 0.0)),
-                "Мито (₴)": apppp.format_currency(item.get('customs_uah', 0.0)),
-                "Сер. ціна продажу (₴/од.)": apppp.format_currency(item['avg_sell_price']) if item['has_sales'] else "---",
-                "Опис": item.get('description', ''),
-                "Доставка (ориг. валюта)": f"{item.get('shipping_original', 0.0):.2f} {apppp.CURRENCY_SETTINGS.get(item.get('origin_country', 'USA'), {}).get('symbol', '')}".strip()
+                "ID": item.id,
+                "Назва": item.display_name,
+                "Залишок": item.remaining_qty,
+                "Вартість (₴)": apppp.format_currency(item.cost_uah),
+                "Мито (₴)": apppp.format_currency(item.customs_uah),
+                "Сер. ціна продажу (₴/од.)": apppp.format_currency(item.avg_sell_price) if item.has_sales else "---",
+                "Опис": item.description or '',
+                "Доставка (ориг. валюта)": f"{item.shipping_original or 0.0:.2f} {apppp.CURRENCY_SETTINGS.get(item.origin_country or 'USA', {}).get('symbol', '')}".strip()
             }
             display_data.append(row_data)
 
@@ -345,19 +389,20 @@ def display_items_view():
 
         with col_prev:
             if st.button("⬅️ Попередня", key="prev_page_btn_view", disabled=(current_page <= 1)):
-                st.session_state.current_page_view_items -= 1
+                st.session_state.current_page_view_items = current_page - 1
                 st.rerun()
         with col_page_info:
             st.write(f"Сторінка {current_page} з {total_pages} (Всього знайдено: {total_items_count})")
         with col_next:
-            if st.button("Наступна ➡️", key="next_page_btn_view", disabled=(current_page >= total_pages)):
-                st.session_state.current_page_view_items += 1
+            if st.button("Наступна ➡️", key="next_page_btn_view", disabled=(current_page >= total_pages or next_after_id is None)):
+                st.session_state.view_items_cursors = cursors[:current_page] + [next_after_id]
+                st.session_state.current_page_view_items = current_page + 1
                 st.rerun()
         
         st.markdown("---")
 
         st.write("Дії з вибраним товаром:")
-        item_options = {item['id']: f"{item['id']}: {item.get('name') if item.get('name') else 'Без назви'}" for item in filtered_items_on_page}
+        item_options = {item.id: f"{item.id}: {item.display_name}" for item in filtered_items_on_page}
         
         if item_options:
             current_selection_id = st.session_state.get('selected_item_id', None)
@@ -386,9 +431,10 @@ def display_items_view():
             st.info("На цій сторінці немає товарів для вибору.")
 
 
+        # Дані вибраного товару - з уже завантаженої сторінки (підсумки продажів, без історії)
         selected_item_data = None
         if selected_id is not None:
-             selected_item_data = apppp.get_item_by_db_id(selected_id)
+             selected_item_data = next((item for item in filtered_items_on_page if item.id == selected_id), None)
 
         col1, col2, col3, col4, col5 = st.columns(5)
         with col1:
@@ -403,19 +449,12 @@ def display_items_view():
                 else:
                     st.warning("Спочатку виберіть товар.")
         with col3:
-            can_sell = False
-            if selected_item_data:
-                 initial_qty = selected_item_data.get('initial_quantity', 0)
-                 sold_qty, _ = apppp.get_item_sales_info_cached(selected_item_data)
-                 can_sell = (initial_qty - sold_qty) > 0
+            can_sell = selected_item_data is not None and selected_item_data.can_sell
             if st.button("Продати", key="sell_btn_view", disabled=not can_sell):
                  st.session_state.selling_item_id = selected_id
                  st.rerun()
         with col4:
-            has_sales = False
-            if selected_item_data:
-                 sold_qty, _ = apppp.get_item_sales_info_cached(selected_item_data)
-                 has_sales = sold_qty > 0
+            has_sales = selected_item_data is not None and selected_item_data.has_sales
             if st.button("Історія продажів", key="history_btn_view", disabled=not has_sales):
                  st.session_state.viewing_history_item_id = selected_id
                  st.rerun()
@@ -430,18 +469,19 @@ def display_items_view():
 
         # --- Підтвердження видалення товару ---
         if 'confirm_delete_id' in st.session_state and st.session_state.confirm_delete_id is not None:
-             item_to_delete = apppp.get_item_by_db_id(st.session_state.confirm_delete_id)
-             item_name = item_to_delete.get('name') if item_to_delete else 'Н/Д'
+             item_to_delete = apppp.get_item_summary(st.session_state.confirm_delete_id)
+             item_name = item_to_delete.name if item_to_delete else 'Н/Д'
              display_delete_name = item_name if item_name else 'Без назви'
              st.warning(f"**Ви впевнені, що хочете видалити товар '{display_delete_name}' (ID: {st.session_state.confirm_delete_id}) та всю його історію продажів?**")
              c1, c2, _ = st.columns([1,1,5])
              if c1.button("Так, видалити", key="confirm_delete_yes_view"):
                   db_id_to_delete = st.session_state.confirm_delete_id
                   st.session_state.confirm_delete_id = None
-                  # TODO: Оновити логіку видалення через FastAPI
-                  st.warning("Функціонал видалення через API ще не реалізовано.")
-                  # if not apppp.supabase:
-                  # ... (стара логіка) ...
+                  if save_change(db_id_to_delete, lambda client: client.delete_item(db_id_to_delete),
+                                 lambda: apppp.delete_item(db_id_to_delete), "Не вдалося видалити товар.", removed=True):
+                      if st.session_state.selected_item_id == db_id_to_delete:
+                          st.session_state.selected_item_id = None
+                      st.rerun()
              if c2.button("Ні, скасувати", key="confirm_delete_no_view"):
                   st.session_state.confirm_delete_id = None
                   st.rerun()
@@ -455,7 +495,7 @@ def display_items_view():
 
 # Перевіряємо, чи потрібно відобразити форму редагування товару
 if st.session_state.get('editing_item_id') is not None:
-    item_to_edit = apppp.get_item_by_db_id(st.session_state.editing_item_id)
+    item_to_edit = apppp.get_item_summary(st.session_state.editing_item_id) # історія продажів формі не потрібна
     if item_to_edit:
         display_edit_item_form(item_to_edit)
     else:
@@ -482,12 +522,7 @@ elif st.session_state.get('viewing_history_item_id') is not None:
        st.session_state.get('editing_sale_item_id') == st.session_state.viewing_history_item_id:
 
         item_for_sale_edit = apppp.get_item_by_db_id(st.session_state.editing_sale_item_id)
-        sale_to_edit = None
-        if item_for_sale_edit:
-             for sale in item_for_sale_edit.get('sales_history', []):
-                  if sale.get('id') == st.session_state.editing_sale_id:
-                       sale_to_edit = sale
-                       break
+        sale_to_edit = item_for_sale_edit.find_sale(st.session_state.editing_sale_id) if item_for_sale_edit else None
         if item_for_sale_edit and sale_to_edit:
              display_edit_sale_form(item_for_sale_edit, sale_to_edit)
         else:
@@ -512,3 +547,4 @@ elif st.session_state.get('viewing_history_item_id') is not None:
 else:
     display_items_view()
 
+app_ui.render_debug_panel()
@@ -3,122 +3,55 @@ import locale
 # Імпортуємо весь модуль apppp
 try:
     import apppp # Головний файл додатку, де знаходяться спільні функції та supabase клієнт
+    import app_ui
 except ImportError:
     st.error("Помилка імпорту: Не вдалося знайти основний файл 'apppp.py'. Переконайтесь, що він існує в кореневій папці.")
     st.stop() # Зупиняємо виконання, якщо основний файл не знайдено
 
-def display_statistics():
-    """Відображає вікно статистики з додатковою діагностикою."""
-    # st.subheader("Статистика товарів") # Заголовок тепер береться з назви файлу
+app_ui.setup_page()
 
+def calculate_statistics_locally():
+    """
+    Запасний розрахунок загальної статистики в Python, якщо RPC stats_summary в БД недоступна.
+    Повертає словник з тими ж ключами, що й apppp.load_stats_summary, або None, якщо товарів немає.
+    """
     # Завантажуємо ВСІ товари для статистики, ігноруючи пагінацію та пошук
     # Розпаковуємо результат: items_data - список товарів, _ - загальна кількість (не використовується тут)
     items_data, _ = apppp.load_items_from_db(limit=None, offset=None, search_term=None) 
     
     if not items_data:
-         st.info("Немає даних для відображення статистики.")
-         return
-
-    # Ініціалізуємо суми
-    total_initial_items_sum = 0
-    total_sold_items_sum = 0
-    entries_with_sales = 0
-    unsold_entries = 0
-    total_expenses = 0.0
-    total_income_actual = 0.0
-    unsold_items_cost = 0.0
-
-    print("--- Початок розрахунку статистики (сторінка статистики) ---") # Діагностика
-
-    for index, item in enumerate(items_data): # Тепер item - це словник
-        # Перевіряємо, чи item дійсно є словником
-        if not isinstance(item, dict):
-            print(f"Попередження: пропущено некоректний елемент у items_data (не словник): {item}")
-            continue
-
-        print(f"\nОбробка товару ID: {item.get('id')}, Назва: {item.get('name', 'Н/Д')}")
-
-        # --- Розрахунок витрат для поточного товару ---
-        item_expense = 0.0
-        try:
-            initial_qty = item.get('initial_quantity', 0)
-            cost_uah = item.get('cost_uah', 0.0)
-            customs_uah = item.get('customs_uah', 0.0)
-
-            initial_qty_val = int(initial_qty) if initial_qty is not None else 0
-            cost_uah_val = float(cost_uah) if cost_uah is not None else 0.0
-            customs_uah_val = float(customs_uah) if customs_uah is not None else 0.0
-
-            print(f"  -> Витрати: cost_uah={cost_uah_val}, customs_uah={customs_uah_val}, initial_qty={initial_qty_val}")
-
-            item_expense = cost_uah_val + customs_uah_val
-            total_expenses += item_expense
-
-            unit_cost = item_expense / initial_qty_val if initial_qty_val > 0 else 0
-            total_initial_items_sum += initial_qty_val
+         return None
 
-        except (ValueError, TypeError) as e:
-            print(f"  -> ПОМИЛКА розрахунку витрат для товару ID {item.get('id')}: {e}")
-            unit_cost = 0
+    items_df, sales_df = apppp.build_inventory_frames(items_data)
+    return apppp.summarize_item_stats(apppp.calculate_item_stats(items_df, sales_df))
 
-        # --- Розрахунок доходу для поточного товару ---
-        item_sold_qty, avg_price = apppp.get_item_sales_info_cached(item)
-        item_income = 0.0
-        sales_history = item.get('sales_history', [])
-
-        if sales_history: # Перевіряємо, чи sales_history не порожній
-            # Ініціалізуємо entries_with_sales, якщо ще не було (хоча це мало б бути зроблено вище, але для безпеки)
-            if entries_with_sales == 0 and item_sold_qty > 0 : entries_with_sales = 0 
-            if item_sold_qty > 0: entries_with_sales +=1
-            
-            print(f"  -> Знайдено {len(sales_history)} записів продажів.")
-            for sale_index, sale in enumerate(sales_history):
-                try:
-                    qty = sale.get('quantity_sold', 0)
-                    price = sale.get('price_per_unit_uah', 0.0)
-
-                    qty_val = int(qty) if qty is not None else 0
-                    price_val = float(price) if price is not None else 0.0
-
-                    print(f"    -> Продаж {sale_index+1}: qty={qty_val}, price={price_val}")
-
-                    if qty_val > 0 and price_val >= 0:
-                         item_income += qty_val * price_val
-                    else:
-                         print(f"    -> Попередження: Пропуск продажу з некоректними даними (qty={qty_val}, price={price_val})")
-
-                except (ValueError, TypeError) as e:
-                    print(f"    -> ПОМИЛКА обробки продажу {sale_index+1} для товару ID {item.get('id')}: {e}")
-        else:
-            unsold_entries += 1
-
-        total_sold_items_sum += item_sold_qty
-        total_income_actual += item_income
-
-        # --- Розрахунок вартості залишку ---
-        remaining_qty = initial_qty_val - item_sold_qty
-        if remaining_qty > 0:
-            unsold_items_cost += remaining_qty * unit_cost
+def display_statistics():
+    """Відображає вікно статистики: загальні суми рахує БД, локальний розрахунок - лише запасний варіант."""
+    # st.subheader("Статистика товарів") # Заголовок тепер береться з назви файлу
 
-    print(f"--- Кінець розрахунку: Заг.витрати={total_expenses}, Заг.дохід={total_income_actual} ---")
+    summary = apppp.load_stats_summary()
+    if summary is None:
+        summary = calculate_statistics_locally()
 
-    overall_profit_loss = total_income_actual - total_expenses
+    if not summary or not summary["item_count"]:
+         st.info("Немає даних для відображення статистики.")
+         return
 
     # --- Відображення статистики (використовуємо apppp.format_currency) ---
     st.markdown("#### Загальна статистика")
     col1, col2 = st.columns(2)
-    col1.metric("Кількість записів", len(items_data))
-    col1.metric("Загальна початкова к-сть од.", total_initial_items_sum)
-    col1.metric("Загально продано од.", total_sold_items_sum)
-    col2.metric("Записи з продажами", entries_with_sales)
-    col2.metric("Записи без продаж", unsold_entries)
+    col1.metric("Кількість записів", summary["item_count"])
+    col1.metric("Загальна початкова к-сть од.", summary["total_units"])
+    col1.metric("Загально продано од.", summary["units_sold"])
+    col2.metric("Записи з продажами", summary["items_with_sales"])
+    col2.metric("Записи без продаж", summary["items_without_sales"])
 
     st.markdown("---")
     col1, col2 = st.columns(2)
-    col1.metric("Загальні витрати (на всі од.)", apppp.format_currency(total_expenses))
-    col1.metric("Загальний дохід (з проданих од.)", apppp.format_currency(total_income_actual))
-    col2.metric("Прибуток / Збиток (Дохід - Всі витрати)", apppp.format_currency(overall_profit_loss))
-    col2.metric("Вартість одиниць в наявності", apppp.format_currency(unsold_items_cost))
+    col1.metric("Загальні витрати (на всі од.)", apppp.format_currency(summary["expenses"]))
+    col1.metric("Загальний дохід (з проданих од.)", apppp.format_currency(summary["income"]))
+    col2.metric("Прибуток / Збиток (Дохід - Всі витрати)", apppp.format_currency(summary["profit"]))
+    col2.metric("Вартість одиниць в наявності", apppp.format_currency(summary["remaining_value"]))
 
     st.markdown("---")
     st.markdown("#### Статистика останнього вибраного товару")
@@ -129,23 +62,17 @@ def display_statistics():
          selected_item_data = apppp.get_item_by_db_id(selected_item_id)
 
     if selected_item_data:
-        s_initial_qty = selected_item_data.get('initial_quantity', 0)
-        s_cost_uah = selected_item_data.get('cost_uah', 0.0)
-        s_customs_uah = selected_item_data.get('customs_uah', 0.0)
-        # s_sales_history = selected_item_data.get('sales_history', []) # Вже є в selected_item_data
-
-        s_cost_uah_val = float(s_cost_uah) if s_cost_uah is not None else 0.0
-        s_customs_uah_val = float(s_customs_uah) if s_customs_uah is not None else 0.0
-        s_initial_qty_val = int(s_initial_qty) if s_initial_qty is not None else 0
-
-        s_expenses = s_cost_uah_val + s_customs_uah_val
-        s_unit_cost = s_expenses / s_initial_qty_val if s_initial_qty_val > 0 else 0
-        s_sold_qty, s_avg_sell_price = apppp.get_item_sales_info_cached(selected_item_data)
+        # Типи вже приведені в записі Item під час завантаження
+        s_initial_qty_val = selected_item_data.initial_quantity or 0
+        s_expenses = selected_item_data.expenses
+        s_unit_cost = selected_item_data.unit_cost
+        s_sold_qty = selected_item_data.sold_qty
+        s_avg_sell_price = selected_item_data.avg_sell_price
         s_income = s_sold_qty * s_avg_sell_price if s_sold_qty > 0 else 0.0
-        s_remaining_qty = s_initial_qty_val - s_sold_qty
+        s_remaining_qty = selected_item_data.remaining_qty
         s_profit_loss = s_income - (s_sold_qty * s_unit_cost) if s_sold_qty > 0 else None
 
-        st.write(f"**Назва:** {selected_item_data.get('name', 'Н/Д')}")
+        st.write(f"**Назва:** {selected_item_data.name or 'Н/Д'}")
         col1, col2, col3 = st.columns(3)
         col1.metric("Початкова к-сть", s_initial_qty_val)
         col2.metric("Продано к-сть", s_sold_qty)
@@ -166,3 +93,4 @@ def display_statistics():
 # st.header("📊 Статистика")
 display_statistics()
 
+app_ui.render_debug_panel()
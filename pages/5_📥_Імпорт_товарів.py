@@ -0,0 +1,110 @@
+import streamlit as st
+import pandas as pd
+# Імпортуємо весь модуль apppp
+try:
+    import apppp # Головний файл додатку, де знаходяться спільні функції та supabase клієнт
+    import app_ui
+    import api_client
+except ImportError:
+    st.error("Помилка імпорту: Не вдалося знайти основний файл 'apppp.py'. Переконайтесь, що він існує в кореневій папці.")
+    st.stop() # Зупиняємо виконання, якщо основний файл не знайдено
+
+app_ui.setup_page()
+
+def read_import_file(uploaded_file):
+    """Читає завантажений CSV або Excel файл у DataFrame."""
+    if uploaded_file.name.lower().endswith('.csv'):
+        return pd.read_csv(uploaded_file)
+    return pd.read_excel(uploaded_file, engine='openpyxl')
+
+def import_through_api(client, records):
+    """
+    Додає товари через main_api порціями по BULK_CHUNK_ROWS (один запит на порцію).
+    Повертає (кількість доданих, текст помилки або None), як insert_items_in_batches: порції до помилки зберігаються.
+    """
+    inserted = 0
+    error = None
+    for start in range(0, len(records), api_client.BULK_CHUNK_ROWS):
+        try:
+            inserted += client.create_items_chunk(records[start:start + api_client.BULK_CHUNK_ROWS])
+        except api_client.ApiError as e:
+            error = e.detail
+            break
+    if inserted:
+        apppp.invalidate_after_items_added()
+    return inserted, error
+
+def display_bulk_import():
+    """Відображає завантаження файлу поставки, перевірку рядків та пакетне додавання товарів."""
+    st.write(
+        "Завантажте CSV або Excel файл з колонками: "
+        + ", ".join(f"`{column}`" for column in apppp.BULK_IMPORT_COLUMNS)
+        + f". Країна - одна з: {', '.join(apppp.CURRENCY_SETTINGS.keys())}; якщо курс не вказано, "
+        "береться курс за замовчуванням для країни."
+    )
+    template_df = pd.DataFrame([{
+        "name": "Приклад товару", "initial_quantity": 1, "origin_country": "USA", "cost_original": 10.0,
+        "shipping_original": 2.5, "rate": apppp.CURRENCY_SETTINGS["USA"]["default_rate"], "customs_uah": 0.0,
+        "description": "",
+    }], columns=apppp.BULK_IMPORT_COLUMNS)
+    st.download_button(
+        label="Завантажити шаблон (CSV)",
+        data=template_df.to_csv(index=False).encode('utf-8'),
+        file_name='items_import_template.csv',
+        mime='text/csv',
+        key='bulk_import_template_button'
+    )
+
+    uploaded_file = st.file_uploader("Файл поставки", type=["csv", "xlsx"], key="bulk_import_file")
+    if uploaded_file is None:
+        return
+
+    try:
+        raw_df = read_import_file(uploaded_file)
+    except Exception as e:
+        st.error(f"Не вдалося прочитати файл: {e}")
+        return
+
+    missing_columns = [column for column in ("name", "initial_quantity", "cost_original") if column not in raw_df.columns]
+    if missing_columns:
+        st.error(f"У файлі відсутні обов'язкові колонки: {', '.join(missing_columns)}")
+        return
+
+    records, errors_df = apppp.prepare_bulk_items(raw_df)
+
+    col1, col2 = st.columns(2)
+    col1.metric("Рядків у файлі", len(raw_df))
+    col2.metric("Готово до імпорту", len(records))
+
+    if not errors_df.empty:
+        st.warning(f"Рядків з помилками: {errors_df['Рядок'].nunique()}. Їх буде пропущено.")
+        st.dataframe(errors_df, hide_index=True, use_container_width=True)
+
+    if not records:
+        st.info("Немає коректних рядків для імпорту.")
+        return
+
+    preview_df = pd.DataFrame(records)
+    st.dataframe(preview_df.head(100), hide_index=True, use_container_width=True)
+    if len(preview_df) > 100:
+        st.caption(f"Показано перші 100 з {len(preview_df)} рядків.")
+
+    if st.button(f"Імпортувати {len(records)} товарів", key="bulk_import_submit"):
+        client = app_ui.get_api_client()
+        if client is None and not apppp.get_supabase():
+            st.error("Немає підключення до бази даних для додавання товарів.")
+            return
+        with st.spinner("Імпорт товарів..."):
+            if client is not None:
+                inserted, error = import_through_api(client, records)
+            else:
+                inserted, error = apppp.insert_items_in_batches(records)
+        if inserted:
+            st.success(f"Успішно додано товарів: {inserted}.")
+        if error:
+            st.error(f"Помилка бази даних під час імпорту. {error}")
+
+# --- Головна частина сторінки ---
+display_bulk_import()
+
+app_ui.render_debug_panel()
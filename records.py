@@ -0,0 +1,169 @@
+# records.py
+"""
+Компактні типізовані записи товару та продажу.
+
+Рядки з Supabase (або локальної копії) перетворюються на Item / Sale один раз під час
+завантаження: типи приводяться тут, підсумки продажів (sold_qty, sales_value) рахуються тут же.
+Далі apppp, сторінки та main_api читають готові атрибути без повторних перевірок на None і
+перетворень. Записи незмінні (frozen): кешовані об'єкти спільні для всіх сесій Streamlit,
+тож похідні значення (залишок, середня ціна) - властивості, а не поля, які хтось дописує.
+__slots__ замість словника атрибутів - кілька разів менше пам'яті на запис.
+"""
+from dataclasses import dataclass, fields
+from typing import Optional, Tuple
+
+
+def to_int(value):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def to_float(value):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def to_text(value):
+    return None if value is None else str(value)
+
+
+@dataclass(frozen=True, slots=True)
+class Sale:
+    id: int
+    item_id: int
+    quantity_sold: Optional[int] = None
+    price_per_unit_uah: Optional[float] = None
+    sale_timestamp: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Продаж із рядка sales; None, якщо немає id або item_id."""
+        sale_id, item_id = to_int(row.get('id')), to_int(row.get('item_id'))
+        if sale_id is None or item_id is None:
+            return None
+        return cls(
+            id=sale_id,
+            item_id=item_id,
+            quantity_sold=to_int(row.get('quantity_sold')),
+            price_per_unit_uah=to_float(row.get('price_per_unit_uah')),
+            sale_timestamp=to_text(row.get('sale_timestamp')),
+        )
+
+    @property
+    def is_complete(self):
+        """Продаж враховується в проданій кількості та середній ціні, лише якщо задані і кількість, і ціна."""
+        return self.quantity_sold is not None and self.price_per_unit_uah is not None
+
+    def to_row(self):
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+
+@dataclass(frozen=True, slots=True)
+class Item:
+    id: int
+    name: Optional[str] = None
+    initial_quantity: Optional[int] = None
+    cost_uah: Optional[float] = None
+    customs_uah: Optional[float] = None
+    description: Optional[str] = None
+    origin_country: Optional[str] = None
+    original_currency: Optional[str] = None
+    cost_original: Optional[float] = None
+    shipping_original: Optional[float] = None
+    rate: Optional[float] = None
+    created_at: Optional[str] = None
+    cost_usd: Optional[float] = None
+    shipping_usd: Optional[float] = None
+    sold_qty: int = 0
+    sales_value: float = 0.0
+    sales_history: Optional[Tuple[Sale, ...]] = None # None - історію не завантажували (режим підсумків)
+
+    @classmethod
+    def from_row(cls, row, sales=None):
+        """
+        Товар із рядка items. sales - рядки або Sale цього товару (повна історія); без них
+        sold_qty і sales_value беруться з однойменних колонок рядка (sql/005_items_sales_summary.sql).
+        None, якщо в рядку немає id.
+        """
+        item_id = to_int(row.get('id'))
+        if item_id is None:
+            return None
+        if sales is not None:
+            history = tuple(sale if isinstance(sale, Sale) else Sale.from_row(sale) for sale in sales)
+            history = tuple(sale for sale in history if sale is not None)
+            complete = [sale for sale in history if sale.is_complete]
+            sold_qty = sum(sale.quantity_sold for sale in complete)
+            sales_value = sum(sale.quantity_sold * sale.price_per_unit_uah for sale in complete)
+        else:
+            history = None
+            sold_qty = to_int(row.get('sold_qty')) or 0
+            sales_value = to_float(row.get('sales_value')) or 0.0
+        return cls(
+            id=item_id,
+            name=to_text(row.get('name')),
+            initial_quantity=to_int(row.get('initial_quantity')),
+            cost_uah=to_float(row.get('cost_uah')),
+            customs_uah=to_float(row.get('customs_uah')),
+            description=to_text(row.get('description')),
+            origin_country=to_text(row.get('origin_country')),
+            original_currency=to_text(row.get('original_currency')),
+            cost_original=to_float(row.get('cost_original')),
+            shipping_original=to_float(row.get('shipping_original')),
+            rate=to_float(row.get('rate')),
+            created_at=to_text(row.get('created_at')),
+            cost_usd=to_float(row.get('cost_usd')),
+            shipping_usd=to_float(row.get('shipping_usd')),
+            sold_qty=sold_qty,
+            sales_value=float(sales_value),
+            sales_history=history,
+        )
+
+    @property
+    def display_name(self):
+        return self.name if self.name else 'Без назви'
+
+    @property
+    def remaining_qty(self):
+        return (self.initial_quantity or 0) - self.sold_qty
+
+    @property
+    def has_sales(self):
+        return self.sold_qty > 0
+
+    @property
+    def can_sell(self):
+        return self.remaining_qty > 0
+
+    @property
+    def avg_sell_price(self):
+        return self.sales_value / self.sold_qty if self.sold_qty > 0 else 0.0
+
+    @property
+    def expenses(self):
+        """Витрати на весь запис: вартість + мито, грн."""
+        return (self.cost_uah or 0.0) + (self.customs_uah or 0.0)
+
+    @property
+    def unit_cost(self):
+        return self.expenses / self.initial_quantity if (self.initial_quantity or 0) > 0 else 0.0
+
+    def sold_qty_excluding(self, sale_id):
+        """Продана кількість без продажу sale_id (за тим самим правилом, що й sold_qty) - межа при його редагуванні."""
+        if sale_id is None or self.sales_history is None:
+            return self.sold_qty
+        return sum(sale.quantity_sold for sale in self.sales_history if sale.is_complete and sale.id != sale_id)
+
+    def find_sale(self, sale_id):
+        return next((sale for sale in self.sales_history or () if sale.id == sale_id), None)
+
+    def to_row(self):
+        """Поля товару як словник (без історії продажів) - для DataFrame і JSON."""
+        return {field.name: getattr(self, field.name) for field in fields(self) if field.name != 'sales_history'}
@@ -0,0 +1,47 @@
+-- Агрегована статистика складу для GET /stats/summary та сторінки "Статистика".
+-- Виконайте в Supabase: SQL Editor -> New query -> Run.
+-- Правила розрахунку збігаються з розрахунком у Python (records.Item.from_row):
+--   * продана кількість - продажі, де і кількість, і ціна задані;
+--   * дохід - продажі з quantity_sold > 0 та price_per_unit_uah >= 0;
+--   * вартість залишку - залишок * (cost_uah + customs_uah) / initial_quantity.
+
+create or replace function public.stats_summary()
+returns json
+language sql
+stable
+as $$
+    with sales_per_item as (
+        select
+            item_id,
+            count(*) as sales_count,
+            coalesce(sum(quantity_sold) filter (
+                where quantity_sold is not null and price_per_unit_uah is not null), 0) as sold_qty,
+            coalesce(sum(quantity_sold * price_per_unit_uah::numeric) filter (
+                where quantity_sold > 0 and price_per_unit_uah >= 0), 0) as income
+        from public.sales
+        group by item_id
+    ),
+    per_item as (
+        select
+            coalesce(i.initial_quantity, 0) as initial_qty,
+            coalesce(i.cost_uah, 0)::numeric + coalesce(i.customs_uah, 0)::numeric as expenses,
+            coalesce(s.sales_count, 0) as sales_count,
+            coalesce(s.sold_qty, 0) as sold_qty,
+            coalesce(s.income, 0) as income
+        from public.items i
+        left join sales_per_item s on s.item_id = i.id
+    )
+    select json_build_object(
+        'item_count',          count(*),
+        'items_with_sales',    count(*) filter (where sales_count > 0 and sold_qty > 0),
+        'items_without_sales', count(*) filter (where sales_count = 0),
+        'total_units',         coalesce(sum(initial_qty), 0),
+        'units_sold',          coalesce(sum(sold_qty), 0),
+        'expenses',            coalesce(sum(expenses), 0),
+        'income',              coalesce(sum(income), 0),
+        'profit',              coalesce(sum(income), 0) - coalesce(sum(expenses), 0),
+        'remaining_value',     coalesce(sum((initial_qty - sold_qty) * expenses / initial_qty) filter (
+                                   where initial_qty > 0 and initial_qty - sold_qty > 0), 0)
+    )
+    from per_item;
+$$;
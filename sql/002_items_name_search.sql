@@ -0,0 +1,44 @@
+-- Індексований пошук товарів за назвою з ранжуванням за релевантністю.
+-- Використовується apppp.load_items_from_db та GET /products/?search=... (RPC search_items).
+-- Виконайте в Supabase: SQL Editor -> New query -> Run.
+--
+-- Триграмний GIN-індекс обслуговує і підрядковий пошук ilike '%...%', і нечіткий збіг слів (<%),
+-- тож запит не сканує всю таблицю. Триграми не залежать від мови: працюють для кирилиці й латиниці
+-- (база Supabase використовує UTF-8 локаль, у якій кириличні літери - це літери).
+
+create extension if not exists pg_trgm;
+
+create index if not exists items_name_trgm_idx
+    on public.items using gin (name gin_trgm_ops);
+
+-- Повертає одну JSON-відповідь: {"total_count": N, "items": [...]} - сторінка та загальна кількість
+-- за один запит. Точні збіги підрядка йдуть першими, далі - нечіткі, всередині - за схожістю слова.
+create or replace function public.search_items(
+    search_term text,
+    result_limit integer default 20,
+    result_offset integer default 0
+)
+returns json
+language sql
+stable
+as $$
+    with matches as (
+        select
+            i.*,
+            (i.name ilike '%' || search_term || '%')::int + word_similarity(search_term, i.name) as relevance
+        from public.items i
+        where i.name ilike '%' || search_term || '%'
+           or search_term <% i.name
+    ),
+    page as (
+        select *
+        from matches
+        order by relevance desc, id
+        limit result_limit
+        offset coalesce(result_offset, 0)
+    )
+    select json_build_object(
+        'total_count', (select count(*) from matches),
+        'items', coalesce((select json_agg(page order by page.relevance desc, page.id) from page), '[]'::json)
+    );
+$$;
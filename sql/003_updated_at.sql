@@ -0,0 +1,32 @@
+-- Колонка updated_at для дельта-синхронізації локальної копії (local_mirror.py).
+-- Виконайте в Supabase: SQL Editor -> New query -> Run.
+--
+-- Без неї локальна копія бачить лише нові рядки (за created_at / id), а зміни існуючих
+-- товарів і продажів підхоплює тільки після повного перезавантаження файлу.
+
+alter table public.items add column if not exists updated_at timestamptz not null default now();
+alter table public.sales add column if not exists updated_at timestamptz not null default now();
+
+create or replace function public.set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists items_set_updated_at on public.items;
+create trigger items_set_updated_at
+    before update on public.items
+    for each row execute function public.set_updated_at();
+
+drop trigger if exists sales_set_updated_at on public.sales;
+create trigger sales_set_updated_at
+    before update on public.sales
+    for each row execute function public.set_updated_at();
+
+-- Дельта-запит: where updated_at >= курсор order by updated_at, id
+create index if not exists items_updated_at_idx on public.items (updated_at, id);
+create index if not exists sales_updated_at_idx on public.sales (updated_at, id);
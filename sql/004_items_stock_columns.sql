@@ -0,0 +1,108 @@
+-- Продана кількість і залишок як колонки items, що підтримуються тригерами.
+-- Фільтри "В наявності" / "Продані", підрахунок і пагінація виконуються в БД одним запитом
+-- (apppp.load_items_from_db(stock_filter=...), GET /products/?stock=...).
+-- Виконайте в Supabase: SQL Editor -> New query -> Run (після 002_items_name_search.sql).
+-- Правило розрахунку як у records.Item (sold_qty, sales_value): враховуються продажі, де задані і кількість, і ціна.
+
+alter table public.items add column if not exists sold_qty integer not null default 0;
+alter table public.items add column if not exists remaining_qty integer not null default 0;
+
+create or replace function public.refresh_item_stock(target_item_id bigint)
+returns void
+language sql
+as $$
+    update public.items i
+    set sold_qty = s.sold_qty,
+        remaining_qty = coalesce(i.initial_quantity, 0) - s.sold_qty
+    from (
+        select coalesce(sum(quantity_sold) filter (
+                   where quantity_sold is not null and price_per_unit_uah is not null), 0) as sold_qty
+        from public.sales
+        where item_id = target_item_id
+    ) s
+    where i.id = target_item_id
+      and (i.sold_qty, i.remaining_qty) is distinct from (s.sold_qty, coalesce(i.initial_quantity, 0) - s.sold_qty);
+$$;
+
+create or replace function public.sales_refresh_item_stock()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.refresh_item_stock(old.item_id);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') and (tg_op = 'INSERT' or new.item_id is distinct from old.item_id) then
+        perform public.refresh_item_stock(new.item_id);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists sales_refresh_item_stock on public.sales;
+create trigger sales_refresh_item_stock
+    after insert or update or delete on public.sales
+    for each row execute function public.sales_refresh_item_stock();
+
+create or replace function public.items_set_remaining_qty()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.remaining_qty := coalesce(new.initial_quantity, 0) - new.sold_qty;
+    return new;
+end;
+$$;
+
+drop trigger if exists items_set_remaining_qty on public.items;
+create trigger items_set_remaining_qty
+    before insert or update of initial_quantity, sold_qty on public.items
+    for each row execute function public.items_set_remaining_qty();
+
+-- Заповнення для наявних даних (remaining_qty рахує тригер items_set_remaining_qty)
+update public.items i
+set sold_qty = coalesce((
+    select sum(s.quantity_sold) filter (where s.quantity_sold is not null and s.price_per_unit_uah is not null)
+    from public.sales s
+    where s.item_id = i.id
+), 0);
+
+-- Сторінки за id з фільтром: часткові індекси лише з потрібних рядків
+create index if not exists items_in_stock_id_idx on public.items (id) where remaining_qty > 0;
+create index if not exists items_sold_id_idx on public.items (id) where sold_qty > 0;
+
+-- search_items з фільтром наявності (заміна версії з 002_items_name_search.sql)
+drop function if exists public.search_items(text, integer, integer);
+create or replace function public.search_items(
+    search_term text,
+    result_limit integer default 20,
+    result_offset integer default 0,
+    stock_filter text default 'all'
+)
+returns json
+language sql
+stable
+as $$
+    with matches as (
+        select
+            i.*,
+            (i.name ilike '%' || search_term || '%')::int + word_similarity(search_term, i.name) as relevance
+        from public.items i
+        where (i.name ilike '%' || search_term || '%'
+               or search_term <% i.name)
+          and (coalesce(stock_filter, 'all') = 'all'
+               or (stock_filter = 'in_stock' and i.remaining_qty > 0)
+               or (stock_filter = 'sold' and i.sold_qty > 0))
+    ),
+    page as (
+        select *
+        from matches
+        order by relevance desc, id
+        limit result_limit
+        offset coalesce(result_offset, 0)
+    )
+    select json_build_object(
+        'total_count', (select count(*) from matches),
+        'items', coalesce((select json_agg(page order by page.relevance desc, page.id) from page), '[]'::json)
+    );
+$$;
@@ -0,0 +1,39 @@
+-- Підсумок продажів товару як колонка items (поряд із sold_qty / remaining_qty з 004_items_stock_columns.sql).
+-- Сторінка списку бере продану кількість і середню ціну з items, не завантажуючи рядки sales
+-- (apppp.load_items_from_db(sales_mode=SALES_SUMMARY)); повна історія - лише для відкритого товару.
+-- Виконайте в Supabase: SQL Editor -> New query -> Run (після 004_items_stock_columns.sql).
+-- Правило як у records.Item (sold_qty, sales_value): сума quantity_sold * price_per_unit_uah по продажах,
+-- де задані і кількість, і ціна; середня ціна = sales_value / sold_qty.
+
+alter table public.items add column if not exists sales_value numeric not null default 0;
+
+create or replace function public.refresh_item_stock(target_item_id bigint)
+returns void
+language sql
+as $$
+    update public.items i
+    set sold_qty = s.sold_qty,
+        sales_value = s.sales_value,
+        remaining_qty = coalesce(i.initial_quantity, 0) - s.sold_qty
+    from (
+        select
+            coalesce(sum(quantity_sold) filter (
+                where quantity_sold is not null and price_per_unit_uah is not null), 0) as sold_qty,
+            coalesce(sum(quantity_sold * price_per_unit_uah::numeric) filter (
+                where quantity_sold is not null and price_per_unit_uah is not null), 0) as sales_value
+        from public.sales
+        where item_id = target_item_id
+    ) s
+    where i.id = target_item_id
+      and (i.sold_qty, i.sales_value, i.remaining_qty)
+          is distinct from (s.sold_qty, s.sales_value, coalesce(i.initial_quantity, 0) - s.sold_qty);
+$$;
+
+-- Заповнення для наявних даних
+update public.items i
+set sales_value = coalesce((
+    select sum(s.quantity_sold * s.price_per_unit_uah::numeric)
+               filter (where s.quantity_sold is not null and s.price_per_unit_uah is not null)
+    from public.sales s
+    where s.item_id = i.id
+), 0);
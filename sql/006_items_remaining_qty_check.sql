@@ -0,0 +1,13 @@
+-- Залишок не може стати від'ємним: перевірка в БД, а не лише в застосунку.
+-- apppp і main_api перевіряють залишок перед записом, але два одночасні продажі (дві сесії, два процеси)
+-- обидва бачать старий залишок. remaining_qty рахують тригери з 004_items_stock_columns.sql, тож
+-- продаж понад залишок (або зменшення initial_quantity нижче проданого) відхиляється помилкою
+-- check_violation (23514), яку apppp._write і main_api.run_db_checked показують як "Недостатньо товару" / 409.
+-- Виконайте в Supabase: SQL Editor -> New query -> Run (після 004_items_stock_columns.sql).
+
+alter table public.items drop constraint if exists items_remaining_qty_nonnegative;
+
+-- not valid: наявні рядки не перевіряються, нові записи - так. Знайти рядки, що вже порушують правило:
+--   select id, name, initial_quantity, sold_qty from public.items where remaining_qty < 0;
+-- після їх виправлення: alter table public.items validate constraint items_remaining_qty_nonnegative;
+alter table public.items add constraint items_remaining_qty_nonnegative check (remaining_qty >= 0) not valid;
@@ -0,0 +1,20 @@
+# streamlit_app.py
+"""
+Точка входу застосунку Streamlit (головна сторінка): streamlit run streamlit_app.py
+Сторінки розділів - у pages/.
+"""
+import streamlit as st
+
+import app_ui
+import apppp
+
+app_ui.setup_page()
+
+st.title("📊 Програма обліку товарів")
+st.write("Оберіть потрібний розділ на бічній панелі зліва.")
+if not apppp.get_supabase():
+    st.warning("Увага: Не вдалося підключитися до бази даних. Функціонал може бути обмежено.")
+else:
+    st.info("Це головна сторінка. Основний функціонал знаходиться в розділах бічного меню.")
+
+app_ui.render_debug_panel()
@@ -0,0 +1,55 @@
+"""
+Спільні фікстури тестів: локальна заміна Supabase REST (benchmarks/fake_postgrest.py)
+з синтетичним каталогом. main_api і apppp імпортуються після того, як SUPABASE_URL вказує на неї.
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+import fake_postgrest
+
+CATALOG_ITEMS = 300
+
+
+@pytest.fixture(scope="session")
+def fake_server():
+    server, _, _ = fake_postgrest.start_server(CATALOG_ITEMS)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def store(fake_server):
+    """Дані заміни PostgREST (fake_postgrest.Store) - для перевірок і змін в обхід API."""
+    return fake_server.RequestHandlerClass.store
+
+
+@pytest.fixture(scope="session")
+def supabase_url(fake_server):
+    url = f"http://127.0.0.1:{fake_server.server_port}"
+    os.environ["SUPABASE_URL"] = url
+    os.environ["SUPABASE_KEY"] = fake_postgrest.FAKE_KEY
+    os.environ.pop("LOCAL_MIRROR_PATH", None)
+    return url
+
+
+@pytest.fixture(scope="session")
+def apppp_module(supabase_url):
+    import apppp
+    return apppp
+
+
+@pytest.fixture(scope="session")
+def api(supabase_url):
+    import main_api
+    from fastapi.testclient import TestClient
+    with TestClient(main_api.app) as client:
+        yield client
@@ -0,0 +1,125 @@
+import pytest
+
+
+def test_search_pages_by_offset(apppp_module):
+    first, total = apppp_module.load_items_from_db(limit=5, offset=0, search_term="Nike", sales_mode=apppp_module.SALES_SUMMARY)
+    second, _ = apppp_module.load_items_from_db(limit=5, offset=5, search_term="Nike", sales_mode=apppp_module.SALES_SUMMARY)
+    assert total > 5
+    assert {item.id for item in first}.isdisjoint(item.id for item in second)
+
+
+def test_search_with_after_id_is_rejected(apppp_module):
+    with pytest.raises(ValueError):
+        apppp_module.load_items_from_db(limit=5, search_term="Nike", after_id=10)
+
+
+def test_filtered_page_cached_from_positional_call_is_invalidated(apppp_module):
+    apppp = apppp_module
+    args = (5, None, None, 0, apppp.COUNT_CACHED, apppp.STOCK_IN_STOCK, apppp.SALES_SUMMARY)
+    apppp.load_items_from_db(*args)
+    key = (apppp.load_items_from_db.__qualname__, args, ())
+    assert apppp.data_cache.get(key)[0]
+
+    # Продаж товару з іншої сторінки може змінити і цю відфільтровану сторінку
+    apppp.invalidate_after_item_changed(10 ** 9)
+    assert not apppp.data_cache.get(key)[0]
+
+
+def test_only_paged_loads_prime_item_cache(apppp_module):
+    apppp = apppp_module
+    apppp.data_cache.clear()
+    items, _ = apppp.load_items_from_db()
+    assert len(items) > 100
+    assert len(apppp.data_cache) <= 2 # сама сторінка і, можливо, кількість
+
+    page, _ = apppp.load_items_from_db(limit=5, after_id=0)
+    entries_before = len(apppp.data_cache)
+    assert apppp.get_item_by_db_id(page[0].id) is page[0]
+    assert len(apppp.data_cache) == entries_before
+
+
+def test_direct_writes_check_stock_like_the_api(apppp_module):
+    apppp = apppp_module
+    item = next(item for item in apppp.load_items_from_db(limit=50, after_id=0)[0] if item.sold_qty > 0)
+    sale = next(sale for sale in item.sales_history if sale.is_complete)
+
+    assert "доступно" in apppp.sell_item(item.id, item.remaining_qty + 1, 1.0)
+    allowed = item.initial_quantity - item.sold_qty_excluding(sale.id)
+    assert str(allowed) in apppp.update_sale(item.id, sale.id, allowed + 1, 1.0)
+    fields = {"name": "x", "initial_quantity": item.sold_qty - 1, "origin_country": "USA", "cost_original": 1.0}
+    assert "менша за продану" in apppp.update_item(item.id, fields)
+
+
+def test_ilike_search_pages_by_cursor(apppp_module, monkeypatch):
+    apppp = apppp_module
+    monkeypatch.setattr(apppp, "SEARCH_MODE", apppp.SEARCH_ILIKE)
+    first, total = apppp.load_items_from_db(limit=5, search_term="Nike", after_id=0)
+    second, _ = apppp.load_items_from_db(limit=5, search_term="Nike", after_id=first[-1].id)
+    assert total > 10
+    assert all("nike" in item.name.casefold() for item in first + second)
+    assert second[0].id > first[-1].id
+
+
+def test_removing_an_item_evicts_every_list_page_and_count(apppp_module):
+    apppp = apppp_module
+    first_page, _ = apppp.load_items_from_db(limit=5, offset=0, count_strategy=apppp.COUNT_CACHED)
+    later_page, _ = apppp.load_items_from_db(limit=5, offset=50, count_strategy=apppp.COUNT_CACHED)
+    page_key = (apppp.load_items_from_db.__qualname__, (), (("count_strategy", apppp.COUNT_CACHED), ("limit", 5), ("offset", 50)))
+    count_key = (apppp.count_items_cached.__qualname__, (None, apppp.STOCK_ALL), ())
+    assert apppp.data_cache.get(page_key)[0] and apppp.data_cache.get(count_key)[0]
+
+    apppp.invalidate_after_item_changed(first_page[0].id, removed=True)
+    assert not apppp.data_cache.get(page_key)[0]
+    assert not apppp.data_cache.get(count_key)[0]
+
+
+def test_summary_page_primes_item_summary_cache(apppp_module):
+    apppp = apppp_module
+    apppp.data_cache.clear()
+    page, _ = apppp.load_items_from_db(limit=5, after_id=0, sales_mode=apppp.SALES_SUMMARY)
+    entries_before = len(apppp.data_cache)
+
+    item = apppp.get_item_summary(page[0].id)
+    assert item is page[0] and item.sales_history is None
+    assert len(apppp.data_cache) == entries_before
+
+
+def test_items_read_before_invalidation_are_not_primed(apppp_module):
+    apppp = apppp_module
+    apppp.data_cache.clear()
+    item = apppp.load_items_from_db(limit=5, after_id=0)[0][0]
+    apppp.data_cache.clear()
+
+    # Сторінка прочитана до запису в БД, а кладеться в кеш уже після скидання
+    generation = apppp.data_cache.generation
+    apppp.invalidate_after_item_changed(item.id)
+    apppp.remember_items([item], generation)
+    assert apppp.get_item_by_db_id(item.id) is not item
+    assert apppp.get_item_summary(item.id) is not item
+
+
+def test_direct_sale_checks_stock_read_past_the_cache(apppp_module, store):
+    apppp = apppp_module
+    item = next(item for item in apppp.load_items_from_db(limit=50, after_id=0)[0] if item.remaining_qty > 0)
+    assert apppp.get_item_by_db_id(item.id) is item
+
+    # Інший процес продає весь залишок: кеш цього процесу про це не знає
+    sales, item_row = store.tables["sales"], store.tables["items"].by_id[item.id]
+    sale = {"id": max(sales.ids) + 1, "item_id": item.id, "quantity_sold": item.remaining_qty,
+            "price_per_unit_uah": 1.0, "sale_timestamp": "2030-01-01T00:00:00"}
+    saved_stock = {column: item_row[column] for column in ("sold_qty", "remaining_qty", "sales_value")}
+    sales.rows.append(sale)
+    sales.ids.append(sale["id"])
+    sales.by_id[sale["id"]] = sale
+    store.sales_by_item.setdefault(item.id, []).append(sale)
+    item_row.update(sold_qty=item_row["sold_qty"] + sale["quantity_sold"], remaining_qty=0,
+                    sales_value=item_row["sales_value"] + sale["quantity_sold"])
+    try:
+        assert apppp.get_item_by_db_id(item.id).remaining_qty > 0
+        assert "доступно 0 од." in apppp.sell_item(item.id, 1, 1.0)
+    finally:
+        sales.rows.pop()
+        sales.ids.pop()
+        del sales.by_id[sale["id"]]
+        store.sales_by_item[item.id].remove(sale)
+        item_row.update(saved_stock)
@@ -0,0 +1,23 @@
+import glob
+import io
+import os
+import tempfile
+
+from openpyxl import load_workbook
+from streamlit.testing.v1 import AppTest
+
+from conftest import CATALOG_ITEMS, REPO_DIR
+
+EXPORT_PAGE = glob.glob(os.path.join(REPO_DIR, "pages", "4_*.py"))[0]
+
+
+def test_export_builds_workbook_without_leaving_temp_files(apppp_module, tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    page = AppTest.from_file(EXPORT_PAGE, default_timeout=60).run()
+    page.button(key="export_build_button").click().run()
+
+    assert not page.exception
+    assert not list(tmp_path.glob("inventory_export_*"))
+    assert page.session_state["export_file_rows"] == CATALOG_ITEMS
+    sheet = load_workbook(io.BytesIO(page.session_state["export_file_data"]), read_only=True).active
+    assert sum(1 for _ in sheet.iter_rows()) == CATALOG_ITEMS + 1 # заголовки + товари
@@ -0,0 +1,84 @@
+import logging
+
+import pytest
+
+from local_mirror import LocalMirror
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_sync_logs_row_counts_at_info(apppp_module, tmp_path):
+    logger = logging.getLogger("audit")
+    handler = RecordingHandler()
+    previous_level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        mirror = LocalMirror(str(tmp_path / "mirror.sqlite3"), apppp_module.get_supabase())
+        mirror.sync()
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(previous_level)
+
+    reconcile = [message for message in handler.messages if "звірку id завершено" in message]
+    synced = [message for message in handler.messages if "Локальна копія синхронізована" in message]
+    assert reconcile and "видалено рядків: 0 (" in reconcile[0]
+    assert synced and "'items':" in synced[0] and "'sales':" in synced[0]
+    assert mirror.count_items() > 0
+
+
+@pytest.fixture
+def mirror(apppp_module, api, tmp_path, monkeypatch):
+    """Синхронізована локальна копія, увімкнена для apppp і main_api цього процесу."""
+    import main_api
+
+    local = LocalMirror(str(tmp_path / "mirror.sqlite3"), apppp_module.get_supabase())
+    local.sync()
+    monkeypatch.setattr(apppp_module, "_local_mirror", local)
+    monkeypatch.setattr(main_api, "mirror", local)
+    apppp_module.data_cache.clear()
+    main_api.response_cache.clear()
+    yield local
+    apppp_module.data_cache.clear()
+    main_api.response_cache.clear()
+
+
+def item_id_with_sales(store):
+    return next(item_id for item_id, sales in sorted(store.sales_by_item.items())
+                if any(sale["quantity_sold"] is not None and sale["price_per_unit_uah"] is not None for sale in sales))
+
+
+def test_mirror_payloads_match_supabase_for_item_with_sales(api, store, mirror, monkeypatch):
+    import main_api
+
+    item_id = item_id_with_sales(store)
+    urls = [f"/items/{item_id}", f"/items?ids={item_id}", f"/products/?after_id={item_id - 1}&limit=1"]
+    from_mirror = [api.get(url).json() for url in urls]
+    monkeypatch.setattr(main_api, "mirror", None)
+    main_api.response_cache.clear()
+    from_supabase = [api.get(url).json() for url in urls]
+
+    assert from_mirror[0]["sold_qty"] > 0
+    assert from_mirror == from_supabase
+
+
+def test_removed_item_and_sale_leave_the_mirror_at_once(apppp_module, store, mirror):
+    item_id = item_id_with_sales(store)
+    other_id = next(other for other in sorted(store.sales_by_item) if other != item_id)
+    sale_id = store.sales_by_item[other_id][0]["id"]
+    count = mirror.count_items()
+
+    apppp_module.invalidate_after_item_changed(item_id, removed=True)
+    apppp_module.invalidate_after_item_changed(other_id, removed_sale_id=sale_id)
+
+    assert mirror.get_item(item_id) is None
+    assert mirror.count_items() == count - 1
+    assert sale_id not in {sale["id"] for sale in mirror.get_item(other_id)["sales_history"]}
+    assert apppp_module.get_item_by_db_id(item_id) is None
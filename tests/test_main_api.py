@@ -0,0 +1,52 @@
+def test_search_pages_by_offset_without_cursor(api):
+    first = api.get("/products/", params={"search": "Nike", "limit": 5})
+    assert first.status_code == 200
+    assert first.json()
+    assert "X-Next-Cursor" not in first.headers
+    assert int(first.headers["X-Total-Count"]) > 5
+
+    second = api.get("/products/", params={"search": "Nike", "limit": 5, "skip": 5})
+    assert second.status_code == 200
+    assert {item["id"] for item in second.json()}.isdisjoint(item["id"] for item in first.json())
+
+
+def test_search_with_cursor_is_rejected(api):
+    cursor = api.get("/products/", params={"limit": 5}).headers["X-Next-Cursor"]
+
+    assert api.get("/products/", params={"search": "Nike", "cursor": cursor}).status_code == 400
+    assert api.get("/products/", params={"search": "Nike", "after_id": 5}).status_code == 400
+
+
+def test_cached_responses_vary_on_accept_encoding(api):
+    small = api.get("/items/1", headers={"Accept-Encoding": "identity"})
+    assert small.status_code == 200
+    assert small.headers.get_list("Vary") == ["Accept-Encoding"]
+
+    not_modified = api.get("/items/1", headers={"If-None-Match": small.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers.get_list("Vary") == ["Accept-Encoding"]
+
+    large = api.get("/products/", params={"limit": 200}, headers={"Accept-Encoding": "gzip"})
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert large.headers.get_list("Vary") == ["Accept-Encoding"]
+
+
+def test_each_encoding_has_its_own_etag(api):
+    params = {"limit": 200}
+    plain = api.get("/products/", params=params, headers={"Accept-Encoding": "identity"})
+    gzipped = api.get("/products/", params=params, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers and gzipped.headers["Content-Encoding"] == "gzip"
+    assert plain.headers["ETag"] != gzipped.headers["ETag"]
+
+    # Кеш із нестисненим тілом не може отримати 304 на запит стисненого, і навпаки
+    assert api.get("/products/", params=params, headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]}).status_code == 200
+    assert api.get("/products/", params=params, headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["ETag"]}).status_code == 304
+    assert api.get("/products/", params=params, headers={"Accept-Encoding": "identity", "If-None-Match": plain.headers["ETag"]}).status_code == 304
+
+
+def test_bulk_insert_goes_through_apppp_batches(api):
+    # Заміна PostgREST не приймає записів: помилка першого пакета приходить від apppp.insert_items_in_batches
+    response = api.post("/items/bulk", json=[{"name": "Новий", "initial_quantity": 1, "origin_country": "USA", "cost_original": 1.0}])
+    assert response.status_code == 500
+    assert "Пакет рядків 1-1" in response.json()["detail"]
+    assert "вже вставлено: 0" in response.json()["detail"]
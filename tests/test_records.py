@@ -0,0 +1,22 @@
+from records import Item
+
+
+def make_item(sales):
+    return Item.from_row({"id": 1, "name": "Товар", "initial_quantity": 10}, sales)
+
+
+def test_sold_qty_excluding_counts_only_complete_sales():
+    item = make_item([
+        {"id": 1, "item_id": 1, "quantity_sold": 3, "price_per_unit_uah": 100.0},
+        {"id": 2, "item_id": 1, "quantity_sold": 2, "price_per_unit_uah": None}, # неповний продаж
+        {"id": 3, "item_id": 1, "quantity_sold": 4, "price_per_unit_uah": 90.0},
+    ])
+    assert item.sold_qty == 7
+    assert item.sold_qty_excluding(None) == 7
+    assert item.sold_qty_excluding(3) == 3
+    assert item.sold_qty_excluding(2) == 7
+
+
+def test_sold_qty_excluding_without_history_falls_back_to_summary():
+    item = Item.from_row({"id": 1, "initial_quantity": 10, "sold_qty": 4, "sales_value": 40.0})
+    assert item.sold_qty_excluding(5) == 4
@@ -0,0 +1,24 @@
+import pytest
+
+
+def local_summary(apppp):
+    items, _ = apppp.load_items_from_db()
+    return apppp.summarize_item_stats(apppp.calculate_item_stats(*apppp.build_inventory_frames(items)))
+
+
+def test_db_summary_matches_local_calculation(apppp_module):
+    apppp = apppp_module
+    apppp.load_stats_summary.clear()
+    summary = apppp.load_stats_summary()
+    expected = local_summary(apppp)
+    assert summary.keys() == expected.keys()
+    for key, value in expected.items():
+        assert summary[key] == pytest.approx(value), key
+
+
+def test_stats_summary_endpoint(api, apppp_module):
+    response = api.get("/stats/summary")
+    assert response.status_code == 200
+    expected = local_summary(apppp_module)
+    for key, value in response.json().items():
+        assert value == pytest.approx(expected[key]), key